@@ -1,5 +1,17 @@
 # App/__init__.py
-from .models import *
-from .views import *
-from .controllers import *
-from .main import create_app
+# Names from models, views and controllers stay importable from the package, but
+# are resolved on first access (PEP 562) so importing one submodule -- e.g. in a
+# CLI command or a gunicorn worker -- doesn't drag in the whole application.
+import importlib
+
+_SUBPACKAGES = ("models", "views", "controllers")
+
+def __getattr__(name):
+    if name == "create_app":
+        from .main import create_app
+        return create_app
+    for sub in _SUBPACKAGES:
+        module = importlib.import_module(f"{__name__}.{sub}")
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
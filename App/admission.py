@@ -0,0 +1,221 @@
+# App/admission.py
+"""
+Admission control for the API: per-route concurrency limits with a bounded,
+deadline-limited wait queue, and per-user token buckets.
+
+Policies are attached to endpoints ("admin_bp.generate_report") and blueprints
+("admin_bp"); a request is subject to both. A request over its rate gets 429; a request that can't
+get a slot before its deadline (or finds the queue full) is shed with a fast 503.
+Both carry Retry-After. Priority policies (clock-in/out) skip every check, so
+however busy the expensive routes get they never wait behind them.
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import decode_token
+
+ADMISSION_KEY = "rostering.admission"
+# bucket table size at which idle (full) buckets are dropped
+BUCKET_PRUNE_AT = 10000
+
+
+class Policy:
+    """
+    concurrency/queue/deadline: at most `concurrency` requests run at once, at most
+    `queue` more wait, each for up to `deadline` seconds. rate/burst: a per-user
+    token bucket refilled at `rate` requests per second holding up to `burst`.
+    """
+
+    def __init__(self, concurrency=None, queue=0, deadline=1.0, rate=None, burst=None, priority=False):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.deadline = deadline
+        self.rate = rate
+        self._burst = burst  # as given; None means derive it from the rate
+        self.burst = burst or (math.ceil(rate) if rate else None)
+        self.priority = priority
+
+    def updated(self, **changes):
+        fields = {"concurrency": self.concurrency, "queue": self.queue, "deadline": self.deadline,
+                  "rate": self.rate, "burst": self._burst, "priority": self.priority}
+        fields.update(changes)
+        return Policy(**fields)
+
+
+class ConcurrencyLimiter:
+
+    def __init__(self, limit, queue, deadline):
+        self.limit = limit
+        self.queue = queue
+        self.deadline = deadline
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Returns "admitted", "queued" (got a slot after waiting), "full" or "shed"."""
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return "admitted"
+            if self.waiting >= self.queue:
+                return "full"
+            self.waiting += 1
+            give_up = time.monotonic() + self.deadline
+            try:
+                while self.active >= self.limit:
+                    remaining = give_up - time.monotonic()
+                    if remaining <= 0:
+                        return "shed"
+                    self._cond.wait(remaining)
+                self.active += 1
+                return "queued"
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class TokenBuckets:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spend one token for `key`; returns 0 if allowed, else seconds until the next token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(self._buckets) > BUCKET_PRUNE_AT:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        refill = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < refill}
+
+
+class AdmissionControl:
+
+    def __init__(self, app=None, policies=None):
+        self.policies = {}
+        self.limiters = {}
+        self.buckets = {}
+        self.metrics = {}
+        if app is not None:
+            self.init_app(app, policies or {})
+
+    def init_app(self, app, policies):
+        """
+        `policies` maps endpoint or blueprint names to Policy objects. The
+        ADMISSION_POLICIES setting can override fields per name, e.g.
+        {"admin_bp.generate_report": {"concurrency": 4}}.
+        """
+        policies = dict(policies)
+        for name, changes in (app.config.get("ADMISSION_POLICIES") or {}).items():
+            base = policies.get(name, Policy())
+            policies[name] = base.updated(**changes)
+        for name, policy in policies.items():
+            self.policies[name] = policy
+            self.metrics[name] = Counter()
+            if policy.concurrency:
+                self.limiters[name] = ConcurrencyLimiter(policy.concurrency, policy.queue, policy.deadline)
+            if policy.rate:
+                self.buckets[name] = TokenBuckets(policy.rate, policy.burst)
+        app.extensions["admission"] = self
+        if app.config.get("ADMISSION_ENABLED", True):
+            app.before_request(self._admit)
+            app.teardown_request(self._release)
+
+    def _policy_names(self):
+        # an endpoint policy applies together with its blueprint's, most specific first
+        return [n for n in (request.endpoint, request.blueprint) if n and n in self.policies]
+
+    def _reject(self, status, message, retry_after):
+        response = jsonify({"error": message})
+        response.status_code = status
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _admit(self):
+        names = self._policy_names()
+        if not names:
+            return None
+        if self.policies[names[0]].priority:
+            self.metrics[names[0]]["priority"] += 1
+            return None
+
+        for name in names:
+            buckets = self.buckets.get(name)
+            wait = buckets.take(_client_key()) if buckets is not None else 0
+            if wait:
+                self.metrics[name]["rateLimited"] += 1
+                return self._reject(429, "Too many requests", wait)
+
+        held = []
+        for name in names:
+            limiter = self.limiters.get(name)
+            if limiter is None:
+                continue
+            started = time.monotonic()
+            outcome = limiter.acquire()
+            if outcome in ("full", "shed"):
+                for other in held:
+                    other.release()
+                self.metrics[name]["rejectedQueueFull" if outcome == "full" else "shedDeadline"] += 1
+                return self._reject(503, "Server busy, try again shortly", self.policies[name].deadline)
+            if outcome == "queued":
+                self.metrics[name]["queued"] += 1
+                self.metrics[name]["queuedMs"] += int((time.monotonic() - started) * 1000)
+            held.append(limiter)
+        request.environ[ADMISSION_KEY] = held
+        for name in names:
+            self.metrics[name]["admitted"] += 1
+        return None
+
+    def _release(self, exc=None):
+        for limiter in request.environ.pop(ADMISSION_KEY, ()):
+            limiter.release()
+
+    def snapshot(self):
+        """Counters per policy plus current in-flight/waiting numbers."""
+        report = {}
+        for name in self.policies:
+            entry = dict(self.metrics[name])
+            limiter = self.limiters.get(name)
+            if limiter is not None:
+                entry.update(active=limiter.active, waiting=limiter.waiting, limit=limiter.limit, queue=limiter.queue)
+            report[name] = entry
+        return report
+
+
+def _client_key():
+    """Rate-limit key: the verified JWT subject, else the client address."""
+    token = None
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        token = auth[7:]
+    else:
+        token = request.cookies.get(current_app.config.get("JWT_ACCESS_COOKIE_NAME", "access_token_cookie"))
+    if token:
+        try:
+            return f"user:{decode_token(token)['sub']}"
+        except Exception:
+            pass
+    return f"ip:{request.remote_addr}"
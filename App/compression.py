@@ -0,0 +1,119 @@
+# App/compression.py
+"""
+Response compression. Negotiates zstd (when the `zstandard` package is
+installed), gzip or deflate from Accept-Encoding. Buffered responses are
+compressed in one go once they reach COMPRESS_MIN_SIZE; streamed responses
+(generator bodies such as rendered reports) are compressed chunk by chunk as
+they are produced, so the full body is never held in memory.
+Event streams are left alone: compressors hold back output, which would
+delay live events.
+"""
+import zlib
+
+from flask import current_app, request
+
+# preference order when the client accepts several at the same q
+ENCODINGS = ("zstd", "gzip", "deflate")
+COMPRESSIBLE = {
+    "application/json", "text/plain", "text/csv", "text/html",
+    "text/css", "application/javascript", "text/calendar"
+}
+_zstandard = None
+
+
+def _zstd():
+    """The zstandard module, or None when it isn't installed (checked once)."""
+    global _zstandard
+    if _zstandard is None:
+        try:
+            import zstandard
+            _zstandard = zstandard
+        except ImportError:
+            _zstandard = False
+    return _zstandard or None
+
+def compressor(encoding, level):
+    """An object with compress(bytes) and flush() producing `encoding`."""
+    if encoding == "zstd":
+        return _zstd().ZstdCompressor(level=level).compressobj()
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header, or None."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name] = q
+    best = None
+    for encoding in ENCODINGS:
+        if encoding == "zstd" and _zstd() is None:
+            continue
+        q = offered.get(encoding, offered.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+def _compress_stream(source, chunks, encoder):
+    try:
+        for chunk in chunks:
+            data = encoder.compress(chunk)
+            if data:
+                yield data
+        tail = encoder.flush()
+        if tail:
+            yield tail
+    finally:
+        # closing the wrapped body runs the view generator's cleanup
+        if hasattr(source, "close"):
+            source.close()
+
+
+class Compression:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["compression"] = self
+        if app.config.get("COMPRESS_ENABLED", True):
+            app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if (request.method == "HEAD"
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        level = current_app.config.get("COMPRESS_LEVEL", 6)
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, response.iter_encoded(),
+                                                 compressor(encoding, level))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < current_app.config.get("COMPRESS_MIN_SIZE", 1024):
+                return response
+            encoder = compressor(encoding, level)
+            response.set_data(encoder.compress(data) + encoder.flush())
+        response.headers["Content-Encoding"] = encoding
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            # the bytes changed, so a strong validator no longer describes them
+            response.headers["ETag"] = "W/" + etag
+        return response
@@ -15,5 +15,47 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_SECURE"] = True
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
+    app.config.setdefault('ARCHIVE_AFTER_WEEKS', 26)
+    app.config.setdefault('ARCHIVE_BATCH_ROSTERS', 10)
+    app.config.setdefault('EVENTS_POLL_INTERVAL', 1.0)
+    app.config.setdefault('EVENTS_HEARTBEAT', 15.0)
+    app.config.setdefault('EVENTS_RETENTION_SECONDS', 600)
+    app.config.setdefault('EVENTS_QUEUE_SIZE', 100)
+    app.config.setdefault('BATCH_MAX_REQUESTS', 20)
+    app.config.setdefault('ADMISSION_ENABLED', True)
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('DEFAULT_WEEKLY_HOURS_CAP', 48)
+    app.config.setdefault('DEFAULT_DAILY_HOURS_CAP', 12)
+    app.config.setdefault('ROLE_HOUR_CAPS', {})  # e.g. {"Security": {"weekly": 40, "daily": 10}}
+    app.config.setdefault('HOURS_NEAR_CAP_RATIO', 0.9)
+    app.config.setdefault('REPAIR_TIME_BUDGET', 0.5)  # seconds of local search per repair
+    app.config.setdefault('REPAIR_HORIZON_DAYS', 14)
+    app.config.setdefault('REPAIR_AUTO_APPLY', True)  # False: call-offs/deletes only open shifts; admins review proposals
+    app.config.setdefault('IDEMPOTENCY_TTL', 86400)  # seconds a stored response is replayed for
+    app.config.setdefault('IDEMPOTENCY_LOCK_SECONDS', 30)  # after this an unfinished first request is abandoned
+    app.config.setdefault('LOCATION_DATABASE_URI', None)  # e.g. "sqlite:///sites/site-{location_id}.db"
+    app.config.setdefault('ROSTER_SNAPSHOT_EVERY', 50)  # schedule events per roster between history snapshots; 0 turns them off
+    app.config.setdefault('CALENDAR_PAST_DAYS', 7)  # .ics feeds cover this many days back...
+    app.config.setdefault('CALENDAR_FUTURE_DAYS', 60)  # ...and this many ahead
+    app.config.setdefault('CALENDAR_CACHE_TTL', 3600)  # seconds; backstop in case change events are missed
+    app.config.setdefault('CALENDAR_MAX_AGE', 300)  # Cache-Control max-age sent to calendar apps
+    app.config.setdefault('ON_DUTY_HORIZON_HOURS', 24)  # the on-duty index holds shifts starting this far ahead
+    app.config.setdefault('ON_DUTY_LATE_MINUTES', 5)  # not clocked in this long after the start: late
+    app.config.setdefault('ON_DUTY_NO_SHOW_MINUTES', 30)  # ...and this long: no-show
+    app.config.setdefault('REVOCATION_SYNC_INTERVAL', 1.0)  # seconds between a worker's reads of other workers' logouts
+    app.config.setdefault('REVOCATION_CACHE_SIZE', 10000)  # revoked jtis each worker keeps exactly
+    app.config.setdefault('REVOCATION_BLOOM_CAPACITY', 100000)  # revocations the in-memory filter is sized for
+    app.config.setdefault('REVOCATION_BLOOM_ERROR_RATE', 0.001)
+    app.config.setdefault('REVOCATION_PRUNE_INTERVAL', 60)  # seconds; least time between rebuilds that drop expired entries
+    app.config.setdefault('FORECAST_HISTORY_WEEKS', 12)  # completed weeks the staffing forecast learns from
+    app.config.setdefault('FORECAST_WINDOW_WEEKS', 4)  # rolling average of weekly hours over this many
+    app.config.setdefault('FORECAST_SMOOTHING', 5)  # shifts' worth of the role's no-show rate blended into each hour's
+    app.config.setdefault('FORECAST_CACHE_TTL', 3600)  # seconds; backstop for edits that leave no schedule event
     for key in overrides:
-        app.config[key] = overrides[key]
\ No newline at end of file
+        app.config[key] = overrides[key]
+    # archived rosters go to their own SQLite file when ARCHIVE_DATABASE_URI is set
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.setdefault('archive', app.config.get('ARCHIVE_DATABASE_URI') or app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_BINDS'] = binds
\ No newline at end of file
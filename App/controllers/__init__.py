@@ -3,3 +3,14 @@ from .auth_controller import *
 from .staff_controller import *
 from .admin_controller import *
 from .initialize import *
+from .template_controller import *
+from .archive_controller import *
+from .snapshot_controller import *
+from .swap_controller import *
+from .report_controller import *
+from .repair_controller import *
+from .staff_import_controller import *
+from .history_controller import *
+from .calendar_controller import *
+from .duty_controller import *
+from .forecast_controller import *
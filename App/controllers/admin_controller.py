@@ -1,5 +1,6 @@
 # App/controllers/admin_controller.py
 from App.database import db
+from App.models.user import User
 from App.models.staff import Staff
 from App.models.shift import Shift
 from App.models.roster import Roster
@@ -9,6 +10,11 @@ from datetime import datetime, date, timedelta
 from App.database import db
 
 from flask import Response
+import base64
+import json
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
 
 # Import models
 from App.models.staff import Staff
@@ -16,21 +22,92 @@ from App.models.roster import Roster
 from App.models.shift import Shift
 from App.models.attendance import AttendanceRecord
 from App.models.shiftreport import ShiftReport
+from App.controllers import archive_controller, report_controller, hours_controller, repair_controller, history_controller
+from App.models.staffhours import StaffHours
+from App.events import publish
+from App.models.location import Location
+from App.locations import current_location
 
 
 
 def list_staff():
     return [s.get_json() for s in Staff.query.all()]
 
+def _encode_cursor(username_lower, user_id):
+    raw = json.dumps([username_lower, user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor):
+    try:
+        username_lower, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(username_lower), int(user_id)
+    except (ValueError, TypeError):
+        return None
+
+def search_staff(q=None, role=None, limit=SEARCH_DEFAULT_LIMIT, cursor=None):
+    """
+    Case-insensitive prefix search on username and email with keyset pagination.
+    Each branch is a range scan on an indexed lowercase column, so the cost depends
+    on how many names share the prefix and on `limit`, not on the number of staff.
+    """
+    limit = max(1, min(int(limit or SEARCH_DEFAULT_LIMIT), SEARCH_MAX_LIMIT))
+    after = None
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after is None:
+            return {"error": "Invalid cursor"}
+
+    def branch(column):
+        stmt = db.select(Staff.userId, Staff.username, Staff.email, Staff.role, Staff.usernameLower)
+        if column is not None:
+            prefix = q.strip().lower()
+            stmt = stmt.where(column >= prefix, column < prefix + "\uffff")
+        if role:
+            stmt = stmt.where(Staff.role == role)
+        if after:
+            stmt = stmt.where(db.or_(
+                Staff.usernameLower > after[0],
+                db.and_(Staff.usernameLower == after[0], User.userId > after[1])
+            ))
+        # users.userId (the rowid) keeps the ORDER BY satisfiable straight from the index
+        stmt = stmt.order_by(Staff.usernameLower, User.userId).limit(limit + 1)
+        return db.session.execute(stmt).all()
+
+    if q and q.strip():
+        merged = {row.userId: row for row in branch(Staff.usernameLower) + branch(Staff.emailLower)}
+        rows = sorted(merged.values(), key=lambda r: (r.usernameLower, r.userId))
+    else:
+        rows = branch(None)
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(page[-1].usernameLower, page[-1].userId)
+    return {
+        "results": [
+            {"userId": r.userId, "username": r.username, "email": r.email, "role": r.role}
+            for r in page
+        ],
+        "nextCursor": next_cursor
+    }
+
 def create_staff(data):
+    location_id = data.get("locationId")
+    if location_id is not None:
+        if not isinstance(location_id, int) or db.session.get(Location, location_id) is None:
+            return {"error": "Unknown location"}
     staff = Staff(
         username=data.get("username"),
         email=data.get("email"),
         role=data.get("role"),
         type="staff"
     )
+    if location_id is not None:
+        staff.locationId = location_id
     staff.set_password(data.get("password"))
     db.session.add(staff)
+    db.session.flush()
+    history_controller.record_staff("staff.created", [staff])
     db.session.commit()
     return staff.get_json()
 
@@ -38,107 +115,111 @@ def delete_staff(staff_id):
     staff = Staff.query.get(staff_id)
     if not staff:
         return False
+    # their upcoming shifts become open instead of pointing at a deleted person
+    opened = repair_controller.unassign_future_shifts(staff_id)
+    StaffHours.query.filter_by(staffId=staff_id).delete()
+    history_controller.record_staff("staff.deleted", [staff], deleted=True)
     db.session.delete(staff)
     db.session.commit()
+    publish("staff.deleted", staff_id=staff_id, openedShifts=opened)
+    if opened:
+        repair_controller.repair_shifts(opened)
     return True
 
 def schedule_shift(data):
     staff_id = data.get("staffId")
     start = datetime.fromisoformat(data.get("start"))
     end = datetime.fromisoformat(data.get("end"))
+    if end <= start:
+        return {"error": "end must be after start"}
+
+    staff = None
+    if staff_id:
+        staff = db.session.get(Staff, staff_id)
+        if not staff:
+            return {"error": "Staff not found"}
+
+    # the shift belongs to its assignee's site, else the site the request is scoped to
+    location_id = staff.locationId if staff and staff.locationId is not None else current_location()
 
     # ensure current week roster exists
     today = date.today()
     week_start = today - timedelta(days=today.weekday())
-    roster = Roster.query.filter_by(weekStartDate=week_start).first()
+    roster = Roster.query.filter_by(weekStartDate=week_start, locationId=location_id).first()
     if not roster:
-        roster = Roster(weekStartDate=week_start, weekEndDate=week_start + timedelta(days=6))
+        roster = Roster(weekStartDate=week_start, weekEndDate=week_start + timedelta(days=6), locationId=location_id)
         db.session.add(roster)
         db.session.commit()
 
-    shift = Shift(staffId=staff_id, startTime=start, endTime=end, rosterId=roster.rosterId)
+    # overtime guard, enforced as the hours are booked; admins can knowingly go over with allowOvertime
+    if staff and not data.get("allowOvertime"):
+        error = hours_controller.reserve_minutes(staff, start, end)
+        if error:
+            db.session.rollback()
+            return error
+    else:
+        hours_controller.add_minutes(hours_controller.shift_deltas([(staff_id, start, end)]))
+
+    # no staffId posts an open shift that eligible staff (by role) can claim
+    shift = Shift(staffId=staff_id, startTime=start, endTime=end, rosterId=roster.rosterId, role=data.get("role"),
+                  locationId=location_id)
     db.session.add(shift)
+    db.session.flush()
+    history_controller.record_shifts("shift.scheduled", [shift])
     db.session.commit()
+    publish("shift.scheduled", staff_id=shift.staffId, shiftId=shift.shiftId,
+            rosterId=shift.rosterId, start=shift.startTime, end=shift.endTime)
     return shift.get_json()
 
+def delete_shift(shift_id):
+    shift = db.session.get(Shift, shift_id)
+    if not shift:
+        return {"error": "Shift not found"}
+    # clock-in/out rows are what people get paid from; they keep the shift
+    if db.session.scalar(db.select(AttendanceRecord.recordId).where(AttendanceRecord.shiftId == shift_id).limit(1)):
+        return {"error": "Shift has attendance records and can't be deleted"}
+    hours_controller.add_minutes(hours_controller.shift_deltas([(shift.staffId, shift.startTime, shift.endTime)], -1))
+    history_controller.record_shifts("shift.deleted", [shift], deleted=True)
+    db.session.delete(shift)
+    db.session.commit()
+    publish("shift.deleted", staff_id=shift.staffId, shiftId=shift_id)
+    return {"message": "Shift deleted"}
+
+def hours_near_cap(week=None, ratio=None):
+    try:
+        week = date.fromisoformat(week) if week else None
+        ratio = float(ratio) if ratio is not None else None
+    except ValueError:
+        return {"error": "week must be YYYY-MM-DD and ratio a number"}
+    return hours_controller.hours_report(week, ratio)
+
+def list_locations():
+    return [l.get_json() for l in Location.query.order_by(Location.locationId)]
+
+def create_location(data):
+    name = (data or {}).get("name", "").strip()
+    if not name:
+        return {"error": "name is required"}
+    if Location.query.filter_by(name=name).first():
+        return {"error": "A location with that name already exists"}
+    location = Location(name=name)
+    db.session.add(location)
+    db.session.commit()
+    return location.get_json()
+
 def list_shifts():
     return [s.get_json() for s in Shift.query.all()]
 
-def generate_shift_report(roster_id):
-    roster = Roster.query.get(roster_id)
-    if not roster:
-        return {"error": "Roster not found"}
-    
-    # collect data
-    shifts = roster.getCombinedRoster()
-    shift_ids = [s.shiftId for s in shifts]
-    attendance_records = AttendanceRecord.query.filter(
-        AttendanceRecord.shiftId.in_(shift_ids)
-    ).all()
-
-    # tracking totals
-    staff_hours = {}
-    total_shifts = 0
-    total_hours = 0.0
-
-    # start building a summary string to save
-    summary_lines = []
-    summary_lines.append("Shift Report")
-    summary_lines.append("+--------------------------------------+")
-    summary_lines.append(f" Week: {roster.weekStartDate} → {roster.weekEndDate}")
-    summary_lines.append("+--------------------------------------+\n")
-
-    for record in attendance_records:
-        staff = Staff.query.get(record.staffId)
-        shift = Shift.query.get(record.shiftId)
-
-        staff_name = staff.username if staff else "Unknown Staff"
-        shift_info = f"{shift.startTime} → {shift.endTime}" if shift else "No shift info"
-        time_in = record.timeIn.strftime("%Y-%m-%d %H:%M") if record.timeIn else "N/A"
-        time_out = record.timeOut.strftime("%Y-%m-%d %H:%M") if record.timeOut else "N/A"
-
-        if record.timeIn and record.timeOut:
-            hours_worked = (record.timeOut - record.timeIn).total_seconds() / 3600
-            hours_text = f"{hours_worked:.2f} hrs"
-        else:
-            hours_worked = 0
-            hours_text = "Incomplete (No time in/out)"
-
-        # accumulate totals
-        staff_hours[staff_name] = staff_hours.get(staff_name, 0) + hours_worked
-        total_shifts += 1
-        total_hours += hours_worked
-
-        # add to summary string
-        summary_lines.append(f"Staff: {staff_name}")
-        summary_lines.append(f" Shift: {shift_info}")
-        summary_lines.append(f" Time In: {time_in} | Time Out: {time_out}")
-        summary_lines.append(f" Hours Worked: {hours_text}")
-        summary_lines.append("----------------------------------------")
-
-    # per-staff summary
-    summary_lines.append("\nSummary of Hours Worked (per staff):")
-    for name, hrs in staff_hours.items():
-        summary_lines.append(f" {name}: {hrs:.2f} hrs")
-
-    # overall summary
-    summary_lines.append("\nOverall Summary:")
-    summary_lines.append(f" Total Shifts: {total_shifts}")
-    summary_lines.append(f" Total Staff: {len(staff_hours)}")
-    summary_lines.append(f" Total Hours Worked: {total_hours:.2f} hrs")
-
-    # join all summary lines
-    final_summary = "\n".join(summary_lines)
-
-    # save to DB
-    report = ShiftReport(
-        rosterId=roster.rosterId,
-        weekStartDate=roster.weekStartDate,
-        weekEndDate=roster.weekEndDate,
-        summary=final_summary
-    )
-    
-    db.session.add(report)
-    db.session.commit()
-    
-    return Response(final_summary, mimetype='text/plain')
+def generate_shift_report(roster_id, fmt="text"):
+    """
+    Generate a report for the roster and return it rendered as a streaming response.
+    The stored report is structured (see report_controller), so it can be
+    re-rendered in any format later via GET /admin/reports/<id>.
+    """
+    if fmt not in report_controller.REPORT_FORMATS:
+        # checked before anything is stored, so a bad request leaves no report behind
+        return {"error": f"format must be one of {', '.join(report_controller.REPORT_FORMATS)}"}
+    report = report_controller.create_report(roster_id)
+    if isinstance(report, dict):
+        return report
+    return report_controller.report_response(report, fmt, status=201)
@@ -0,0 +1,146 @@
+# App/controllers/archive_controller.py
+from datetime import datetime, date, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, delete, select, func
+from sqlalchemy.orm import selectinload
+
+from App.database import db
+from App.models.roster import Roster
+from App.models.shift import Shift
+from App.models.attendance import AttendanceRecord
+from App.models.shiftreport import ShiftReport, ShiftReportEntry
+from App.models.archive import (ArchivedRoster, ArchivedShift, ArchivedAttendanceRecord, ArchivedShiftReport,
+                                ArchivedShiftReportEntry)
+
+# keeps IN (...) lists well under SQLite's bound-parameter limit
+CHUNK = 500
+
+# hot model -> (archive model, columns copied verbatim, column tying a row to its batch)
+ARCHIVE_TABLES = [
+    (Roster, ArchivedRoster, ["rosterId", "locationId", "weekStartDate", "weekEndDate"], "rosterId"),
+    (Shift, ArchivedShift, ["shiftId", "rosterId", "locationId", "staffId", "startTime", "endTime", "role", "templateId",
+                            "isOffered"], "rosterId"),
+    (AttendanceRecord, ArchivedAttendanceRecord, ["recordId", "staffId", "shiftId", "timeIn", "timeOut"], "shiftId"),
+    (ShiftReport, ArchivedShiftReport, ["reportId", "rosterId", "weekStartDate", "weekEndDate", "summary",
+                                        "totalShifts", "totalStaff", "totalHours", "generatedAt"], "rosterId"),
+    (ShiftReportEntry, ArchivedShiftReportEntry, ["entryId", "reportId", "staffId", "staffName", "shiftId",
+                                                  "shiftStart", "shiftEnd", "timeIn", "timeOut", "hoursWorked"],
+     "reportId"),
+]
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), CHUNK):
+        yield values[i:i + CHUNK]
+
+def default_cutoff():
+    weeks = current_app.config.get("ARCHIVE_AFTER_WEEKS", 26)
+    today = date.today()
+    return today - timedelta(days=today.weekday(), weeks=weeks)
+
+def _fetch(model, columns, key, ids):
+    cols = [getattr(model, c) for c in columns]
+    rows = []
+    for chunk in _chunks(ids):
+        rows.extend(dict(r._mapping) for r in db.session.execute(select(*cols).where(key.in_(chunk))))
+    return rows
+
+def _archive_batch(roster_ids):
+    shift_ids = [r[0] for chunk in _chunks(roster_ids) for r in
+                 db.session.execute(select(Shift.shiftId).where(Shift.rosterId.in_(chunk)))]
+    report_ids = [r[0] for chunk in _chunks(roster_ids) for r in
+                  db.session.execute(select(ShiftReport.reportId).where(ShiftReport.rosterId.in_(chunk)))]
+    scoped_ids = {"rosterId": roster_ids, "shiftId": shift_ids, "reportId": report_ids}
+    batches = {
+        hot: _fetch(hot, columns, getattr(hot, scope), scoped_ids[scope])
+        for hot, _, columns, scope in ARCHIVE_TABLES
+    }
+    db.session.rollback()  # release the read transaction before writing the archive side
+
+    # 1) copy into the archive. Rows left behind by an interrupted run of this
+    #    batch are replaced, so a batch can always be retried from the start.
+    archived_at = datetime.utcnow()
+    for hot, cold, _, scope in ARCHIVE_TABLES:
+        for chunk in _chunks(scoped_ids[scope]):
+            db.session.execute(delete(cold).where(getattr(cold, scope).in_(chunk)))
+        rows = batches[hot]
+        if not rows:
+            continue
+        if cold is ArchivedRoster:
+            rows = [dict(r, archivedAt=archived_at) for r in rows]
+        db.session.execute(insert(cold), rows)
+    db.session.commit()
+
+    # 2) only then drop the hot rows, children first
+    for chunk in _chunks(shift_ids):
+        db.session.execute(delete(AttendanceRecord).where(AttendanceRecord.shiftId.in_(chunk)))
+    for chunk in _chunks(report_ids):
+        db.session.execute(delete(ShiftReportEntry).where(ShiftReportEntry.reportId.in_(chunk)))
+    for chunk in _chunks(roster_ids):
+        db.session.execute(delete(ShiftReport).where(ShiftReport.rosterId.in_(chunk)))
+        db.session.execute(delete(Shift).where(Shift.rosterId.in_(chunk)))
+        db.session.execute(delete(Roster).where(Roster.rosterId.in_(chunk)))
+    db.session.commit()
+    return {hot.__tablename__: len(rows) for hot, rows in batches.items()}
+
+def archive_rosters(cutoff=None, batch_rosters=None, max_batches=None):
+    """
+    Move rosters whose week ended before `cutoff` (with their shifts, attendance
+    and reports) into archive storage, a few rosters per transaction.
+    Each batch commits on its own, so an interrupted run simply resumes on the next call.
+    """
+    cutoff = cutoff or default_cutoff()
+    batch_rosters = batch_rosters or current_app.config.get("ARCHIVE_BATCH_ROSTERS", 10)
+    totals = {"batches": 0, "rosters": 0, "shifts": 0, "attendance_records": 0, "shift_reports": 0,
+              "shift_report_entries": 0}
+    while max_batches is None or totals["batches"] < max_batches:
+        roster_ids = [r[0] for r in db.session.execute(
+            select(Roster.rosterId)
+            .where(Roster.weekEndDate < cutoff)
+            .order_by(Roster.weekStartDate)
+            .limit(batch_rosters)
+        )]
+        if not roster_ids:
+            break
+        moved = _archive_batch(roster_ids)
+        totals["batches"] += 1
+        for table, count in moved.items():
+            totals[table] += count
+    totals["cutoff"] = cutoff.isoformat()
+    return totals
+
+def oldest_hot_week():
+    """The earliest weekStartDate still in hot storage (an index lookup), or None."""
+    return db.session.scalar(select(func.min(Roster.weekStartDate)))
+
+def reaches_archive(week_start):
+    oldest = oldest_hot_week()
+    return oldest is None or week_start < oldest
+
+def find_roster(roster_id):
+    """Look a roster up in hot storage first, then in the archive."""
+    return db.session.get(Roster, roster_id) or db.session.get(ArchivedRoster, roster_id)
+
+def find_roster_by_week(week_start):
+    """The week's roster, hot (with its shifts loaded) or archived."""
+    roster = Roster.query.filter_by(weekStartDate=week_start).options(selectinload(Roster.shifts)).first()
+    if roster is None and reaches_archive(week_start):
+        roster = ArchivedRoster.query.filter_by(weekStartDate=week_start).first()
+    return roster
+
+def models_for(roster):
+    """(shift model, attendance model, report model) matching where `roster` is stored."""
+    if isinstance(roster, ArchivedRoster):
+        return ArchivedShift, ArchivedAttendanceRecord, ArchivedShiftReport
+    return Shift, AttendanceRecord, ShiftReport
+
+def archived_rosters_with_shifts(start, end):
+    """(roster, shift) rows from the archive for weeks in [start, end], shaped like the hot query."""
+    return db.session.execute(
+        select(ArchivedRoster, ArchivedShift)
+        .outerjoin(ArchivedShift, ArchivedShift.rosterId == ArchivedRoster.rosterId)
+        .where(ArchivedRoster.weekStartDate >= start, ArchivedRoster.weekStartDate <= end)
+        .order_by(ArchivedRoster.weekStartDate, ArchivedShift.startTime)
+    ).all()
@@ -2,6 +2,7 @@
 from flask_jwt_extended import create_access_token
 from App.database import db
 from App.models.user import User
+from App.revocation import revoke
 
 def authenticate(username: str, password: str, expected_role: str = None):
     """
@@ -39,9 +40,9 @@ def authenticate_user(username: str, password: str, expected_role: str):
     return token, user
 
 
-def logout_user():
+def logout_user(jwt_data, user_id=None):
     """
-    Stateless logout — in JWT this is usually handled on the client side
-    by clearing the token. For token blacklisting, you'd add logic here.
+    Revoke the presented token (by its jti) so it stops working before it
+    expires. Returns False if it had already expired.
     """
-    return True
+    return revoke(jwt_data, user_id)
@@ -0,0 +1,205 @@
+# App/controllers/calendar_controller.py
+"""
+iCalendar feeds for staff phone calendars. Each staff member gets a secret feed
+token (no JWT needed, since calendar apps can't log in); the feed covers a
+rolling window of their shifts, read with the (staffId, startTime) index.
+
+Calendar apps poll every few minutes, so built feeds are kept in a per-process
+cache keyed by token. The cache listens on the event hub and drops a person's
+feed only when an event says their shifts changed (the hub's poller carries
+changes made by other workers); CALENDAR_CACHE_TTL bounds staleness if events
+are missed. A cache hit, or a 304 for a client that already has the feed, costs
+no database query.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App import events
+
+PRODID = "-//Best Rostering App//Shift Calendar//EN"
+# event fields naming people whose shifts an event touched
+_STAFF_FIELDS = ("staffId", "previousStaffId", "otherStaffId")
+
+
+class _Feed:
+    __slots__ = ("staff_id", "body", "etag", "last_modified", "window_start", "built_at")
+
+    def __init__(self, staff_id, body, etag, last_modified, window_start):
+        self.staff_id = staff_id
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.window_start = window_start
+        self.built_at = time.monotonic()
+
+
+def _affects_shifts(event):
+    return event["type"].startswith(("shift.", "staff.", "roster.", "calendar."))
+
+
+class FeedCache:
+    """Built feeds by token, invalidated per person from hub events."""
+
+    def __init__(self):
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self._subscription = None
+
+    def __len__(self):
+        return len(self._feeds)
+
+    def _listen(self):
+        # subscribed on first use, so processes that never serve a feed don't poll for events
+        if self._subscription is None:
+            with self._lock:
+                if self._subscription is None:
+                    self._subscription = events.subscribe(_affects_shifts)
+
+    def _drain(self):
+        """Apply whatever invalidations arrived since the last request."""
+        subscription = self._subscription
+        pending = subscription.wait(0)
+        if subscription.overflowed:
+            subscription.overflowed = False
+            self.clear()
+            return
+        staff_ids, everyone = set(), False
+        for event in pending:
+            ids = {event.get(field) for field in _STAFF_FIELDS} - {None}
+            if ids:
+                staff_ids |= ids
+            elif event["type"].startswith("roster."):
+                everyone = True  # bulk changes (template materialization) don't name people
+        if everyone:
+            self.clear()
+        elif staff_ids:
+            self.invalidate(staff_ids)
+
+    def get(self, token):
+        self._listen()
+        self._drain()
+        return self._feeds.get(token)
+
+    def put(self, token, feed):
+        with self._lock:
+            self._feeds[token] = feed
+
+    def invalidate(self, staff_ids):
+        with self._lock:
+            for token in [t for t, f in self._feeds.items() if f.staff_id in staff_ids]:
+                self._feeds.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+
+
+feed_cache = FeedCache()
+
+
+def _escape(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n"))
+
+def _fold(line):
+    """Lines longer than 75 octets continue on the next line after a space (RFC 5545 3.1)."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(raw):
+        end = min(len(raw), start + (75 if not parts else 74))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start = end
+    return "\r\n ".join(parts)
+
+def _stamp(value):
+    # shift times are stored in UTC
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+def render_calendar(staff, shifts, stamp):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(f'Shifts - {staff.username}')}",
+    ]
+    for shift_id, start, end, role in shifts:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:shift-{shift_id}@best-rostering-app",
+            f"DTSTAMP:{_stamp(stamp)}",
+            f"DTSTART:{_stamp(start)}",
+            f"DTEND:{_stamp(end)}",
+            f"SUMMARY:{_escape(f'{role} shift' if role else 'Shift')}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+def _window(today):
+    config = current_app.config
+    return (today - timedelta(days=config.get("CALENDAR_PAST_DAYS", 7)),
+            today + timedelta(days=config.get("CALENDAR_FUTURE_DAYS", 60)))
+
+def _build(token, previous=None):
+    staff = db.session.scalars(select(Staff).where(Staff.calendarToken == token)).first()
+    if staff is None:
+        return None
+    today = datetime.utcnow().date()
+    first_day, last_day = _window(today)
+    shifts = db.session.execute(
+        select(Shift.shiftId, Shift.startTime, Shift.endTime, Shift.role)
+        .where(Shift.staffId == staff.userId,
+               Shift.startTime >= datetime.combine(first_day, datetime.min.time()),
+               Shift.startTime < datetime.combine(last_day, datetime.min.time()))
+        .order_by(Shift.startTime)
+    ).all()
+    # the tag ignores DTSTAMP; an unchanged feed keeps its bytes and Last-Modified,
+    # so a rebuild alone (TTL, new day, unrelated event) doesn't make clients refetch
+    etag = hashlib.sha256(render_calendar(staff, shifts, datetime.min).encode()).hexdigest()[:32]
+    if previous is not None and previous.etag == etag and previous.staff_id == staff.userId:
+        return _Feed(staff.userId, previous.body, etag, previous.last_modified, today)
+    now = datetime.utcnow().replace(microsecond=0)
+    return _Feed(staff.userId, render_calendar(staff, shifts, now).encode(), etag, now, today)
+
+def calendar_feed(token):
+    """The cached feed for `token` (building it if needed), or None for an unknown token."""
+    feed = feed_cache.get(token)
+    ttl = current_app.config.get("CALENDAR_CACHE_TTL", 3600)
+    if feed is not None and feed.window_start == datetime.utcnow().date() \
+            and time.monotonic() - feed.built_at < ttl:
+        return feed
+    fresh = _build(token, previous=feed)
+    db.session.rollback()  # nothing to write; don't hold the read transaction
+    if fresh is None:
+        return None
+    feed_cache.put(token, fresh)
+    return fresh
+
+def calendar_token(staff_id, reset=False):
+    """The staff member's feed token, created on first use; reset=True issues a new one."""
+    staff = db.session.get(Staff, staff_id)
+    if not staff:
+        return {"error": "Staff not found"}
+    if staff.calendarToken and not reset:
+        return {"token": staff.calendarToken}
+    staff.calendarToken = secrets.token_urlsafe(24)
+    db.session.commit()
+    if reset:
+        # the old URL stops working here and, via the hub, in every other worker
+        feed_cache.invalidate({staff_id})
+        events.publish("calendar.token_reset", staff_id=staff_id)
+    return {"token": staff.calendarToken}
@@ -0,0 +1,273 @@
+# App/controllers/duty_controller.py
+"""
+"Who's on duty now" for floor views, answered from memory.
+
+Each worker keeps the shifts near the present (from MAX_SHIFT_LENGTH back to
+ON_DUTY_HORIZON_HOURS ahead), their attendance, and a min-heap of upcoming
+start and end times. Reading the board pops the heap up to now, moving shifts
+into and out of the active set, so a request costs O(changes + people on duty)
+rather than a range scan joined to attendance. The index listens on the event
+hub: clock-ins and clock-outs are applied straight from the event, shift
+changes reload just the shifts they name, and bulk changes rebuild it. It is
+built on first use in each worker and rebuilt whenever events may have been lost.
+"""
+import heapq
+import itertools
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.models.attendance import AttendanceRecord
+from App.controllers.swap_controller import MAX_SHIFT_LENGTH
+from App.controllers.archive_controller import _chunks
+from App.locations import current_location, ALL_LOCATIONS
+from App import events
+
+BOARD_COLUMNS = (Shift.shiftId, Shift.staffId, Shift.role, Shift.startTime, Shift.endTime, Shift.locationId)
+# the index serves every location; requests filter what they read from it
+EVERY_LOCATION = {ALL_LOCATIONS: True}
+
+
+def _parse(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _affects_board(event):
+    return event["type"].startswith(("shift.", "attendance.", "staff.", "roster."))
+
+
+class DutyIndex:
+    """Shifts around now, their attendance, and a heap of the next start/end times."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._subscription = None
+        self._clear()
+
+    def _clear(self):
+        self.shifts = {}        # shiftId -> (staffId, role, start, end, locationId)
+        self.attendance = {}    # shiftId -> [timeIn, timeOut]
+        self.staff = {}         # staffId -> username
+        self.active = set()     # shiftIds in [start, end) at the last advance
+        self._heap = []         # (time, seq, shiftId)
+        self._seq = itertools.count()
+        self.loaded_until = None
+        self.built = False
+
+    def reset(self):
+        """Forget everything and stop listening (the next read rebuilds)."""
+        with self._lock:
+            if self._subscription is not None:
+                events.hub.unsubscribe(self._subscription)
+                self._subscription = None
+            self._clear()
+
+    # loading
+
+    def _load_shifts(self, condition):
+        # open shifts have nobody to be on duty, late or missing
+        rows = db.session.execute(
+            select(*BOARD_COLUMNS).where(Shift.staffId.isnot(None), *condition).execution_options(**EVERY_LOCATION)
+        ).all()
+        for row in rows:
+            self._put(row)
+        self._load_attendance([r.shiftId for r in rows])
+        self._load_staff({r.staffId for r in rows})
+
+    def _load_attendance(self, shift_ids):
+        for chunk in _chunks(shift_ids):
+            for shift_id, time_in, time_out in db.session.execute(
+                select(AttendanceRecord.shiftId, AttendanceRecord.timeIn, AttendanceRecord.timeOut)
+                .where(AttendanceRecord.shiftId.in_(chunk))
+            ):
+                self.attendance[shift_id] = [time_in, time_out]
+
+    def _load_staff(self, staff_ids):
+        missing = [s for s in staff_ids if s is not None and s not in self.staff]
+        for chunk in _chunks(missing):
+            self.staff.update(db.session.execute(
+                select(Staff.userId, Staff.username).where(Staff.userId.in_(chunk))
+                .execution_options(**EVERY_LOCATION)
+            ).all())
+
+    def _put(self, row):
+        self.shifts[row.shiftId] = (row.staffId, row.role, row.startTime, row.endTime, row.locationId)
+        heapq.heappush(self._heap, (row.startTime, next(self._seq), row.shiftId))
+        heapq.heappush(self._heap, (row.endTime, next(self._seq), row.shiftId))
+
+    def _drop(self, shift_id):
+        self.shifts.pop(shift_id, None)
+        self.attendance.pop(shift_id, None)
+        self.active.discard(shift_id)
+
+    def rebuild(self, now):
+        self._clear()
+        horizon = timedelta(hours=current_app.config.get("ON_DUTY_HORIZON_HOURS", 24))
+        self.loaded_until = now + horizon
+        self._load_shifts((Shift.startTime > now - MAX_SHIFT_LENGTH, Shift.startTime < self.loaded_until,
+                           Shift.endTime > now))
+        self.built = True
+
+    def _extend(self, now):
+        horizon = timedelta(hours=current_app.config.get("ON_DUTY_HORIZON_HOURS", 24))
+        if now + horizon / 2 < self.loaded_until:
+            return
+        until = now + horizon
+        self._load_shifts((Shift.startTime >= self.loaded_until, Shift.startTime < until))
+        self.loaded_until = until
+
+    def _reload(self, shift_ids, now):
+        """Re-read shifts an event named; deleted and unassigned ones disappear."""
+        found, added, staff_ids = set(), [], set()
+        for chunk in _chunks(shift_ids):
+            for row in db.session.execute(
+                select(*BOARD_COLUMNS).where(Shift.shiftId.in_(chunk), Shift.staffId.isnot(None))
+                .execution_options(**EVERY_LOCATION)
+            ):
+                found.add(row.shiftId)
+                if row.endTime <= now or row.startTime >= self.loaded_until:
+                    self._drop(row.shiftId)
+                    continue
+                known = self.shifts.get(row.shiftId)
+                if known is not None and known[2:4] == (row.startTime, row.endTime):
+                    self.shifts[row.shiftId] = (row.staffId, row.role, row.startTime, row.endTime, row.locationId)
+                else:
+                    if known is None:
+                        added.append(row.shiftId)
+                    self._put(row)
+                if row.startTime <= now:
+                    self.active.add(row.shiftId)
+                staff_ids.add(row.staffId)
+        for shift_id in set(shift_ids) - found:
+            self._drop(shift_id)
+        # clock-ins on shifts we only just heard about were skipped in _drain
+        self._load_attendance(added)
+        self._load_staff(staff_ids)
+
+    # keeping up
+
+    def _drain(self, now):
+        """Apply events since the last read; False if they can't be trusted and we must rebuild."""
+        subscription = self._subscription
+        pending = subscription.wait(0)
+        if subscription.overflowed:
+            subscription.overflowed = False
+            return False
+        changed = set()
+        for event in pending:
+            kind = event["type"]
+            if kind.startswith("roster."):
+                return False  # bulk materialization doesn't name its shifts
+            if kind.startswith("attendance."):
+                if event.get("shiftId") not in self.shifts:
+                    continue
+                record = self.attendance.setdefault(event["shiftId"], [None, None])
+                record[0 if kind == "attendance.time_in" else 1] = _parse(event.get("at"))
+                continue
+            if kind == "staff.deleted":
+                changed.update(event.get("openedShifts") or ())
+                self.staff.pop(event.get("staffId"), None)
+                continue
+            if kind in ("shift.offered", "shift.offer_withdrawn"):
+                continue  # still the holder's shift until someone claims it
+            changed.update(s for s in (event.get("shiftId"), event.get("withShiftId")) if s is not None)
+        if changed:
+            self._reload(changed, now)
+        return True
+
+    def _advance(self, now):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            at, _, shift_id = heapq.heappop(heap)
+            shift = self.shifts.get(shift_id)
+            if shift is None:
+                continue
+            start, end = shift[2], shift[3]
+            if at == end or end <= now:
+                self._drop(shift_id)
+            elif at == start:
+                self.active.add(shift_id)
+
+    def snapshot(self, now=None):
+        """Bring the index up to `now` and return the active shifts with their attendance."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            if self._subscription is None:
+                self._subscription = events.subscribe(_affects_board)
+                self.built = False
+            if not self.built or not self._drain(now):
+                self.rebuild(now)
+            self._extend(now)
+            self._advance(now)
+            return [
+                (shift_id, self.shifts[shift_id], self.attendance.get(shift_id, (None, None)))
+                for shift_id in self.active if shift_id in self.shifts
+            ]
+
+
+duty_index = DutyIndex()
+
+
+def on_duty(role=None, now=None):
+    """
+    Everyone whose shift is underway, with clock-in state and late/no-show flags,
+    plus counts per role. Served from the in-memory index.
+    """
+    now = now or datetime.utcnow()
+    config = current_app.config
+    late_after = timedelta(minutes=config.get("ON_DUTY_LATE_MINUTES", 5))
+    no_show_after = timedelta(minutes=config.get("ON_DUTY_NO_SHOW_MINUTES", 30))
+    location_id = current_location()
+
+    rows = duty_index.snapshot(now)
+    db.session.rollback()  # only ever read; don't hold a transaction open between polls
+    shifts = []
+    by_role = defaultdict(lambda: {"scheduled": 0, "clockedIn": 0, "late": 0, "noShow": 0})
+    for shift_id, (staff_id, shift_role, start, end, shift_location), (time_in, time_out) in rows:
+        if role and shift_role != role:
+            continue
+        if location_id is not None and shift_location != location_id:
+            continue
+        clocked_in = time_in is not None and time_out is None
+        if time_out is not None:
+            status = "clocked-out"
+        elif clocked_in:
+            status = "on-duty"
+        elif now - start >= no_show_after:
+            status = "no-show"
+        elif now - start >= late_after:
+            status = "late"
+        else:
+            status = "expected"
+        late = status == "late" or (time_in is not None and time_in - start >= late_after)
+        counts = by_role[shift_role or "Any"]
+        counts["scheduled"] += 1
+        counts["clockedIn"] += clocked_in
+        counts["late"] += late
+        counts["noShow"] += status == "no-show"
+        shifts.append({
+            "shiftId": shift_id,
+            "staffId": staff_id,
+            "username": duty_index.staff.get(staff_id),
+            "role": shift_role,
+            "startTime": start.isoformat(),
+            "endTime": end.isoformat(),
+            "timeIn": time_in.isoformat() if time_in else None,
+            "timeOut": time_out.isoformat() if time_out else None,
+            "status": status,
+            "late": late,
+            "noShow": status == "no-show"
+        })
+    shifts.sort(key=lambda s: (s["role"] or "", s["startTime"], s["shiftId"]))
+    return {
+        "at": now.isoformat(),
+        "onDuty": shifts,
+        "byRole": dict(sorted(by_role.items())),
+        "total": len(shifts),
+        "clockedIn": sum(c["clockedIn"] for c in by_role.values())
+    }
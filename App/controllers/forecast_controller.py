@@ -0,0 +1,256 @@
+# App/controllers/forecast_controller.py
+"""
+Expected headcount per role and hour of the week, from what actually happened.
+
+The completed weeks of history (FORECAST_HISTORY_WEEKS before this Monday) are
+read once as column arrays -- role, scheduled hours, attended hours -- where
+attended runs from the later of start and clock-in to the earlier of end and
+clock-out, so no-shows and late arrivals count as cover that wasn't there.
+Each role's hourly headcount is then one prefix sum over a difference array
+rather than a loop per shift-hour. From those timelines:
+
+  * level    -- rolling average of attended person-hours per week over the last
+                FORECAST_WINDOW_WEEKS weeks
+  * profile  -- the share of a week's attended hours falling in each hour of the
+                week (the weekday/hour season), over the whole history
+  * expected -- level x profile: people actually working that hour
+  * schedule -- expected / (1 - no-show rate), rounded up: people to roster so
+                that many turn up. Hourly rates are shrunk towards the role's
+                rate by FORECAST_SMOOTHING shifts, so thin hours don't swing.
+
+Results are cached per location and parameters, keyed by the week they start
+from and a version of just the weeks they read, so a forecast is rebuilt only
+after those weeks changed -- not on every clock-in this week -- or after
+FORECAST_CACHE_TTL, for edits the version can't see.
+"""
+import math
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from App.database import db
+from App.models.shift import Shift
+from App.models.roster import Roster
+from App.models.attendance import AttendanceRecord
+from App.models.schedulelog import ScheduleEvent
+from App.models.broadcast import BroadcastEvent
+from App.controllers.hours_controller import week_of
+from App.locations import current_location
+from App import events
+
+HOURS_PER_WEEK = 7 * 24
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MAX_HISTORY_WEEKS = 52
+
+
+def _hour(moment, origin):
+    """Hours from `origin`, to the nearest hour."""
+    return math.floor((moment - origin).total_seconds() / 3600 + 0.5)
+
+
+class Columns:
+    """One row per worked (or missed) shift, as parallel arrays."""
+
+    def __init__(self):
+        self.roles = []                 # role names; rows hold an index into this
+        self.role = array("l")
+        self.start = array("l")         # hour offsets from the first Monday
+        self.end = array("l")
+        self.present_start = array("l")  # equal to present_end for a no-show
+        self.present_end = array("l")
+        self.attended = array("b")
+        self.late = array("b")
+
+
+def load_columns(origin, until, late_after):
+    """Assigned shifts starting in [origin, until) with their attendance."""
+    columns, codes = Columns(), {}
+    rows = db.session.execute(
+        select(Shift.role, Shift.startTime, Shift.endTime, AttendanceRecord.timeIn, AttendanceRecord.timeOut)
+        .outerjoin(AttendanceRecord, and_(AttendanceRecord.shiftId == Shift.shiftId,
+                                          AttendanceRecord.staffId == Shift.staffId))
+        .where(Shift.staffId.isnot(None), Shift.startTime >= origin, Shift.startTime < until)
+        .execution_options(yield_per=5000)
+    )
+    for role, start, end, time_in, time_out in rows:
+        role = role or "Any"
+        code = codes.get(role)
+        if code is None:
+            code = codes[role] = len(columns.roles)
+            columns.roles.append(role)
+        first, last = _hour(start, origin), _hour(end, origin)
+        columns.role.append(code)
+        columns.start.append(first)
+        columns.end.append(last)
+        if time_in is None:
+            columns.present_start.append(first)
+            columns.present_end.append(first)
+            columns.attended.append(0)
+            columns.late.append(0)
+            continue
+        arrived = min(max(_hour(time_in, origin), first), last)
+        left = last if time_out is None else max(min(_hour(time_out, origin), last), arrived)
+        columns.present_start.append(arrived)
+        columns.present_end.append(left)
+        columns.attended.append(1)
+        columns.late.append(time_in - start >= late_after)
+    return columns
+
+
+def _timelines(columns, code_count, hours, starts, ends):
+    """Headcount per role for every hour of the history: a difference array, then one prefix sum."""
+    diffs = [[0] * (hours + 1) for _ in range(code_count)]
+    for code, first, last in zip(columns.role, starts, ends):
+        if first < last:
+            diff = diffs[code]
+            diff[min(first, hours)] += 1
+            diff[min(last, hours)] -= 1
+    return [list(accumulate(diff))[:hours] for diff in diffs]
+
+
+def _by_week(timeline, weeks):
+    return [timeline[w * HOURS_PER_WEEK:(w + 1) * HOURS_PER_WEEK] for w in range(weeks)]
+
+
+def _rolling(values, window):
+    sums = [0] + list(accumulate(values))
+    return [(sums[i + 1] - sums[max(0, i + 1 - window)]) / min(window, i + 1) for i in range(len(values))]
+
+
+def build_forecast(first_week, weeks, window):
+    config = current_app.config
+    late_after = timedelta(minutes=config.get("ON_DUTY_LATE_MINUTES", 5))
+    smoothing = config.get("FORECAST_SMOOTHING", 5)
+    origin = datetime.combine(first_week, datetime.min.time())
+    hours = weeks * HOURS_PER_WEEK
+    columns = load_columns(origin, origin + timedelta(hours=hours), late_after)
+    count = len(columns.roles)
+    scheduled = _timelines(columns, count, hours, columns.start, columns.end)
+    present = _timelines(columns, count, hours, columns.present_start, columns.present_end)
+
+    shifts, attended, late = [0] * count, [0] * count, [0] * count
+    for code, came, was_late in zip(columns.role, columns.attended, columns.late):
+        shifts[code] += 1
+        attended[code] += came
+        late[code] += was_late
+
+    roles = {}
+    for code, role in enumerate(columns.roles):
+        weekly_present = _by_week(present[code], weeks)
+        totals = [sum(week) for week in weekly_present]
+        rolling = _rolling(totals, window)
+        level = rolling[-1]
+        scheduled_by_hour = [sum(slot) for slot in zip(*_by_week(scheduled[code], weeks))]
+        present_by_hour = [sum(slot) for slot in zip(*weekly_present)]
+        total = sum(totals)
+        profile = [hour / total if total else 0.0 for hour in present_by_hour]
+        no_show_rate = 1 - attended[code] / shifts[code]
+
+        slots = []
+        for h, (booked, worked) in enumerate(zip(scheduled_by_hour, present_by_hour)):
+            if not booked:
+                continue
+            expected = level * profile[h]
+            rate = (booked - worked + smoothing * no_show_rate) / (booked + smoothing)
+            slots.append({
+                "weekday": WEEKDAYS[h // 24],
+                "hour": h % 24,
+                "expected": round(expected, 2),
+                "noShowRate": round(rate, 3),
+                "schedule": math.ceil(round(expected / (1 - rate), 6)) if expected else 0
+            })
+        roles[role] = {
+            "shifts": shifts[code],
+            "noShowRate": round(no_show_rate, 3),
+            "lateRate": round(late[code] / attended[code], 3) if attended[code] else 0.0,
+            "weeklyHours": [
+                {"weekStartDate": (first_week + timedelta(weeks=w)).isoformat(),
+                 "hours": totals[w], "rollingAverage": round(rolling[w], 2)}
+                for w in range(weeks)
+            ],
+            "weekdayProfile": {day: round(sum(profile[d * 24:(d + 1) * 24]), 3) for d, day in enumerate(WEEKDAYS)},
+            "hours": slots
+        }
+    return roles
+
+
+def data_version(first_week, until):
+    """
+    Changes when the weeks [first_week, until) do: a scheduling event on one of
+    their rosters, an attendance row added to one of their shifts, a clock-in or
+    clock-out filled in late, or a reset of the whole database. Past weeks are
+    otherwise settled; correcting a time that was already recorded is picked up
+    after FORECAST_CACHE_TTL. One query, over the window's attendance.
+    """
+    origin = datetime.combine(first_week, datetime.min.time())
+    rosters = select(Roster.rosterId).where(Roster.weekStartDate >= first_week, Roster.weekStartDate < until)
+    scheduled = select(func.max(ScheduleEvent.eventId)).where(ScheduleEvent.rosterId.in_(rosters))
+    reset = select(func.max(BroadcastEvent.eventId)).where(BroadcastEvent.kind == events.RESET)
+    row = db.session.execute(
+        select(scheduled.scalar_subquery(), reset.scalar_subquery(), func.max(AttendanceRecord.recordId),
+               func.count(AttendanceRecord.timeIn), func.count(AttendanceRecord.timeOut))
+        .select_from(AttendanceRecord)
+        .join(Shift, Shift.shiftId == AttendanceRecord.shiftId)
+        .where(Shift.startTime >= origin, Shift.startTime < datetime.combine(until, datetime.min.time()))
+    ).one()
+    return tuple(value or 0 for value in row)
+
+
+class ForecastCache:
+    """
+    The last forecast per location and parameters, with the version it was built
+    from. Keys leave out the starting week, so a new week replaces the old entry.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key, version, build):
+        ttl = current_app.config.get("FORECAST_CACHE_TTL", 3600)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and time.monotonic() - entry[1] < ttl:
+                return entry[2]
+        result = build()
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), result)
+        return result
+
+
+forecast_cache = ForecastCache()
+
+
+def forecast(role=None, weeks=None, today=None):
+    """Expected and no-show-adjusted headcount per role and hour of the week."""
+    config = current_app.config
+    weeks = config.get("FORECAST_HISTORY_WEEKS", 12) if weeks is None else weeks
+    if not 1 <= weeks <= MAX_HISTORY_WEEKS:
+        return {"error": f"weeks must be between 1 and {MAX_HISTORY_WEEKS}"}
+    window = min(config.get("FORECAST_WINDOW_WEEKS", 4), weeks)
+    first_week = week_of(today or datetime.utcnow()) - timedelta(weeks=weeks)
+    version = data_version(first_week, first_week + timedelta(weeks=weeks))
+    roles = forecast_cache.get((current_location(), weeks, window), (first_week, version),
+                               lambda: build_forecast(first_week, weeks, window))
+    db.session.rollback()  # only ever read
+    if role:
+        roles = {name: data for name, data in roles.items() if name == role}
+    return {
+        "fromWeek": first_week.isoformat(),
+        "weeks": weeks,
+        "windowWeeks": window,
+        "dataVersion": ".".join(map(str, version)),
+        "roles": roles
+    }
@@ -0,0 +1,191 @@
+# App/controllers/history_controller.py
+"""
+Append-only schedule history. Every write that creates, reassigns, offers or
+deletes a shift, or adds or removes staff, appends ScheduleEvents in the same
+transaction as the change, carrying the full state afterwards, so the log and
+the tables can't disagree and nothing is lost when rows are overwritten. Once a roster has ROSTER_SNAPSHOT_EVERY events since its last
+RosterSnapshot it gets a new one, and roster_at() rebuilds any past version
+from the nearest snapshot plus the events after it rather than the whole log.
+"""
+import json
+from datetime import datetime
+
+from flask import current_app, has_request_context
+from flask_jwt_extended import get_current_user
+from sqlalchemy import func, insert, select
+
+from App.database import db
+from App.models.shift import Shift
+from App.models.staff import Staff
+from App.models.schedulelog import ScheduleEvent, RosterSnapshot
+from App.locations import ALL_LOCATIONS
+from App.controllers import archive_controller
+from App.controllers.archive_controller import _chunks
+
+SHIFT_COLUMNS = (Shift.shiftId, Shift.rosterId, Shift.staffId, Shift.role, Shift.isOffered,
+                 Shift.startTime, Shift.endTime, Shift.locationId)
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+def _actor():
+    if not has_request_context():
+        return None
+    try:
+        return getattr(get_current_user(), "userId", None)
+    except RuntimeError:  # no token on this request
+        return None
+
+def shift_state(shift):
+    """What the log keeps of a shift: anything with Shift's columns (ORM object or row)."""
+    return {
+        "staffId": shift.staffId,
+        "role": shift.role,
+        "isOffered": bool(shift.isOffered),
+        "startTime": shift.startTime.isoformat(),
+        "endTime": shift.endTime.isoformat(),
+        "locationId": shift.locationId
+    }
+
+def _append(rows):
+    if not rows:
+        return
+    db.session.execute(insert(ScheduleEvent), rows)
+    rosters = {r["rosterId"] for r in rows if r["rosterId"] is not None}
+    if rosters:
+        _snapshot_due(rosters)
+
+def record_shifts(kind, shifts, deleted=False):
+    """
+    Log shifts in the caller's transaction: after the change, or with deleted=True
+    just before removing them.
+    """
+    actor, now = _actor(), datetime.utcnow()
+    _append([{
+        "occurredAt": now, "kind": kind, "actorId": actor,
+        "rosterId": s.rosterId, "shiftId": s.shiftId, "staffId": s.staffId,
+        "state": None if deleted else _dumps(shift_state(s))
+    } for s in shifts])
+
+def record_shift_ids(kind, shift_ids):
+    """Log the current state of shifts just changed by UPDATE/INSERT statements."""
+    rows = []
+    for chunk in _chunks(shift_ids):
+        rows += db.session.execute(
+            select(*SHIFT_COLUMNS).where(Shift.shiftId.in_(chunk))
+            .execution_options(**{ALL_LOCATIONS: True})
+        ).all()
+    record_shifts(kind, rows)
+
+def record_staff(kind, staff, deleted=False):
+    """Log staff members (added after flush, or just before deletion)."""
+    actor, now = _actor(), datetime.utcnow()
+    _append([{
+        "occurredAt": now, "kind": kind, "actorId": actor,
+        "rosterId": None, "shiftId": None, "staffId": s.userId,
+        "state": None if deleted else _dumps({"username": s.username, "email": s.email, "role": s.role,
+                                              "locationId": s.locationId})
+    } for s in staff])
+
+def record_staff_names(kind, usernames_lower):
+    """record_staff for rows inserted in bulk, looked up by lowercased username."""
+    rows = []
+    for chunk in _chunks(usernames_lower):
+        rows += db.session.execute(
+            select(Staff.userId, Staff.username, Staff.email, Staff.role, Staff.locationId)
+            .where(Staff.usernameLower.in_(chunk))
+            .execution_options(**{ALL_LOCATIONS: True})
+        ).all()
+    record_staff(kind, rows)
+
+
+def _replay(roster_id, at=None):
+    """({shiftId: state}, snapshot event id, events replayed) for the roster as of `at` (default now)."""
+    latest = select(RosterSnapshot).where(RosterSnapshot.rosterId == roster_id)
+    if at is not None:
+        latest = latest.where(RosterSnapshot.takenAt <= at)
+    snapshot = db.session.scalars(latest.order_by(RosterSnapshot.eventId.desc()).limit(1)).first()
+    shifts = json.loads(snapshot.shifts) if snapshot else {}
+    since = snapshot.eventId if snapshot else 0
+
+    events = select(ScheduleEvent.eventId, ScheduleEvent.occurredAt, ScheduleEvent.shiftId, ScheduleEvent.state) \
+        .where(ScheduleEvent.rosterId == roster_id, ScheduleEvent.eventId > since)
+    if at is not None:
+        events = events.where(ScheduleEvent.occurredAt <= at)
+    replayed, last = 0, (since, snapshot.takenAt if snapshot else None)
+    for event_id, occurred_at, shift_id, state in db.session.execute(events.order_by(ScheduleEvent.eventId)):
+        replayed += 1
+        last = (event_id, occurred_at)
+        if shift_id is None:
+            continue
+        if state is None:
+            shifts.pop(str(shift_id), None)
+        else:
+            shifts[str(shift_id)] = json.loads(state)
+    return shifts, last, replayed
+
+def take_snapshot(roster_id):
+    """Store the roster as of its latest event (callers commit)."""
+    shifts, (event_id, taken_at), _ = _replay(roster_id)
+    db.session.add(RosterSnapshot(rosterId=roster_id, eventId=event_id, takenAt=taken_at or datetime.utcnow(),
+                                  shifts=_dumps(shifts)))
+    db.session.flush()
+
+def _snapshot_due(roster_ids):
+    every = current_app.config.get("ROSTER_SNAPSHOT_EVERY", 50)
+    if not every:
+        return
+    for chunk in _chunks(roster_ids):
+        last = select(RosterSnapshot.rosterId, func.max(RosterSnapshot.eventId).label("eventId")) \
+            .where(RosterSnapshot.rosterId.in_(chunk)).group_by(RosterSnapshot.rosterId).subquery()
+        due = db.session.scalars(
+            select(ScheduleEvent.rosterId)
+            .outerjoin(last, last.c.rosterId == ScheduleEvent.rosterId)
+            .where(ScheduleEvent.rosterId.in_(chunk), ScheduleEvent.eventId > func.coalesce(last.c.eventId, 0))
+            .group_by(ScheduleEvent.rosterId)
+            .having(func.count() >= every)
+        ).all()
+        for roster_id in due:
+            take_snapshot(roster_id)
+
+def snapshot_rosters():
+    """
+    Baseline snapshots of every live roster's current shifts, for shifts that
+    predate the log (e.g. right after upgrading). Returns how many were taken.
+    """
+    event_id = db.session.scalar(select(func.max(ScheduleEvent.eventId))) or 0
+    now = datetime.utcnow()
+    by_roster = {}
+    for row in db.session.execute(select(*SHIFT_COLUMNS).where(Shift.rosterId.is_not(None))):
+        by_roster.setdefault(row.rosterId, {})[str(row.shiftId)] = shift_state(row)
+    if by_roster:
+        db.session.execute(insert(RosterSnapshot), [
+            {"rosterId": roster_id, "eventId": event_id, "takenAt": now, "shifts": _dumps(shifts)}
+            for roster_id, shifts in by_roster.items()
+        ])
+    db.session.commit()
+    return len(by_roster)
+
+def roster_at(roster_id, at=None):
+    """The roster's shifts as they were at `at` (a datetime or ISO string; default now)."""
+    if isinstance(at, str):
+        try:
+            at = datetime.fromisoformat(at)
+        except ValueError:
+            return {"error": "at must be an ISO date/time"}
+    roster = archive_controller.find_roster(roster_id)
+    if not roster:
+        return {"error": "Roster not found"}
+    shifts, (event_id, _), replayed = _replay(roster_id, at)
+    rows = sorted(({"shiftId": int(shift_id), "rosterId": roster_id, **state} for shift_id, state in shifts.items()),
+                  key=lambda s: (s["startTime"], s["shiftId"]))
+    return {
+        "rosterId": roster_id,
+        "weekStartDate": roster.weekStartDate.isoformat(),
+        "weekEndDate": roster.weekEndDate.isoformat(),
+        "at": (at or datetime.utcnow()).isoformat(),
+        "asOfEventId": event_id,
+        "replayedEvents": replayed,
+        "shifts": rows
+    }
@@ -0,0 +1,187 @@
+# App/controllers/hours_controller.py
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, insert, delete, bindparam
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.models.staffhours import StaffHours
+
+# staff ids per IN (...) when looking up existing totals
+CHUNK = 500
+
+
+# a shift's minutes count towards the day and week it starts in
+def week_of(moment):
+    day = moment.date() if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+def shift_minutes(start, end):
+    return int((end - start).total_seconds() // 60)
+
+def caps_for(staff):
+    """(weekly, daily) caps in hours: the person's own, else their role's, else the defaults."""
+    role_caps = (current_app.config.get("ROLE_HOUR_CAPS") or {}).get(staff.role) or {}
+    weekly = staff.maxWeeklyHours or role_caps.get("weekly") or current_app.config.get("DEFAULT_WEEKLY_HOURS_CAP", 48)
+    daily = staff.maxDailyHours or role_caps.get("daily") or current_app.config.get("DEFAULT_DAILY_HOURS_CAP", 12)
+    return weekly, daily
+
+def weekly_minutes(staff_id, week):
+    """Scheduled minutes from the running total (a primary-key lookup)."""
+    return db.session.scalar(
+        select(StaffHours.minutes).where(StaffHours.staffId == staff_id, StaffHours.weekStartDate == week)
+    ) or 0
+
+def daily_minutes(staff_id, day, exclude_id=None):
+    """Scheduled minutes on one day, from that person's shifts (a short index range)."""
+    start = datetime.combine(day, datetime.min.time())
+    query = select(Shift.startTime, Shift.endTime).where(
+        Shift.staffId == staff_id, Shift.startTime >= start, Shift.startTime < start + timedelta(days=1)
+    )
+    if exclude_id is not None:
+        query = query.where(Shift.shiftId != exclude_id)
+    return sum(shift_minutes(s, e) for s, e in db.session.execute(query))
+
+def _over_weekly(staff, minutes, week, cap):
+    return {"error": f"{staff.username} would be scheduled {minutes / 60:.1f}h in the week of {week} (cap {cap:g}h)"}
+
+def _over_daily(staff, minutes, day, cap):
+    return {"error": f"{staff.username} would be scheduled {minutes / 60:.1f}h on {day} (cap {cap:g}h)"}
+
+def check_caps(staff, start, end, exclude_id=None):
+    """None if `staff` can take a shift from start to end, else an error dict."""
+    weekly, daily = caps_for(staff)
+    minutes = shift_minutes(start, end)
+    week_total = weekly_minutes(staff.userId, week_of(start)) + minutes
+    if exclude_id is not None:
+        held = db.session.get(Shift, exclude_id)
+        if held is not None and held.staffId == staff.userId and week_of(held.startTime) == week_of(start):
+            week_total -= shift_minutes(held.startTime, held.endTime)
+    if week_total > weekly * 60:
+        return _over_weekly(staff, week_total, week_of(start), weekly)
+    day_total = daily_minutes(staff.userId, start.date(), exclude_id) + minutes
+    if day_total > daily * 60:
+        return _over_daily(staff, day_total, start.date(), daily)
+    return None
+
+def _ensure_total(staff_id, week):
+    """Make sure the (staff, week) running total exists, without racing another first booking."""
+    table = StaffHours.__table__
+    row = {"staffId": staff_id, "weekStartDate": week, "minutes": 0}
+    dialect = db.session.get_bind(StaffHours).dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        db.session.execute(upsert(table).values(row).on_conflict_do_nothing())
+    elif weekly_minutes(staff_id, week) == 0:
+        db.session.execute(insert(table).values(row))
+
+def reserve_minutes(staff, start, end):
+    """
+    Add a new shift's minutes to `staff`'s weekly total, but only while that stays
+    within the cap: the check is in the UPDATE's WHERE, so concurrent bookings
+    can't both pass it. The row lock the UPDATE takes also serialises the daily
+    check after it. Returns None, or an error dict -- the caller then rolls back.
+    """
+    weekly, daily = caps_for(staff)
+    week, minutes = week_of(start), shift_minutes(start, end)
+    table = StaffHours.__table__
+    _ensure_total(staff.userId, week)
+    booked = db.session.execute(
+        update(table)
+        .where(table.c.staffId == staff.userId, table.c.weekStartDate == week,
+               table.c.minutes + minutes <= weekly * 60)
+        .values(minutes=table.c.minutes + minutes)
+    ).rowcount
+    if not booked:
+        return _over_weekly(staff, weekly_minutes(staff.userId, week) + minutes, week, weekly)
+    day_total = daily_minutes(staff.userId, start.date()) + minutes
+    if day_total > daily * 60:
+        return _over_daily(staff, day_total, start.date(), daily)
+    return None
+
+def add_minutes(deltas):
+    """
+    Apply {(staffId, weekStartDate): minutes} to the running totals in the current
+    transaction (callers commit). Unassigned shifts (staffId None) are ignored.
+    Existing rows are updated with one executemany and new ones bulk-inserted,
+    so materializing thousands of shifts costs a handful of statements.
+    """
+    deltas = {k: m for k, m in deltas.items() if k[0] is not None and m}
+    if not deltas:
+        return
+    table = StaffHours.__table__
+    weeks = {week for _, week in deltas}
+    staff_ids = list({staff_id for staff_id, _ in deltas})
+    present = set()
+    for i in range(0, len(staff_ids), CHUNK):
+        present.update(db.session.execute(
+            select(StaffHours.staffId, StaffHours.weekStartDate)
+            .where(StaffHours.weekStartDate.in_(weeks), StaffHours.staffId.in_(staff_ids[i:i + CHUNK]))
+        ).all())
+    updates = [{"sid": s, "week": w, "delta": m} for (s, w), m in deltas.items() if (s, w) in present]
+    if updates:
+        db.session.execute(
+            update(table)
+            .where(table.c.staffId == bindparam("sid"), table.c.weekStartDate == bindparam("week"))
+            .values(minutes=table.c.minutes + bindparam("delta")),
+            updates
+        )
+    inserts = [{"staffId": s, "weekStartDate": w, "minutes": max(m, 0)}
+               for (s, w), m in deltas.items() if (s, w) not in present]
+    if inserts:
+        db.session.execute(insert(table), inserts)
+
+def shift_deltas(shifts, sign=1):
+    """Running-total changes for (staffId, startTime, endTime) rows being added (sign 1) or removed (-1)."""
+    deltas = defaultdict(int)
+    for staff_id, start, end in shifts:
+        deltas[(staff_id, week_of(start))] += sign * shift_minutes(start, end)
+    return deltas
+
+def rebuild_hours():
+    """Recompute every running total from the shifts table (after imports or manual edits)."""
+    db.session.execute(delete(StaffHours))
+    totals = shift_deltas(db.session.execute(
+        select(Shift.staffId, Shift.startTime, Shift.endTime).where(Shift.staffId.is_not(None))
+    ))
+    if totals:
+        db.session.execute(insert(StaffHours), [
+            {"staffId": staff_id, "weekStartDate": week, "minutes": minutes}
+            for (staff_id, week), minutes in totals.items()
+        ])
+    db.session.commit()
+    return len(totals)
+
+def hours_report(week=None, ratio=None):
+    """
+    Everyone at or above `ratio` of their weekly cap for `week` (default this week),
+    from the running totals, highest utilisation first.
+    """
+    week = week_of(week or date.today())
+    ratio = current_app.config.get("HOURS_NEAR_CAP_RATIO", 0.9) if ratio is None else ratio
+    rows = db.session.execute(
+        select(Staff, StaffHours.minutes)
+        .join(StaffHours, StaffHours.staffId == Staff.userId)
+        .where(StaffHours.weekStartDate == week, StaffHours.minutes > 0)
+    ).all()
+    report = []
+    for staff, minutes in rows:
+        weekly, _ = caps_for(staff)
+        used = minutes / (weekly * 60)
+        if used >= ratio:
+            report.append({
+                "staffId": staff.userId,
+                "username": staff.username,
+                "role": staff.role,
+                "hours": round(minutes / 60, 2),
+                "capHours": weekly,
+                "utilisation": round(used, 3),
+                "overCap": minutes > weekly * 60
+            })
+    report.sort(key=lambda r: r["utilisation"], reverse=True)
+    return {"weekStartDate": week.isoformat(), "ratio": ratio, "staff": report}
@@ -1,7 +1,11 @@
-from App.database import db
+import os
 from datetime import datetime, date, timedelta
 import random
+
+from flask import current_app
+
 from App.database import db
+from App import events
 
 # Import models
 from App.models.admin import Admin
@@ -9,14 +13,50 @@ from App.models.staff import Staff
 from App.models.roster import Roster
 from App.models.shift import Shift
 from App.models.attendance import AttendanceRecord
+from App.controllers.snapshot_controller import load_snapshot
+from App.controllers.hours_controller import rebuild_hours
+from App.controllers.calendar_controller import feed_cache
+from App.controllers.duty_controller import duty_index
+from App.controllers.forecast_controller import forecast_cache
 
 
 def initialize():
-    db.drop_all()
-    db.create_all()
-    # create_user('bob', 'bobpass')
-    
+    """
+    Reset the database to the demo data set.
+    When SEED_SNAPSHOT points at a saved snapshot it is bulk-loaded instead of reseeding.
+    Returns the number of rows created per kind.
+    """
+    last_event = events.latest_id()
+    snapshot = current_app.config.get("SEED_SNAPSHOT")
+    if snapshot and os.path.exists(snapshot):
+        counts = load_snapshot(snapshot)
+        if "staff_hours" not in counts:
+            rebuild_hours()  # snapshot predates the running hour totals
+        data_replaced(last_event)
+        return {
+            "admins": counts.get("admins", 0),
+            "staff": counts.get("staff", 0),
+            "rosters": counts.get("rosters", 0),
+            "shifts": counts.get("shifts", 0),
+            "attendance": counts.get("attendance_records", 0)
+        }
+    counts = seed_demo_data()
+    data_replaced(last_event)
+    return counts
+
+def data_replaced(last_event):
+    """
+    Drop this worker's caches of the old tables and tell the other workers to do
+    the same. `last_event` is events.latest_id() from before the tables were replaced.
+    """
+    feed_cache.clear()
+    duty_index.reset()
+    forecast_cache.clear()
+    events.announce_reset(last_event)
+
+def seed_demo_data():
     """Initialize database and seed demo data with admins, staff, rosters, shifts, and randomized attendance records."""
+    db.session.remove()
     db.drop_all()
     db.create_all()
 
@@ -48,7 +88,7 @@ def initialize():
         s.set_password(default_staff_password[s.username])
 
     db.session.add_all([admin1, admin2] + staff_members)
-    db.session.commit()
+    db.session.flush()
 
     # Create 5 rosters
     today = date.today()
@@ -59,7 +99,7 @@ def initialize():
         roster = Roster(weekStartDate=week_start, weekEndDate=week_start + timedelta(days=6))
         db.session.add(roster)
         all_rosters.append(roster)
-    db.session.commit()
+    db.session.flush()
 
     # Shifts & Attendance
     all_shifts = []
@@ -72,8 +112,6 @@ def initialize():
             shift_end = shift_start + timedelta(hours=8)
 
             shift = Shift(rosterId=roster.rosterId, staffId=staff.userId, startTime=shift_start, endTime=shift_end)
-            db.session.add(shift)
-            db.session.commit()
             all_shifts.append(shift)
 
             attendance_type = random.choice(["full", "late", "absent", "early_leave"])
@@ -90,7 +128,22 @@ def initialize():
                 time_in = None
                 time_out = None
 
-            record = AttendanceRecord(staffId=staff.userId, shiftId=shift.shiftId, timeIn=time_in, timeOut=time_out)
-            db.session.add(record)
-            all_attendance.append(record)
+            # linked through the shift object; ids are assigned in one flush below
+            all_attendance.append((shift, time_in, time_out))
+
+    db.session.add_all(all_shifts)
+    db.session.flush()
+    db.session.add_all([
+        AttendanceRecord(staffId=shift.staffId, shiftId=shift.shiftId, timeIn=time_in, timeOut=time_out)
+        for shift, time_in, time_out in all_attendance
+    ])
     db.session.commit()
+    rebuild_hours()
+
+    return {
+        "admins": 2,
+        "staff": len(staff_members),
+        "rosters": len(all_rosters),
+        "shifts": len(all_shifts),
+        "attendance": len(all_attendance)
+    }
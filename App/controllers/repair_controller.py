@@ -0,0 +1,270 @@
+# App/controllers/repair_controller.py
+"""
+Incremental roster repair. When someone calls off or is deleted, their shifts
+become open; instead of re-planning the week we search locally for the fewest
+reassignments that cover them: first anyone who can take a shift as-is, then
+two-step moves (X takes the open shift and hands one of their own shifts to Y).
+Role, clashes with existing shifts and weekly/daily hour caps are respected.
+The search works on an in-memory board of the affected window and stops at the
+time budget, reporting whatever it could not cover.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.models.staffhours import StaffHours
+from App.events import publish
+from App.controllers import hours_controller, history_controller
+from App.controllers.swap_controller import MAX_SHIFT_LENGTH, _overlaps, _role_matches
+
+
+class _Board:
+    """Everyone's shifts around the open shifts, plus their weekly totals and caps."""
+
+    def __init__(self, targets, exclude=()):
+        first_day = datetime.combine(min(s.startTime for s in targets).date(), datetime.min.time())
+        window_start = first_day - MAX_SHIFT_LENGTH
+        window_end = max(s.endTime for s in targets) + MAX_SHIFT_LENGTH
+        # staffId -> {shiftId: (start, end, role)}
+        self.held = defaultdict(dict)
+        for shift_id, staff_id, start, end, role in db.session.execute(
+            select(Shift.shiftId, Shift.staffId, Shift.startTime, Shift.endTime, Shift.role)
+            .where(Shift.staffId.is_not(None), Shift.startTime >= window_start, Shift.startTime < window_end)
+        ):
+            self.held[staff_id][shift_id] = (start, end, role)
+        # people who could take an open shift, then whoever could take what they'd hand on
+        roles = {s.role for s in targets}
+        self.staff = self._load_staff(roles, exclude)
+        if None not in roles:
+            handed = {role for staff_id in self.staff for _, _, role in self.held[staff_id].values()}
+            if not handed <= roles:
+                self.staff = self._load_staff(roles | handed, exclude)
+        self.caps = {sid: hours_controller.caps_for(s) for sid, s in self.staff.items()}
+        # a handed-on shift can fall in the week before or after the open one
+        week, last_week = hours_controller.week_of(window_start), hours_controller.week_of(window_end)
+        weeks = []
+        while week <= last_week:
+            weeks.append(week)
+            week += timedelta(weeks=1)
+        self.weekly = {(r.staffId, r.weekStartDate): r.minutes
+                       for r in StaffHours.query.filter(StaffHours.weekStartDate.in_(weeks))}
+
+    @staticmethod
+    def _load_staff(roles, exclude):
+        """Staff who can work shifts of `roles` (a None role is open to everyone)."""
+        query = Staff.query
+        if None not in roles:
+            query = query.filter(Staff.role.in_(roles))
+        return {s.userId: s for s in query if s.userId not in exclude}
+
+    def load(self, staff_id, start):
+        return self.weekly.get((staff_id, hours_controller.week_of(start)), 0)
+
+    def fits(self, staff_id, start, end, role, without=None):
+        """Can `staff_id` take [start, end) (after giving up their shift `without`)?"""
+        staff = self.staff.get(staff_id)
+        if staff is None or not _role_matches(role, staff.role):
+            return False
+        week, day = hours_controller.week_of(start), start.date()
+        week_total = self.load(staff_id, start)
+        day_total = 0
+        for shift_id, (s, e, _) in self.held[staff_id].items():
+            if shift_id == without:
+                if hours_controller.week_of(s) == week:
+                    week_total -= hours_controller.shift_minutes(s, e)
+                continue
+            if s < end and e > start:
+                return False
+            if s.date() == day:
+                day_total += hours_controller.shift_minutes(s, e)
+        minutes = hours_controller.shift_minutes(start, end)
+        weekly, daily = self.caps[staff_id]
+        return week_total + minutes <= weekly * 60 and day_total + minutes <= daily * 60
+
+    def move(self, shift_id, start, end, role, from_id, to_id):
+        minutes = hours_controller.shift_minutes(start, end)
+        week = hours_controller.week_of(start)
+        if from_id is not None:
+            self.held[from_id].pop(shift_id, None)
+            self.weekly[(from_id, week)] = self.weekly.get((from_id, week), 0) - minutes
+        self.held[to_id][shift_id] = (start, end, role)
+        self.weekly[(to_id, week)] = self.weekly.get((to_id, week), 0) + minutes
+
+
+def _direct(board, shift):
+    """Least-loaded person who can take the shift as it stands, or None."""
+    best = None
+    for staff_id in board.staff:
+        if board.fits(staff_id, shift.startTime, shift.endTime, shift.role):
+            load = board.load(staff_id, shift.startTime)
+            if best is None or load < best[0]:
+                best = (load, staff_id)
+    return best[1] if best else None
+
+def _two_step(board, shift, now, deadline):
+    """
+    (x, given_id, y): x takes `shift` after handing their upcoming shift given_id
+    to y. Only x's shifts near the open one are tried, since those are what block x.
+    """
+    for x in board.staff:
+        if not _role_matches(shift.role, board.staff[x].role):
+            continue
+        for given_id, (start, end, role) in list(board.held[x].items()):
+            if time.monotonic() > deadline:
+                return None
+            if start <= now or not board.fits(x, shift.startTime, shift.endTime, shift.role, without=given_id):
+                continue
+            for y in board.staff:
+                if y != x and board.fits(y, start, end, role):
+                    return x, given_id, y
+    return None
+
+def _targets(shift_ids):
+    now = datetime.utcnow()
+    query = Shift.query.filter(Shift.staffId.is_(None), Shift.startTime > now)
+    if shift_ids is None:
+        horizon = timedelta(days=current_app.config.get("REPAIR_HORIZON_DAYS", 14))
+        query = query.filter(Shift.startTime < now + horizon)
+    else:
+        query = query.filter(Shift.shiftId.in_(shift_ids))
+    return query.order_by(Shift.startTime).all()
+
+def propose_repair(shift_ids=None, budget=None, exclude=()):
+    """
+    Reassignments covering the given open shifts (default: every open shift in the
+    next REPAIR_HORIZON_DAYS). Nothing is written; see apply_repair.
+    """
+    started = time.monotonic()
+    budget = current_app.config.get("REPAIR_TIME_BUDGET", 0.5) if budget is None else budget
+    deadline = started + budget
+    targets = _targets(shift_ids)
+    moves, uncovered, timed_out = [], [], False
+    if targets:
+        board = _Board(targets, set(exclude))
+        now = datetime.utcnow()
+        for shift in targets:
+            if time.monotonic() > deadline:
+                timed_out = True
+                uncovered.append(shift.shiftId)
+                continue
+            staff_id = _direct(board, shift)
+            if staff_id is not None:
+                board.move(shift.shiftId, shift.startTime, shift.endTime, shift.role, None, staff_id)
+                moves.append({"shiftId": shift.shiftId, "staffId": staff_id, "previousStaffId": None})
+                continue
+            chain = _two_step(board, shift, now, deadline)
+            if chain is None:
+                timed_out = time.monotonic() > deadline
+                uncovered.append(shift.shiftId)
+                continue
+            x, given_id, y = chain
+            start, end, role = board.held[x][given_id]
+            # hand-over first, so x is free when they take the open shift
+            board.move(given_id, start, end, role, x, y)
+            board.move(shift.shiftId, shift.startTime, shift.endTime, shift.role, None, x)
+            moves.append({"shiftId": given_id, "staffId": y, "previousStaffId": x})
+            moves.append({"shiftId": shift.shiftId, "staffId": x, "previousStaffId": None})
+    return {
+        "assignments": moves,
+        "uncovered": uncovered,
+        "changes": len(moves),
+        "timedOut": timed_out,
+        "elapsedMs": round((time.monotonic() - started) * 1000, 1)
+    }
+
+def apply_repair(plan):
+    """
+    Write a proposal. Each reassignment is a conditional UPDATE on the holder we
+    planned from; if any of them no longer matches, nothing is written.
+    """
+    spans = {}
+    for move in plan["assignments"]:
+        shift = db.session.get(Shift, move["shiftId"])
+        if shift is None:
+            return {"error": "Roster changed while repairing; try again", "conflict": True}
+        spans[move["shiftId"]] = (shift.startTime, shift.endTime)
+    db.session.rollback()
+
+    deltas = defaultdict(int)
+    for move in plan["assignments"]:
+        start, end = spans[move["shiftId"]]
+        previous = move["previousStaffId"]
+        holder = Shift.staffId.is_(None) if previous is None else Shift.staffId == previous
+        result = db.session.execute(
+            update(Shift)
+            .where(Shift.shiftId == move["shiftId"], holder, ~_overlaps(move["staffId"], start, end))
+            .values(staffId=move["staffId"], isOffered=False)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return {"error": "Roster changed while repairing; try again", "conflict": True}
+        for key, minutes in hours_controller.shift_deltas([(move["staffId"], start, end)]).items():
+            deltas[key] += minutes
+        for key, minutes in hours_controller.shift_deltas([(previous, start, end)], -1).items():
+            deltas[key] += minutes
+    hours_controller.add_minutes(deltas)
+    history_controller.record_shift_ids("shift.reassigned", [move["shiftId"] for move in plan["assignments"]])
+    db.session.commit()
+    for move in plan["assignments"]:
+        publish("shift.reassigned", staff_id=move["staffId"], shiftId=move["shiftId"],
+                previousStaffId=move["previousStaffId"])
+    return dict(plan, applied=True)
+
+def repair_shifts(shift_ids=None, apply=None, budget=None, exclude=()):
+    """Propose cover for open shifts and, when `apply` (default REPAIR_AUTO_APPLY), write it."""
+    plan = propose_repair(shift_ids, budget, exclude)
+    if apply is None:
+        apply = current_app.config.get("REPAIR_AUTO_APPLY", True)
+    if apply and plan["assignments"]:
+        return apply_repair(plan)
+    return dict(plan, applied=False)
+
+def unassign_future_shifts(staff_id):
+    """Open up every shift `staff_id` holds that hasn't started (callers commit); returns their ids."""
+    rows = db.session.execute(
+        select(Shift.shiftId, Shift.startTime, Shift.endTime)
+        .where(Shift.staffId == staff_id, Shift.startTime > datetime.utcnow())
+    ).all()
+    if rows:
+        db.session.execute(
+            update(Shift).where(Shift.shiftId.in_([r.shiftId for r in rows]))
+            .values(staffId=None, isOffered=False)
+            .execution_options(synchronize_session=False)
+        )
+        hours_controller.add_minutes(hours_controller.shift_deltas(
+            [(staff_id, r.startTime, r.endTime) for r in rows], -1
+        ))
+        history_controller.record_shift_ids("shift.unassigned", [r.shiftId for r in rows])
+    return [r.shiftId for r in rows]
+
+def call_off(staff_id, shift_id):
+    """
+    `staff_id` can't work their upcoming shift: open it up, then try to re-cover it.
+    A staff_id of None means whoever holds the shift (admins recording a call-off).
+    """
+    shift = db.session.get(Shift, shift_id)
+    if not shift or shift.staffId is None or staff_id not in (None, shift.staffId):
+        return {"error": "You have no upcoming shift with that id"}
+    staff_id, start, end = shift.staffId, shift.startTime, shift.endTime
+    result = db.session.execute(
+        update(Shift)
+        .where(Shift.shiftId == shift_id, Shift.staffId == staff_id, Shift.startTime > datetime.utcnow())
+        .values(staffId=None, isOffered=False)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return {"error": "You have no upcoming shift with that id"}
+    hours_controller.add_minutes(hours_controller.shift_deltas([(staff_id, start, end)], -1))
+    history_controller.record_shift_ids("shift.called_off", [shift_id])
+    db.session.commit()
+    publish("shift.called_off", staff_id=staff_id, shiftId=shift_id)
+    repair = repair_shifts([shift_id], exclude={staff_id})
+    return {"shift": db.session.get(Shift, shift_id).get_json(), "repair": repair}
@@ -0,0 +1,181 @@
+# App/controllers/report_controller.py
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Response, has_request_context, stream_with_context
+from sqlalchemy import select, insert, func, or_
+
+from App.database import db
+from App.models.user import User
+from App.models.shiftreport import ShiftReport, ShiftReportEntry
+from App.models.archive import ArchivedShiftReport, ArchivedShiftReportEntry
+from App.controllers import archive_controller
+
+BATCH = 1000
+REPORT_FORMATS = {"text": "text/plain", "json": "application/json", "csv": "text/csv"}
+CSV_FIELDS = ["staffId", "staffName", "shiftId", "shiftStart", "shiftEnd", "timeIn", "timeOut", "hoursWorked"]
+
+
+def _staff_names(staff_ids, known):
+    missing = [i for i in staff_ids if i is not None and i not in known]
+    if missing:
+        known.update(db.session.execute(select(User.userId, User.username).where(User.userId.in_(missing))).all())
+
+def create_report(roster_id):
+    """
+    Snapshot a roster's attendance into a report: a header row with totals plus
+    one entry row per attendance record, written in batches so memory stays flat
+    however big the roster is. Archived rosters get their report in the archive.
+    """
+    roster = archive_controller.find_roster(roster_id)
+    if not roster:
+        return {"error": "Roster not found"}
+    shift_model, attendance_model, report_model = archive_controller.models_for(roster)
+    entry_model = ArchivedShiftReportEntry if report_model is ArchivedShiftReport else ShiftReportEntry
+
+    report = report_model(rosterId=roster.rosterId, weekStartDate=roster.weekStartDate,
+                          weekEndDate=roster.weekEndDate, generatedAt=datetime.utcnow())
+    db.session.add(report)
+    db.session.flush()
+    owner = {"archiveId": report.archiveId} if entry_model is ArchivedShiftReportEntry else {"reportId": report.reportId}
+
+    rows = db.session.execute(
+        select(attendance_model.staffId, attendance_model.shiftId, attendance_model.timeIn, attendance_model.timeOut,
+               shift_model.startTime, shift_model.endTime)
+        .join(shift_model, shift_model.shiftId == attendance_model.shiftId)
+        .where(shift_model.rosterId == roster.rosterId)
+        .order_by(attendance_model.recordId)
+        .execution_options(yield_per=BATCH)
+    )
+    names, staff, total_shifts, total_hours = {}, set(), 0, 0.0
+    for batch in rows.partitions():
+        _staff_names({r.staffId for r in batch}, names)
+        entries = []
+        for staff_id, shift_id, time_in, time_out, start, end in batch:
+            hours = (time_out - time_in).total_seconds() / 3600 if time_in and time_out else None
+            name = names.get(staff_id, "Unknown Staff")
+            staff.add(name)
+            total_shifts += 1
+            total_hours += hours or 0
+            entries.append(dict(owner, staffId=staff_id, staffName=name, shiftId=shift_id, shiftStart=start,
+                                shiftEnd=end, timeIn=time_in, timeOut=time_out, hoursWorked=hours))
+        db.session.execute(insert(entry_model), entries)
+
+    report.totalShifts = total_shifts
+    report.totalStaff = len(staff)
+    report.totalHours = round(total_hours, 2)
+    report.summary = f"Report covers {len(staff)} staff and {total_shifts} shifts."
+    db.session.commit()
+    return report
+
+def find_report(report_id, archived=False):
+    """A report by reportId (hot, or archived with its roster), or by archiveId when `archived`."""
+    if archived:
+        return db.session.get(ArchivedShiftReport, report_id)
+    return db.session.get(ShiftReport, report_id) or ArchivedShiftReport.query.filter_by(reportId=report_id).first()
+
+def _entry_filter(report):
+    if isinstance(report, ArchivedShiftReport):
+        match = ArchivedShiftReportEntry.archiveId == report.archiveId
+        if report.reportId is not None:
+            match = or_(match, ArchivedShiftReportEntry.reportId == report.reportId)
+        return ArchivedShiftReportEntry, match
+    return ShiftReportEntry, ShiftReportEntry.reportId == report.reportId
+
+def _entries(report):
+    model, match = _entry_filter(report)
+    rows = db.session.execute(
+        select(*(getattr(model, f) for f in CSV_FIELDS)).where(match)
+        .order_by(model.entryId if model is ShiftReportEntry else model.archivedEntryId)
+        .execution_options(yield_per=BATCH)
+    )
+    for batch in rows.partitions():
+        yield from batch
+
+def _staff_hours(report):
+    """[(staffName, hours)] in order of first appearance, summed by the database."""
+    model, match = _entry_filter(report)
+    first = func.min(model.entryId if model is ShiftReportEntry else model.archivedEntryId)
+    return db.session.execute(
+        select(model.staffName, func.coalesce(func.sum(model.hoursWorked), 0.0))
+        .where(match).group_by(model.staffName).order_by(first)
+    ).all()
+
+def _fmt(ts):
+    return ts.strftime("%Y-%m-%d %H:%M") if ts else "N/A"
+
+def _chunked(lines, size=500):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+def _text_lines(report):
+    has_entries = report.totalShifts is not None
+    if not has_entries:
+        # reports generated before entries existed only have their stored text
+        yield report.summary or ""
+        return
+    yield "Shift Report\n"
+    yield "+--------------------------------------+\n"
+    yield f" Week: {report.weekStartDate} → {report.weekEndDate}\n"
+    yield "+--------------------------------------+\n\n"
+    for entry in _entries(report):
+        shift_info = f"{entry.shiftStart} → {entry.shiftEnd}" if entry.shiftStart else "No shift info"
+        hours_text = f"{entry.hoursWorked:.2f} hrs" if entry.hoursWorked is not None else "Incomplete (No time in/out)"
+        yield (f"Staff: {entry.staffName}\n"
+               f" Shift: {shift_info}\n"
+               f" Time In: {_fmt(entry.timeIn)} | Time Out: {_fmt(entry.timeOut)}\n"
+               f" Hours Worked: {hours_text}\n"
+               "----------------------------------------\n")
+    yield "\nSummary of Hours Worked (per staff):\n"
+    for name, hours in _staff_hours(report):
+        yield f" {name}: {hours:.2f} hrs\n"
+    yield "\nOverall Summary:\n"
+    yield f" Total Shifts: {report.totalShifts}\n"
+    yield f" Total Staff: {report.totalStaff}\n"
+    yield f" Total Hours Worked: {report.totalHours:.2f} hrs"
+
+def _json_lines(report):
+    header = json.dumps(report.get_json(), separators=(",", ":"))
+    yield header[:-1] + ',"entries":['
+    for i, entry in enumerate(_entries(report)):
+        row = {f: (v.isoformat() if isinstance(v, datetime) else v) for f, v in zip(CSV_FIELDS, entry)}
+        yield ("," if i else "") + json.dumps(row, separators=(",", ":"))
+    staff = [{"staffName": name, "hoursWorked": round(hours, 2)} for name, hours in _staff_hours(report)]
+    yield '],"staff":' + json.dumps(staff, separators=(",", ":")) + "}"
+
+def _csv_lines(report):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for entry in _entries(report):
+        writer.writerow(["" if v is None else (v.isoformat() if isinstance(v, datetime) else v) for v in entry])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+def render_report(report, fmt="text"):
+    """Generator of text chunks rendering `report` as text, json or csv."""
+    lines = {"text": _text_lines, "json": _json_lines, "csv": _csv_lines}[fmt](report)
+    return _chunked(lines)
+
+def report_response(report, fmt="text", status=200):
+    """Streaming response for a stored report (the body is rendered while it is sent)."""
+    if fmt not in REPORT_FORMATS:
+        return {"error": f"format must be one of {', '.join(REPORT_FORMATS)}"}
+    body = render_report(report, fmt)
+    if has_request_context():
+        body = stream_with_context(body)
+    headers = {}
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="shift-report-{report.weekStartDate}.csv"'
+    return Response(body, status=status, mimetype=REPORT_FORMATS[fmt], headers=headers)
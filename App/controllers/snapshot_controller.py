@@ -0,0 +1,157 @@
+# App/controllers/snapshot_controller.py
+import gzip
+import json
+from datetime import datetime, date, time
+
+from sqlalchemy import text, types
+
+from App.database import db
+
+SNAPSHOT_FORMAT = "rostering-snapshot"
+SNAPSHOT_VERSION = 1
+
+_PARSERS = {datetime: datetime.fromisoformat, date: date.fromisoformat, time: time.fromisoformat}
+
+
+def _bind_name(bind_key):
+    return bind_key or "default"
+
+def _encode(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+def _decoder(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if python_type is bytes:
+        return bytes.fromhex
+    return _PARSERS.get(python_type)
+
+def _sqlite_datetime(value):
+    # SQLAlchemy stores SQLite datetimes/times as text with a space separator and microseconds
+    value = value.replace("T", " ")
+    return value if "." in value else value + ".000000"
+
+def _sqlite_storage(column, dialect):
+    """
+    Converter from the snapshot's ISO text straight to SQLite's storage value,
+    or False when the column type needs SQLAlchemy's own bind processing.
+    """
+    if isinstance(column.type, (types.DateTime, types.Time)):
+        return _sqlite_datetime
+    if isinstance(column.type, types.Date):
+        return None
+    if isinstance(column.type, types.LargeBinary):
+        return bytes.fromhex
+    if column.type.bind_processor(dialect) is None:
+        return None
+    return False
+
+def _insert_raw(conn, table, names, rows):
+    """
+    SQLite fast path: convert columns in place and hand plain tuples to executemany,
+    skipping per-value type processing. Returns False if the table can't use it.
+    """
+    converters = [_sqlite_storage(table.columns[name], conn.dialect) for name in names]
+    if any(c is False for c in converters):
+        return False
+    converters = [(i, fn) for i, fn in enumerate(converters) if fn]
+    for row in rows:
+        for i, fn in converters:
+            if row[i] is not None:
+                row[i] = fn(row[i])
+    columns = ", ".join(f'"{name}"' for name in names)
+    marks = ", ".join("?" for _ in names)
+    conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({columns}) VALUES ({marks})', [tuple(r) for r in rows])
+    return True
+
+def save_snapshot(path):
+    """
+    Write every table of every bind to a gzipped JSON file.
+    Rows are stored as positional lists under a per-table column header.
+    """
+    binds = {}
+    counts = {}
+    for bind_key, metadata in db.metadatas.items():
+        engine = db.engines[bind_key]
+        tables = {}
+        with engine.connect() as conn:
+            for table in metadata.sorted_tables:
+                columns = [c.name for c in table.columns]
+                rows = [[_encode(v) for v in row] for row in conn.execute(table.select())]
+                tables[table.name] = {"columns": columns, "rows": rows}
+                counts[table.name] = len(rows)
+        binds[_bind_name(bind_key)] = tables
+
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "createdAt": datetime.utcnow().isoformat(),
+        "binds": binds
+    }
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as fh:
+        json.dump(payload, fh, separators=(",", ":"))
+    return counts
+
+def read_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        payload = json.load(fh)
+    if payload.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not a rostering snapshot")
+    if payload.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {payload.get('version')} (expected {SNAPSHOT_VERSION})")
+    return payload
+
+def _reset_sequences(conn, table):
+    # explicit ids don't advance Postgres sequences; SQLite needs nothing here
+    if conn.dialect.name != "postgresql":
+        return
+    for column in table.primary_key.columns:
+        if column.autoincrement is True or (column.autoincrement == "auto" and column.type.python_type is int):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{column.name}'), "
+                f"COALESCE((SELECT MAX(\"{column.name}\") FROM \"{table.name}\"), 0) + 1, false)"
+            ))
+
+def load_snapshot(path):
+    """
+    Replace the contents of every table with the snapshot, one transaction per bind.
+    Columns added since the snapshot was taken fall back to their defaults.
+    """
+    payload = read_snapshot(path)
+    db.session.remove()
+    db.create_all()
+
+    counts = {}
+    for bind_key, metadata in db.metadatas.items():
+        tables = payload["binds"].get(_bind_name(bind_key), {})
+        with db.engines[bind_key].begin() as conn:
+            for table in reversed(metadata.sorted_tables):
+                conn.execute(table.delete())
+            for table in metadata.sorted_tables:
+                dumped = tables.get(table.name)
+                if not dumped or not dumped["rows"]:
+                    continue
+                unknown = set(dumped["columns"]) - set(table.columns.keys())
+                if unknown:
+                    raise ValueError(f"Snapshot has columns not in {table.name}: {sorted(unknown)}")
+                counts[table.name] = len(dumped["rows"])
+                if conn.dialect.name == "sqlite" and _insert_raw(conn, table, dumped["columns"], dumped["rows"]):
+                    continue
+                decoders = [(i, _decoder(table.columns[name])) for i, name in enumerate(dumped["columns"])]
+                decoders = [(i, fn) for i, fn in decoders if fn]
+                names = dumped["columns"]
+                rows = []
+                for row in dumped["rows"]:
+                    for i, fn in decoders:
+                        if row[i] is not None:
+                            row[i] = fn(row[i])
+                    rows.append(dict(zip(names, row)))
+                conn.execute(table.insert(), rows)
+                _reset_sequences(conn, table)
+    return counts
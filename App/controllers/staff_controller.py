@@ -1,11 +1,18 @@
 # App/controllers/staff_controller.py
+from sqlalchemy.orm import selectinload
+
 from App.database import db
 from App.models.staff import Staff
 from App.models.shift import Shift
 from App.models.roster import Roster
 from App.models.attendance import AttendanceRecord
+from App.controllers import archive_controller
+from App.events import publish
 from datetime import datetime, date, timedelta
 
+MAX_RANGE_WEEKS = 26
+COMPACT_SHIFT_FIELDS = ["shiftId", "staffId", "role", "startTime", "endTime"]
+
 def get_profile(staff_id):
     staff = Staff.query.get(staff_id)
     return staff.get_json() if staff else {"error": "Staff not found"}
@@ -13,16 +20,68 @@ def get_profile(staff_id):
 def view_roster(week_start):
     if week_start:
         ws = date.fromisoformat(week_start)
-        roster = Roster.query.filter_by(weekStartDate=ws).first()
+        roster = archive_controller.find_roster_by_week(ws)
     else:
         today = date.today()
         ws = today - timedelta(days=today.weekday())
-        roster = Roster.query.filter_by(weekStartDate=ws).first()
+        roster = Roster.query.filter_by(weekStartDate=ws).options(selectinload(Roster.shifts)).first()
 
     if not roster:
         return {"error": "No roster found"}
     return roster.get_json()
 
+def view_roster_range(date_from, date_to, compact=False):
+    """
+    Return every roster (and its shifts) whose week falls in [date_from, date_to],
+    grouped by week, using a single joined range query (plus one against the
+    archive when the range starts before the oldest hot week).
+    In compact mode shifts are positional rows described once by "fields".
+    """
+    try:
+        start = date.fromisoformat(date_from)
+        end = date.fromisoformat(date_to) if date_to else start + timedelta(days=6)
+    except (TypeError, ValueError):
+        return {"error": "from/to must be YYYY-MM-DD dates"}
+    start = start - timedelta(days=start.weekday())
+    if end < start:
+        return {"error": "'to' is before 'from'"}
+    if (end - start).days // 7 >= MAX_RANGE_WEEKS:
+        return {"error": f"Range is limited to {MAX_RANGE_WEEKS} weeks"}
+
+    rows = db.session.execute(
+        db.select(Roster, Shift)
+        .outerjoin(Shift, Shift.rosterId == Roster.rosterId)
+        .where(Roster.weekStartDate >= start, Roster.weekStartDate <= end)
+        .order_by(Roster.weekStartDate, Shift.startTime)
+    ).all()
+    if archive_controller.reaches_archive(start):
+        rows = archive_controller.archived_rosters_with_shifts(start, end) + rows
+
+    weeks = {}
+    for roster, shift in rows:
+        week = weeks.setdefault(roster.weekStartDate, {
+            "weekStartDate": roster.weekStartDate.isoformat(),
+            "weekEndDate": roster.weekEndDate.isoformat(),
+            "rosterIds": [],
+            "shifts": []
+        })
+        if roster.rosterId not in week["rosterIds"]:
+            week["rosterIds"].append(roster.rosterId)
+        if shift is None:
+            continue
+        if compact:
+            week["shifts"].append([
+                shift.shiftId, shift.staffId, shift.role,
+                shift.startTime.isoformat(), shift.endTime.isoformat()
+            ])
+        else:
+            week["shifts"].append(shift.get_json())
+
+    result = {"from": start.isoformat(), "to": end.isoformat(), "weeks": list(weeks.values())}
+    if compact:
+        result["fields"] = COMPACT_SHIFT_FIELDS
+    return result
+
 def view_my_shifts(staff_id):
     shifts = Shift.query.filter_by(staffId=staff_id).order_by(Shift.startTime).all()
     return [s.get_json() for s in shifts]
@@ -32,6 +91,7 @@ def time_in(staff_id, shift_id, timestamp):
     record = AttendanceRecord.get_or_create(staff_id, shift_id)
     record.markTimeIn(ts)
     db.session.commit()
+    publish("attendance.time_in", staff_id=staff_id, shiftId=shift_id, at=ts)
     return {"message": "Timed in", "timeIn": ts.isoformat()}
 
 def time_out(staff_id, shift_id, timestamp):
@@ -39,4 +99,5 @@ def time_out(staff_id, shift_id, timestamp):
     record = AttendanceRecord.get_or_create(staff_id, shift_id)
     record.markTimeOut(ts)
     db.session.commit()
+    publish("attendance.time_out", staff_id=staff_id, shiftId=shift_id, at=ts)
     return {"message": "Timed out", "timeOut": ts.isoformat()}
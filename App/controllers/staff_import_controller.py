@@ -0,0 +1,169 @@
+# App/controllers/staff_import_controller.py
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import insert, select, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from App.database import db
+from App.models.user import User
+from App.models.staff import Staff
+from App.models.location import Location
+from App.locations import current_location
+from App.controllers import history_controller
+
+REQUIRED_COLUMNS = ("username", "email", "password")
+EXPORT_COLUMNS = ["userId", "username", "email", "role", "locationId", "maxWeeklyHours", "maxDailyHours"]
+IMPORT_BATCH = 500
+
+
+def _hours(row, column):
+    value = (row.get(column) or "").strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{column} must be a number")
+    if number <= 0:
+        raise ValueError(f"{column} must be positive")
+    return number
+
+def _validate(row, locations):
+    """The Staff insert values for one CSV row; raises ValueError with the reason."""
+    username = (row.get("username") or "").strip()
+    email = (row.get("email") or "").strip()
+    password = row.get("password") or ""
+    role = (row.get("role") or "").strip() or None
+    if not username or not email or not password:
+        raise ValueError("username, email and password are required")
+    if len(username) > 120 or len(email) > 120 or (role and len(role) > 50):
+        raise ValueError("username/email must be at most 120 characters and role at most 50")
+    if "@" not in email:
+        raise ValueError(f"invalid email {email!r}")
+    location = (row.get("locationId") or "").strip()
+    if location and not location.isdigit():
+        raise ValueError("locationId must be a location id")
+    if location and int(location) not in locations:
+        raise ValueError(f"unknown location {location}")
+    return {
+        "username": username, "usernameLower": username.lower(),
+        "email": email, "emailLower": email.lower(),
+        "password": password, "role": role, "type": "staff",
+        "maxWeeklyHours": _hours(row, "maxWeeklyHours"), "maxDailyHours": _hours(row, "maxDailyHours"),
+        "locationId": int(location) if location else current_location()
+    }
+
+def _taken(rows):
+    """Lowercased usernames and emails in `rows` that already belong to a user."""
+    names = [r["usernameLower"] for r in rows]
+    emails = [r["emailLower"] for r in rows]
+    found = db.session.execute(
+        select(User.usernameLower, User.emailLower)
+        .where(or_(User.usernameLower.in_(names), User.emailLower.in_(emails)))
+    ).all()
+    return {n for n, _ in found}, {e for _, e in found}
+
+def _insert(batch, errors):
+    """Insert hashed rows in one statement; on a uniqueness race, fall back to row by row."""
+    try:
+        db.session.execute(insert(Staff), [row for _, row in batch])
+        history_controller.record_staff_names("staff.imported", [row["usernameLower"] for _, row in batch])
+        db.session.commit()
+        return len(batch)
+    except IntegrityError:
+        db.session.rollback()
+    inserted = 0
+    for line, row in batch:
+        try:
+            db.session.execute(insert(Staff), [row])
+            history_controller.record_staff_names("staff.imported", [row["usernameLower"]])
+            db.session.commit()
+            inserted += 1
+        except IntegrityError:
+            db.session.rollback()
+            errors.append({"line": line, "username": row["username"], "error": "username or email already exists"})
+    return inserted
+
+def _hash(executor, workers, passwords):
+    if executor is None:
+        return [generate_password_hash(p) for p in passwords]
+    chunk = max(1, len(passwords) // (workers * 4))
+    return list(executor.map(generate_password_hash, passwords, chunksize=chunk))
+
+def _flush(pending, executor, workers, errors, dry_run):
+    """Check a batch against existing users, hash and insert it; returns (inserted, valid)."""
+    names, emails = _taken([r for _, r in pending])
+    batch = []
+    for line, row in pending:
+        if row["usernameLower"] in names or row["emailLower"] in emails:
+            errors.append({"line": line, "username": row["username"], "error": "username or email already exists"})
+        else:
+            batch.append((line, row))
+    if dry_run or not batch:
+        return 0, len(batch)
+    hashes = _hash(executor, workers, [row.pop("password") for _, row in batch])
+    for (_, row), hashed in zip(batch, hashes):
+        row["passwordHash"] = hashed
+    return _insert(batch, errors), len(batch)
+
+def import_staff(stream, batch_size=IMPORT_BATCH, workers=None, dry_run=False):
+    """
+    Add staff from a CSV with username,email,password[,role,locationId,maxWeeklyHours,maxDailyHours].
+    Rows are validated as they are read, passwords for each batch are hashed across
+    a process pool (`workers` processes, default one per core; 1 hashes inline),
+    and each batch is inserted in its own transaction. Bad rows are skipped and
+    reported by line number; the rest are imported.
+    """
+    reader = csv.DictReader(stream)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        return {"error": f"CSV is missing columns: {', '.join(missing)}"}
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+    errors, seen_names, seen_emails = [], set(), set()
+    locations = set(db.session.scalars(select(Location.locationId)))
+    imported = valid = 0
+    pending = []
+    try:
+        # line 1 is the header
+        for line, raw in enumerate(reader, start=2):
+            try:
+                row = _validate(raw, locations)
+            except ValueError as e:
+                errors.append({"line": line, "username": raw.get("username"), "error": str(e)})
+                continue
+            if row["usernameLower"] in seen_names or row["emailLower"] in seen_emails:
+                errors.append({"line": line, "username": row["username"], "error": "duplicate in file"})
+                continue
+            seen_names.add(row["usernameLower"])
+            seen_emails.add(row["emailLower"])
+            pending.append((line, row))
+            if len(pending) >= batch_size:
+                done, ok = _flush(pending, executor, workers, errors, dry_run)
+                imported, valid, pending = imported + done, valid + ok, []
+        if pending:
+            done, ok = _flush(pending, executor, workers, errors, dry_run)
+            imported, valid = imported + done, valid + ok
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    errors.sort(key=lambda e: e["line"])
+    return {"imported": imported, "valid": valid, "failed": len(errors), "errors": errors, "dryRun": dry_run}
+
+def export_staff(stream, batch_size=IMPORT_BATCH):
+    """Write every staff member as CSV (no password hashes), streaming from the database."""
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_COLUMNS)
+    rows = db.session.execute(
+        select(*(getattr(Staff, c) for c in EXPORT_COLUMNS)).order_by(Staff.userId)
+        .execution_options(yield_per=batch_size)
+    )
+    count = 0
+    for batch in rows.partitions():
+        writer.writerows(["" if v is None else v for v in row] for row in batch)
+        count += len(batch)
+    return count
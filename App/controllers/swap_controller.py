@@ -0,0 +1,176 @@
+# App/controllers/swap_controller.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, select, exists, and_, or_
+from sqlalchemy.orm import aliased
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.events import publish
+from App.controllers import hours_controller, history_controller
+
+# bounds the (staffId, startTime) index scan in overlap checks
+MAX_SHIFT_LENGTH = timedelta(hours=24)
+CANDIDATE_LIMIT = 50
+
+
+def _overlaps(staff_id, start, end, exclude_id=None):
+    """SQL condition: `staff_id` already works a shift overlapping [start, end)."""
+    other = aliased(Shift)
+    conditions = [other.staffId == staff_id, other.startTime < end, other.endTime > start]
+    if isinstance(start, datetime):
+        conditions.append(other.startTime > start - MAX_SHIFT_LENGTH)
+    if exclude_id is not None:
+        conditions.append(other.shiftId != exclude_id)
+    return exists().where(*conditions)
+
+def _role_matches(shift_role, staff_role):
+    return shift_role is None or shift_role == staff_role
+
+def list_open_shifts(staff_id=None, limit=100):
+    """
+    Upcoming shifts nobody holds, plus shifts their holder has offered.
+    With `staff_id`, only those that person could actually take.
+    """
+    query = select(Shift).where(
+        Shift.startTime > datetime.utcnow(),
+        or_(Shift.staffId.is_(None), Shift.isOffered.is_(True))
+    )
+    if staff_id is not None:
+        staff = db.session.get(Staff, staff_id)
+        if not staff:
+            return {"error": "Staff not found"}
+        query = query.where(
+            or_(Shift.staffId.is_(None), Shift.staffId != staff_id),
+            or_(Shift.role.is_(None), Shift.role == staff.role),
+            ~_overlaps(staff_id, Shift.startTime, Shift.endTime)
+        )
+    shifts = db.session.scalars(query.order_by(Shift.startTime).limit(limit)).all()
+    return [s.get_json() for s in shifts]
+
+def find_candidates(shift_id, limit=CANDIDATE_LIMIT):
+    """Staff with the shift's role (if it has one) who are free for its whole span."""
+    shift = db.session.get(Shift, shift_id)
+    if not shift:
+        return {"error": "Shift not found"}
+    query = select(Staff).where(~_overlaps(Staff.userId, shift.startTime, shift.endTime))
+    if shift.role:
+        query = query.where(Staff.role == shift.role)
+    if shift.staffId is not None:
+        query = query.where(Staff.userId != shift.staffId)
+    staff = db.session.scalars(query.order_by(Staff.userId).limit(limit)).all()
+    return [dict(s.get_json(), role=s.role) for s in staff]
+
+def set_offered(staff_id, shift_id, offered=True):
+    """Put one of your own upcoming shifts up for grabs (or take it back)."""
+    result = db.session.execute(
+        update(Shift)
+        .where(Shift.shiftId == shift_id, Shift.staffId == staff_id, Shift.startTime > datetime.utcnow())
+        .values(isOffered=offered)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return {"error": "You have no upcoming shift with that id"}
+    history_controller.record_shift_ids("shift.offered" if offered else "shift.offer_withdrawn", [shift_id])
+    db.session.commit()
+    publish("shift.offered" if offered else "shift.offer_withdrawn", staff_id=staff_id, shiftId=shift_id)
+    return db.session.get(Shift, shift_id).get_json()
+
+def claim_shift(staff_id, shift_id):
+    """
+    Take an open or offered shift. The UPDATE only matches while the shift still
+    has the holder we just read, so when many people claim at once exactly one
+    statement changes a row; everyone else gets "conflict".
+    """
+    staff = db.session.get(Staff, staff_id)
+    shift = db.session.get(Shift, shift_id)
+    if not staff or not shift:
+        return {"error": "Shift not found"}
+    holder, start, end = shift.staffId, shift.startTime, shift.endTime
+    if holder == staff_id:
+        return {"error": "This is already your shift"}
+    if holder is not None and not shift.isOffered:
+        return {"error": "Shift is not open", "conflict": True}
+    if start <= datetime.utcnow():
+        return {"error": "Shift has already started"}
+    if not _role_matches(shift.role, staff.role):
+        return {"error": f"Shift needs role {shift.role}"}
+    error = hours_controller.check_caps(staff, start, end)
+    if error:
+        return error
+    db.session.rollback()  # don't hold the read snapshot across the write
+
+    expected = Shift.staffId.is_(None) if holder is None else and_(Shift.staffId == holder, Shift.isOffered.is_(True))
+    result = db.session.execute(
+        update(Shift)
+        .where(Shift.shiftId == shift_id, expected, ~_overlaps(staff_id, start, end))
+        .values(staffId=staff_id, isOffered=False)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return {"error": "Shift was taken by someone else or clashes with your shifts", "conflict": True}
+    deltas = hours_controller.shift_deltas([(staff_id, start, end)])
+    deltas.update(hours_controller.shift_deltas([(holder, start, end)], -1))
+    hours_controller.add_minutes(deltas)
+    history_controller.record_shift_ids("shift.claimed", [shift_id])
+    db.session.commit()
+    publish("shift.claimed", staff_id=staff_id, shiftId=shift_id, previousStaffId=holder)
+    return db.session.get(Shift, shift_id).get_json()
+
+def swap_shift(staff_id, shift_id, with_shift_id):
+    """
+    Trade your shift `shift_id` for `with_shift_id`, which its holder has offered.
+    Both reassignments are conditional UPDATEs in one transaction; if either no
+    longer matches, nothing changes.
+    """
+    staff = db.session.get(Staff, staff_id)
+    mine = db.session.get(Shift, shift_id)
+    theirs = db.session.get(Shift, with_shift_id)
+    if not staff or not mine or not theirs:
+        return {"error": "Shift not found"}
+    if mine.staffId != staff_id:
+        return {"error": "You can only swap your own shift"}
+    other_id = theirs.staffId
+    if other_id is None or other_id == staff_id or not theirs.isOffered:
+        return {"error": "That shift is not offered for swapping", "conflict": True}
+    other = db.session.get(Staff, other_id)
+    if not _role_matches(theirs.role, staff.role) or not _role_matches(mine.role, other.role if other else None):
+        return {"error": "Roles don't allow this swap"}
+    now = datetime.utcnow()
+    if mine.startTime <= now or theirs.startTime <= now:
+        return {"error": "Shift has already started"}
+    error = (hours_controller.check_caps(staff, theirs.startTime, theirs.endTime, exclude_id=shift_id)
+             or (other and hours_controller.check_caps(other, mine.startTime, mine.endTime, exclude_id=with_shift_id)))
+    if error:
+        return error
+    mine_span, theirs_span = (mine.startTime, mine.endTime), (theirs.startTime, theirs.endTime)
+    db.session.rollback()
+
+    took = db.session.execute(
+        update(Shift)
+        .where(Shift.shiftId == with_shift_id, Shift.staffId == other_id, Shift.isOffered.is_(True),
+               ~_overlaps(staff_id, *theirs_span, exclude_id=shift_id))
+        .values(staffId=staff_id, isOffered=False)
+        .execution_options(synchronize_session=False)
+    )
+    gave = db.session.execute(
+        update(Shift)
+        .where(Shift.shiftId == shift_id, Shift.staffId == staff_id,
+               ~_overlaps(other_id, *mine_span, exclude_id=with_shift_id))
+        .values(staffId=other_id, isOffered=False)
+        .execution_options(synchronize_session=False)
+    )
+    if took.rowcount != 1 or gave.rowcount != 1:
+        db.session.rollback()
+        return {"error": "Shift was taken by someone else or clashes with existing shifts", "conflict": True}
+    deltas = hours_controller.shift_deltas([(staff_id, *theirs_span), (other_id, *mine_span)])
+    for key, minutes in hours_controller.shift_deltas([(staff_id, *mine_span), (other_id, *theirs_span)], -1).items():
+        deltas[key] += minutes
+    hours_controller.add_minutes(deltas)
+    history_controller.record_shift_ids("shift.swapped", [shift_id, with_shift_id])
+    db.session.commit()
+    publish("shift.swapped", staff_id=staff_id, shiftId=shift_id, withShiftId=with_shift_id, otherStaffId=other_id)
+    return {"shift": db.session.get(Shift, with_shift_id).get_json(),
+            "gaveAway": db.session.get(Shift, shift_id).get_json()}
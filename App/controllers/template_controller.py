@@ -0,0 +1,334 @@
+# App/controllers/template_controller.py
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from itertools import islice
+
+from sqlalchemy import insert, select, func, literal, exists, and_, or_
+from sqlalchemy.orm import aliased
+
+from App.database import db
+from App.models.roster import Roster
+from App.models.shift import Shift
+from App.models.shifttemplate import ShiftTemplate
+from App.models.staff import Staff
+from App.models.staffhours import StaffHours
+from App.events import publish
+from App.controllers import hours_controller, history_controller
+from App.controllers.swap_controller import MAX_SHIFT_LENGTH
+from App.controllers.archive_controller import _chunks
+
+
+def week_start_of(day):
+    return day - timedelta(days=day.weekday())
+
+def create_template(data):
+    try:
+        weekday = int(data.get("weekday"))
+        start = datetime.strptime(data.get("start"), "%H:%M").time()
+        if data.get("durationMinutes") is not None:
+            duration = int(data.get("durationMinutes"))
+        else:
+            duration = int(float(data.get("durationHours")) * 60)
+        effective_from = date.fromisoformat(data["effectiveFrom"]) if data.get("effectiveFrom") else date.today()
+        effective_to = date.fromisoformat(data["effectiveTo"]) if data.get("effectiveTo") else None
+    except (TypeError, ValueError):
+        return {"error": "weekday, start (HH:MM) and durationMinutes/durationHours are required"}
+
+    if not 0 <= weekday <= 6 or duration <= 0:
+        return {"error": "weekday must be 0-6 and duration must be positive"}
+    if not data.get("staffId") and not data.get("role"):
+        return {"error": "A template needs a staffId or a role"}
+    if effective_to and effective_to < effective_from:
+        return {"error": "effectiveTo is before effectiveFrom"}
+
+    template = ShiftTemplate(
+        weekday=weekday,
+        startTime=start,
+        durationMinutes=duration,
+        staffId=data.get("staffId"),
+        role=data.get("role"),
+        effectiveFrom=effective_from,
+        effectiveTo=effective_to
+    )
+    db.session.add(template)
+    db.session.commit()
+    return template.get_json()
+
+def list_templates():
+    return [t.get_json() for t in ShiftTemplate.query.order_by(ShiftTemplate.templateId).all()]
+
+def _active_templates(first_week, last_day):
+    return ShiftTemplate.query.filter(
+        ShiftTemplate.effectiveFrom <= last_day,
+        or_(ShiftTemplate.effectiveTo.is_(None), ShiftTemplate.effectiveTo >= first_week)
+    ).order_by(ShiftTemplate.templateId).all()
+
+def expand_templates(start, weeks, templates=None):
+    """
+    Lazily yield (template, start, end) for every occurrence in `weeks` weeks from `start`.
+    Nothing is written; callers can stop early (e.g. with islice) for previews.
+    """
+    first_week = week_start_of(start)
+    if templates is None:
+        templates = _active_templates(first_week, first_week + timedelta(weeks=weeks, days=-1))
+    for w in range(weeks):
+        week = first_week + timedelta(weeks=w)
+        for template in templates:
+            occurrence = template.occurrence(week)
+            if occurrence and occurrence[0].date() >= start:
+                yield template, occurrence[0], occurrence[1]
+
+def preview_templates(start=None, weeks=1, limit=200):
+    start = start or date.today()
+    return [
+        {
+            "templateId": t.templateId,
+            "staffId": t.staffId,
+            "role": t.role,
+            "startTime": s.isoformat(),
+            "endTime": e.isoformat()
+        }
+        for t, s, e in islice(expand_templates(start, weeks), limit)
+    ]
+
+def _shift_keys(staff_id, template_id, start, end):
+    # a shift counts as existing if the same template already produced it,
+    # or if the same person is already booked for exactly that slot
+    keys = []
+    if template_id:
+        keys.append(("template", template_id, start))
+    if staff_id:
+        keys.append(("staff", staff_id, start, end))
+    return keys
+
+def _ensure_rosters(weeks):
+    """Return {weekStartDate: rosterId} for the given weeks, bulk-inserting missing rosters."""
+    rows = db.session.execute(
+        select(Roster.weekStartDate, Roster.rosterId)
+        .where(Roster.weekStartDate.in_(weeks))
+        .order_by(Roster.rosterId)
+    ).all()
+    rosters = {}
+    for week, roster_id in rows:
+        rosters.setdefault(week, roster_id)
+    missing = [w for w in weeks if w not in rosters]
+    if missing:
+        db.session.execute(insert(Roster), [
+            {"weekStartDate": w, "weekEndDate": w + timedelta(days=6)} for w in missing
+        ])
+        rows = db.session.execute(
+            select(Roster.weekStartDate, Roster.rosterId).where(Roster.weekStartDate.in_(missing))
+        ).all()
+        for week, roster_id in rows:
+            rosters.setdefault(week, roster_id)
+    return rosters
+
+class _CapTracker:
+    """Weekly/daily minutes per person over the materialized range, seeded from the running totals."""
+
+    def __init__(self, weeks, existing_shifts):
+        self.weekly = {(r.staffId, r.weekStartDate): r.minutes for r in
+                       StaffHours.query.filter(StaffHours.weekStartDate.in_(weeks))}
+        self.daily = defaultdict(int)
+        for staff_id, start, end in existing_shifts:
+            if staff_id is not None:
+                self.daily[(staff_id, start.date())] += hours_controller.shift_minutes(start, end)
+        self.caps = {}
+
+    def take(self, staff, start, end):
+        """Book the minutes if they fit under the person's caps; False if they don't."""
+        if staff.userId not in self.caps:
+            self.caps[staff.userId] = hours_controller.caps_for(staff)
+        weekly, daily = self.caps[staff.userId]
+        minutes = hours_controller.shift_minutes(start, end)
+        week_key = (staff.userId, hours_controller.week_of(start))
+        day_key = (staff.userId, start.date())
+        if self.weekly.get(week_key, 0) + minutes > weekly * 60 or self.daily[day_key] + minutes > daily * 60:
+            return False
+        self.weekly[week_key] = self.weekly.get(week_key, 0) + minutes
+        self.daily[day_key] += minutes
+        return True
+
+def _insert_shifts(batch):
+    # a Core insert: RETURNING stays batched, where the ORM bulk path goes row by row
+    table = Shift.__table__
+    ids = db.session.scalars(insert(table).returning(table.c.shiftId), batch).all()
+    history_controller.record_shift_ids("shift.materialized", ids)
+    return len(ids)
+
+def materialize_templates(weeks, start=None, batch_size=1000):
+    """
+    Turn templates into Roster/Shift rows for `weeks` weeks from `start` (default today).
+    Occurrences that already exist as shifts are skipped, so running this twice is a no-op.
+    Occurrences that would push someone over their hour caps are left out and counted.
+    """
+    start = start or date.today()
+    first_week = week_start_of(start)
+    range_start = datetime.combine(first_week, datetime.min.time())
+    range_end = range_start + timedelta(weeks=weeks)
+    week_starts = [first_week + timedelta(weeks=w) for w in range(weeks)]
+
+    existing = set()
+    booked = []
+    for row in db.session.execute(
+        select(Shift.staffId, Shift.templateId, Shift.startTime, Shift.endTime)
+        .where(Shift.startTime >= range_start, Shift.startTime < range_end)
+    ):
+        existing.update(_shift_keys(*row))
+        booked.append((row.staffId, row.startTime, row.endTime))
+    caps = _CapTracker(week_starts, booked)
+    rosters = _ensure_rosters(week_starts)
+
+    templates = _active_templates(first_week, range_end.date() - timedelta(days=1))
+    staff_ids = {t.staffId for t in templates if t.staffId}
+    staff = {s.userId: s for s in Staff.query.filter(Staff.userId.in_(staff_ids))} if staff_ids else {}
+
+    created = skipped = over_cap = 0
+    batch = []
+    added = []
+    for template, shift_start, shift_end in expand_templates(start, weeks, templates):
+        keys = _shift_keys(template.staffId, template.templateId, shift_start, shift_end)
+        if any(k in existing for k in keys):
+            skipped += 1
+            continue
+        person = staff.get(template.staffId)
+        if person is not None and not caps.take(person, shift_start, shift_end):
+            over_cap += 1
+            continue
+        existing.update(keys)
+        added.append((template.staffId, shift_start, shift_end))
+        batch.append({
+            "rosterId": rosters[week_start_of(shift_start.date())],
+            "staffId": template.staffId,
+            "role": template.role,
+            "templateId": template.templateId,
+            "startTime": shift_start,
+            "endTime": shift_end
+        })
+        if len(batch) >= batch_size:
+            created += _insert_shifts(batch)
+            batch = []
+    if batch:
+        created += _insert_shifts(batch)
+    hours_controller.add_minutes(hours_controller.shift_deltas(added))
+    db.session.commit()
+    if created:
+        publish("roster.materialized", weekStartDate=first_week.isoformat(), weeks=weeks, created=created)
+
+    return {
+        "weekStartDate": first_week.isoformat(),
+        "weeks": weeks,
+        "created": created,
+        "skipped": skipped,
+        "overCap": over_cap
+    }
+
+def _shifted(column, delta):
+    """SQL for a datetime column moved by `delta`, computed in the database."""
+    if db.engine.dialect.name == "sqlite":
+        # keep SQLAlchemy's stored text format so range comparisons stay lexical
+        modifier = f"{int(delta.total_seconds()):+d} seconds"
+        return func.strftime("%Y-%m-%d %H:%M:%f", column, modifier).concat("000")
+    return column + literal(delta)
+
+def _over_weekly_cap(staff_ids, week):
+    over = []
+    for chunk in _chunks(sorted(staff_ids)):
+        for staff, minutes in db.session.execute(
+            select(Staff, StaffHours.minutes)
+            .join(StaffHours, StaffHours.staffId == Staff.userId)
+            .where(Staff.userId.in_(chunk), StaffHours.weekStartDate == week)
+        ):
+            weekly, _ = hours_controller.caps_for(staff)
+            if minutes > weekly * 60:
+                over.append({"staffId": staff.userId, "username": staff.username,
+                             "hours": round(minutes / 60, 2), "cap": weekly})
+    return over
+
+def clone_roster(roster_id, to_week, skip_deleted_staff=True, skip_conflicts=True):
+    """
+    Copy a roster's shifts into the week containing `to_week` with one INSERT ... SELECT
+    that moves the times in the database, creating that week's roster if needed.
+    Shifts held by staff who no longer exist are left out (skip_deleted_staff), as are
+    shifts that would overlap one the person already works or that the target week
+    already has (skip_conflicts), so cloning twice adds nothing. One transaction.
+    Hour caps aren't enforced row by row here; people the copy takes over their
+    weekly cap are listed in "overCap" for an admin to adjust.
+    """
+    source = db.session.scalars(select(Roster).where(Roster.rosterId == roster_id)).first()
+    if source is None:
+        return {"error": "Roster not found"}
+    try:
+        target_week = week_start_of(date.fromisoformat(to_week) if isinstance(to_week, str) else to_week)
+    except (TypeError, ValueError):
+        return {"error": "to_week must be a YYYY-MM-DD date"}
+    if target_week == source.weekStartDate:
+        return {"error": "Roster is already for that week"}
+
+    target = db.session.scalars(select(Roster).where(
+        Roster.weekStartDate == target_week, Roster.locationId.is_not_distinct_from(source.locationId)
+    ).order_by(Roster.rosterId)).first()
+    created_roster = target is None
+    if created_roster:
+        target = Roster(weekStartDate=target_week, weekEndDate=target_week + timedelta(days=6),
+                        locationId=source.locationId)
+        db.session.add(target)
+        db.session.flush()
+
+    delta = target_week - source.weekStartDate
+    src = Shift.__table__.alias("src")
+    start, end = _shifted(src.c.startTime, delta), _shifted(src.c.endTime, delta)
+    deleted_staff = and_(src.c.staffId.is_not(None), ~exists().where(Staff.userId == src.c.staffId))
+    conditions = [src.c.rosterId == source.rosterId]
+    if skip_deleted_staff:
+        conditions.append(~deleted_staff)
+    if skip_conflicts:
+        other = aliased(Shift)
+        conditions.append(~exists().where(
+            other.staffId == src.c.staffId, other.startTime < end, other.endTime > start,
+            other.startTime > _shifted(src.c.startTime, delta - MAX_SHIFT_LENGTH)
+        ))
+        # an identical open shift is already there
+        conditions.append(~exists().where(
+            src.c.staffId.is_(None), other.rosterId == target.rosterId, other.staffId.is_(None),
+            other.startTime == start, other.endTime == end, other.role.is_not_distinct_from(src.c.role)
+        ))
+    table = Shift.__table__
+    columns = ["rosterId", "staffId", "startTime", "endTime", "role", "templateId", "locationId"]
+    copy = select(
+        literal(target.rosterId), src.c.staffId, start, end, src.c.role, src.c.templateId, src.c.locationId
+    ).where(*conditions).order_by(src.c.startTime, src.c.shiftId)
+    ids = db.session.scalars(
+        insert(table).from_select([table.c[c] for c in columns], copy).returning(table.c.shiftId)
+    ).all()
+
+    added = []
+    for chunk in _chunks(ids):
+        added += db.session.execute(
+            select(table.c.staffId, table.c.startTime, table.c.endTime).where(table.c.shiftId.in_(chunk))
+        ).all()
+    deltas = hours_controller.shift_deltas(added)
+    hours_controller.add_minutes(deltas)
+    over_cap = _over_weekly_cap({staff_id for staff_id, _ in deltas if staff_id is not None}, target_week)
+    history_controller.record_shift_ids("shift.cloned", ids)
+    total, gone = db.session.execute(
+        select(func.count(), func.count().filter(deleted_staff)).select_from(src)
+        .where(src.c.rosterId == source.rosterId)
+    ).one()
+    db.session.commit()
+    if ids:
+        publish("roster.cloned", rosterId=target.rosterId, fromRosterId=source.rosterId,
+                weekStartDate=target_week.isoformat(), created=len(ids))
+
+    skipped_staff = gone if skip_deleted_staff else 0
+    return {
+        "rosterId": target.rosterId,
+        "fromRosterId": source.rosterId,
+        "weekStartDate": target.weekStartDate.isoformat(),
+        "weekEndDate": target.weekEndDate.isoformat(),
+        "createdRoster": created_roster,
+        "created": len(ids),
+        "skippedDeletedStaff": skipped_staff,
+        "skippedConflicts": total - skipped_staff - len(ids),
+        "overCap": over_cap
+    }
@@ -1,10 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
 
 
-db = SQLAlchemy()
+class LocationSession(Session):
+    """Sends default-bind work to the request's own location database when one is configured."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None:
+            from App.locations import location_engine
+            return location_engine(engine, mapper) or engine
+        return engine
+
+
+db = SQLAlchemy(session_options={"class_": LocationSession})
 
 def get_migrate(app):
+    # Flask-Migrate pulls in all of Alembic; only load it when migrations are wired up
+    from flask_migrate import Migrate
     return Migrate(app, db)
 
 def create_db():
@@ -0,0 +1,233 @@
+# App/events.py
+"""
+Live change notifications for dashboards (Server-Sent Events).
+
+Writers call publish() after they commit. The event is delivered straight to
+subscribers in this process and stored in the broadcast_events table; one
+poller thread per worker (a greenlet under gunicorn's gevent worker) reads new
+rows from that table and hands them to its own subscribers, so every worker
+sees every change. An idle SSE connection is just a small deque and an Event
+waiting in the hub -- no database connection or session is held open.
+
+When the tables are replaced wholesale (/system/init, snapshot loads) there is
+no per-row event to send; announce_reset() writes a RESET event instead, and
+each hub answers it by telling all of its subscribers to resync.
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, delete, func, text
+
+from App.database import db
+from App.models.broadcast import BroadcastEvent
+
+REPLAY_LIMIT = 100
+RESET = "system.reset"
+
+
+class Subscription:
+    __slots__ = ("accepts", "pending", "ready", "overflowed")
+
+    def __init__(self, accepts, size):
+        self.accepts = accepts
+        self.pending = deque(maxlen=size)
+        self.ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, event):
+        if len(self.pending) == self.pending.maxlen:
+            self.overflowed = True  # the client missed something and should refetch
+        self.pending.append(event)
+        self.ready.set()
+
+    def resync(self):
+        """Tell the reader its view is stale, without an event to go with it."""
+        self.overflowed = True
+        self.ready.set()
+
+    def wait(self, timeout):
+        """Block up to `timeout` seconds and return whatever events arrived."""
+        if not self.pending:
+            self.ready.wait(timeout)
+        self.ready.clear()
+        events = []
+        while self.pending:
+            events.append(self.pending.popleft())
+        return events
+
+
+class EventHub:
+    """Per-process fan-out of events to local subscribers."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poller = None
+        self._last_id = 0
+        self._local_ids = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, accepts=None, size=100):
+        subscription = Subscription(accepts, size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def resync(self):
+        for subscription in tuple(self._subscribers):
+            subscription.resync()
+
+    def dispatch(self, event):
+        if event["type"] == RESET:
+            self.resync()  # whatever anyone built from the old tables is gone
+            return
+        for subscription in tuple(self._subscribers):
+            if subscription.accepts is None or subscription.accepts(event):
+                subscription.push(event)
+
+    def mark_local(self, event_id):
+        # called before the row commits, so the poller can never deliver it a second time
+        if self._poller is not None:
+            self._local_ids.add(event_id)
+
+    def ensure_poller(self, app):
+        interval = app.config.get("EVENTS_POLL_INTERVAL", 1.0)
+        if interval <= 0 or self._poller is not None:
+            return
+        with self._lock:
+            if self._poller is None:
+                with app.app_context():
+                    self._last_id = latest_id()
+                self._poller = threading.Thread(target=self._poll_loop, args=(app, interval),
+                                                name="event-hub-poller", daemon=True)
+                self._poller.start()
+
+    def poll(self):
+        """Hand rows written since the last poll (by any worker) to local subscribers."""
+        latest = latest_id()
+        if latest < self._last_id:
+            # the table was recreated without announce_reset(): ids start again, and
+            # whatever subscribers built from the old data is gone
+            self._last_id = 0
+            self._local_ids.clear()
+            self.resync()
+        if not self._subscribers:
+            # nobody to tell; the next subscriber starts from here, not from the backlog
+            self._last_id = latest
+            self._local_ids = {i for i in self._local_ids if i > latest}
+            return
+        for event in _load_events(self._last_id):
+            self._last_id = max(self._last_id, event["id"])
+            if event["id"] in self._local_ids:
+                self._local_ids.discard(event["id"])
+            else:
+                self.dispatch(event)
+
+    def _poll_loop(self, app, interval):
+        retention = timedelta(seconds=app.config.get("EVENTS_RETENTION_SECONDS", 600))
+        last_prune = time.monotonic()
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    self.poll()
+                    if time.monotonic() - last_prune > retention.total_seconds() / 2:
+                        db.session.execute(delete(BroadcastEvent).where(
+                            BroadcastEvent.createdAt < datetime.utcnow() - retention))
+                        db.session.commit()
+                        last_prune = time.monotonic()
+            except Exception:
+                app.logger.exception("event poller failed; retrying")
+
+
+hub = EventHub()
+
+
+def _load_events(after_id, limit=500):
+    rows = db.session.execute(
+        select(BroadcastEvent.eventId, BroadcastEvent.kind, BroadcastEvent.staffId, BroadcastEvent.payload)
+        .where(BroadcastEvent.eventId > after_id)
+        .order_by(BroadcastEvent.eventId)
+        .limit(limit)
+    ).all()
+    events = []
+    for event_id, kind, staff_id, payload in rows:
+        event = json.loads(payload)
+        event.update({"id": event_id, "type": kind, "staffId": staff_id})
+        events.append(event)
+    return events
+
+def publish(kind, staff_id=None, **data):
+    """
+    Record a change notification and deliver it. Call after the change itself has
+    been committed; `data` should stay small (ids and times, not whole objects).
+    """
+    data = {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in data.items()}
+    row = BroadcastEvent(kind=kind, staffId=staff_id, payload=json.dumps(data, separators=(",", ":")))
+    db.session.add(row)
+    db.session.flush()
+    event = dict(data, id=row.eventId, type=kind, staffId=staff_id)
+    hub.mark_local(row.eventId)
+    db.session.commit()
+    hub.dispatch(event)
+    return event
+
+def latest_id():
+    return db.session.scalar(select(func.max(BroadcastEvent.eventId))) or 0
+
+def announce_reset(after_id):
+    """
+    Tell every worker the tables were replaced. `after_id` is latest_id() from
+    before the replacement: the event is given an id above it, so no worker's
+    cursor can already be past it even though the table itself was recreated.
+    """
+    event_id = max(after_id, latest_id()) + 1
+    db.session.add(BroadcastEvent(eventId=event_id, kind=RESET, payload="{}"))
+    db.session.flush()
+    if db.session.get_bind().dialect.name == "postgresql":
+        # an explicit id doesn't advance the sequence
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('broadcast_events', 'eventId'), :id)"),
+                           {"id": event_id})
+    hub.mark_local(event_id)
+    db.session.commit()
+    hub.dispatch({"id": event_id, "type": RESET, "staffId": None})
+
+def subscribe(accepts=None, last_event_id=None):
+    """Register a subscriber, replaying recent events after `last_event_id` on reconnect."""
+    app = current_app._get_current_object()
+    hub.ensure_poller(app)
+    subscription = hub.subscribe(accepts, app.config.get("EVENTS_QUEUE_SIZE", 100))
+    if last_event_id is not None:
+        for event in _load_events(last_event_id, REPLAY_LIMIT):
+            if accepts is None or accepts(event):
+                subscription.push(event)
+    return subscription
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+def stream(subscription, heartbeat=15.0):
+    """Generator producing the SSE wire format until the client goes away."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            events = subscription.wait(heartbeat)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield "event: resync\ndata: {}\n\n"
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            yield "".join(format_sse(e) for e in events)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,131 @@
+# App/idempotency.py
+"""
+Idempotency-Key support for write endpoints that clients retry (clock-in/out,
+scheduling). The first request with a key records a placeholder row, runs, and
+stores its status and body; a retry with the same key and the same request is
+answered from that row by primary key, without running the view again. The same
+key with a different request is rejected with 422, and one still in flight gets 409.
+Rows expire after IDEMPOTENCY_TTL seconds and are removed in batches by
+sweep_expired (`flask system sweep-idempotency`).
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import current_user
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.exc import IntegrityError
+
+from App.database import db
+from App.models.idempotencykey import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# transient outcomes a retry should get to try again
+UNCACHED_STATUSES = {409, 429}
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _replay(row):
+    response = make_response(row.body or b"", row.status)
+    response.mimetype = row.mimetype or "application/json"
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def _error(status, message):
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+def _claim(user_id, key, fingerprint):
+    """Our placeholder row, or the existing live row for this key."""
+    now = datetime.utcnow()
+    row = db.session.get(IdempotencyKey, (user_id, key))
+    if row is not None:
+        lock = timedelta(seconds=current_app.config.get("IDEMPOTENCY_LOCK_SECONDS", 30))
+        abandoned = row.status is None and row.createdAt < now - lock
+        if row.expiresAt > now and not abandoned:
+            return row, False
+        db.session.delete(row)
+        db.session.flush()
+    ttl = timedelta(seconds=current_app.config.get("IDEMPOTENCY_TTL", 86400))
+    row = IdempotencyKey(userId=user_id, key=key, fingerprint=fingerprint, createdAt=now, expiresAt=now + ttl)
+    db.session.add(row)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # a concurrent request with the same key got there first
+        db.session.rollback()
+        return db.session.get(IdempotencyKey, (user_id, key)), False
+    return row, True
+
+def idempotent(view):
+    """Honour Idempotency-Key on a view; use below @jwt_required() so keys are per user."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(400, f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+        user_id = current_user.userId
+        fingerprint = _fingerprint()
+        row, owner = _claim(user_id, key, fingerprint)
+        if not owner:
+            if row is None or row.fingerprint != fingerprint:
+                return _error(422, f"{HEADER} was already used for a different request")
+            if row.status is None:
+                return _error(409, "A request with this Idempotency-Key is still in progress")
+            return _replay(row)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _forget(user_id, key)
+            raise
+        if response.status_code >= 500 or response.status_code in UNCACHED_STATUSES or response.is_streamed:
+            _forget(user_id, key)
+            return response
+        db.session.rollback()  # the view has committed; drop anything it left behind
+        row = db.session.get(IdempotencyKey, (user_id, key))
+        if row is not None:
+            row.status = response.status_code
+            row.body = response.get_data()
+            row.mimetype = response.mimetype
+            db.session.commit()
+        return response
+
+    return wrapper
+
+def _forget(user_id, key):
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.userId == user_id, IdempotencyKey.key == key))
+    db.session.commit()
+
+def sweep_expired(batch_size=1000, now=None):
+    """Delete expired keys `batch_size` rows per transaction, oldest first; returns how many."""
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        batch = db.session.execute(
+            select(IdempotencyKey.userId, IdempotencyKey.key)
+            .where(IdempotencyKey.expiresAt <= now)
+            .order_by(IdempotencyKey.expiresAt)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return removed
+        table = IdempotencyKey.__table__
+        db.session.execute(
+            delete(table).where(table.c.userId == bindparam("user_id"), table.c.key == bindparam("key_")),
+            [{"user_id": user_id, "key_": key} for user_id, key in batch]
+        )
+        db.session.commit()
+        removed += len(batch)
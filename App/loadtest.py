@@ -0,0 +1,326 @@
+# App/loadtest.py
+"""
+Load generator for `flask system loadtest`, built from the Postman collection.
+
+Requests are taken from API_Test_Collection.postman_collection.json by name
+(method, path and JSON body) and grouped into weighted scenarios. Each virtual
+client seeds its own staff member and shift through the same API calls, then
+loops: pick a scenario by weight, send its requests in order, record the status
+and latency. The target is either an in-process test client on a throwaway
+SQLite database or a running server (e.g. gunicorn -c gunicorn_config.py
+wsgi:app) given by URL. The summary is JSON with throughput, error rates and
+p50/p95/p99 latency per route, so runs can be diffed across changes.
+"""
+import http.client
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+COLLECTION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "API_Test_Collection.postman_collection.json")
+
+# scenario -> (default weight, collection requests sent in order)
+SCENARIOS = {
+    "login": (1, ["Staff Login"]),
+    "view-roster": (6, ["View Roster", "My Shifts"]),
+    "clock-in-storm": (3, ["Time In", "Time Out"]),
+    "report": (1, ["Generate Report"]),
+}
+
+_PLACEHOLDER = re.compile(r"{{\s*([$\w]+)\s*}}")
+
+
+class RequestTemplate:
+    """One request from the collection: `path` keeps its :variables, `body` its {{placeholders}}."""
+
+    def __init__(self, name, method, path, body):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+
+    @property
+    def route(self):
+        return f"{self.method} {self.path}"
+
+    @property
+    def needs_admin(self):
+        return self.path.startswith("/admin/") and not self.path.endswith("/login")
+
+    def render(self, variables, overrides=None):
+        """(path, body dict or None) with :path variables and {{placeholders}} filled from `variables`."""
+        path = re.sub(r":(\w+)", lambda m: str(variables[m.group(1)]), self.path)
+        body = None
+        if self.body:
+            raw = _PLACEHOLDER.sub(lambda m: str(variables.get(m.group(1), "")), self.body)
+            body = json.loads(raw)
+        if overrides:
+            body = dict(body or {}, **overrides)
+        return path, body
+
+
+def load_collection(path=COLLECTION):
+    """{request name: RequestTemplate} for every request in a Postman v2 collection."""
+    with open(path, encoding="utf-8") as fh:
+        collection = json.load(fh)
+    requests = {}
+
+    def walk(items):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request["url"] if isinstance(request["url"], str) else request["url"]["raw"]
+            path = "/" + _PLACEHOLDER.sub("", url).split("?")[0].lstrip("/")
+            body = (request.get("body") or {}).get("raw") or None
+            requests[item["name"]] = RequestTemplate(item["name"], request["method"], path, body)
+
+    walk(collection["item"])
+    return requests
+
+def parse_mix(text):
+    """"login=1,report=0" -> scenario weights, starting from the defaults."""
+    weights = {name: weight for name, (weight, _) in SCENARIOS.items()}
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight)
+    if not any(weights.values()):
+        raise ValueError("At least one scenario needs a positive weight")
+    return weights
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class TestClientTransport:
+    """Requests through app.test_client(), one client per virtual user."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        try:
+            data = response.get_data()
+        finally:
+            response.close()
+        return response.status_code, data
+
+class HttpTransport:
+    """Requests over one keep-alive HTTP connection per virtual user."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.prefix = parts.path.rstrip("/")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.connection = None
+
+    def send(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=30)
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # drop the connection; the next request reconnects
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            return 0, str(e).encode()
+
+
+def _json_call(transport, template, variables, overrides=None, token=None):
+    path, body = template.render(variables, overrides)
+    status, data = transport.send(template.method, path, body, token)
+    if status >= 400 or status == 0:
+        raise RuntimeError(f"{template.route} failed with {status}: {data[:200]!r}")
+    return json.loads(data)
+
+def _seed(transports, requests, admin):
+    """Create one staff member with a shift underway per client; returns each client's variables."""
+    admin_token = _json_call(transports[0], requests["Admin Login"], {}, admin)["access_token"]
+    run = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    now = datetime.utcnow().replace(microsecond=0)
+    clients = []
+    for i, transport in enumerate(transports):
+        username, password = f"load-{run}-{i}", f"pw-{run}-{i}"
+        staff = _json_call(transport, requests["Add Staff"], {
+            "$randomUserName": username, "$randomEmail": f"{username}@loadtest.invalid",
+            "$randomPassword": password, "$randomJobTitle": "Load"
+        }, token=admin_token)
+        shift = _json_call(transport, requests["Schedule Shift"], {}, {
+            "staffId": staff["userId"], "role": "Load",
+            "start": (now - timedelta(hours=1)).isoformat(), "end": (now + timedelta(hours=7)).isoformat()
+        }, token=admin_token)
+        login = {"username": username, "password": password}
+        token = _json_call(transport, requests["Staff Login"], {}, login)["access_token"]
+        clients.append({
+            "staff_id": staff["userId"], "shift_id": shift["shiftId"], "roster_id": shift["rosterId"],
+            "login": login, "token": token, "admin_token": admin_token
+        })
+    return clients
+
+def _client_loop(transport, requests, scenarios, weights, variables, stop, budget, rng, samples, runs):
+    names = list(scenarios)
+    while not stop.is_set():
+        scenario = rng.choices(names, weights)[0]
+        for name in scenarios[scenario]:
+            if not budget():
+                stop.set()
+                return
+            template = requests[name]
+            overrides = variables["login"] if template.path.endswith("/login") else None
+            token = variables["admin_token"] if template.needs_admin else variables["token"]
+            path, body = template.render(variables, overrides)
+            started = time.perf_counter()
+            status, data = transport.send(template.method, path, body, None if overrides else token)
+            samples.append((template.route, status, time.perf_counter() - started))
+            if overrides and status == 200:
+                variables["token"] = json.loads(data)["access_token"]
+        runs[scenario] += 1
+
+def summarize(samples, elapsed):
+    """Per-route and overall counts, rates and latency percentiles (ms)."""
+    by_route = defaultdict(list)
+    for route, status, seconds in samples:
+        by_route[route].append((status, seconds))
+    routes = {}
+    for route, results in sorted(by_route.items()):
+        latencies = sorted(s * 1000 for _, s in results)
+        errors = sum(1 for status, _ in results if status == 0 or status >= 400)
+        routes[route] = {
+            "requests": len(results),
+            "throughput": round(len(results) / elapsed, 2),
+            "errors": errors,
+            "errorRate": round(errors / len(results), 4),
+            "statuses": dict(sorted(Counter(str(status) for status, _ in results).items())),
+            "latencyMs": {
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "mean": round(sum(latencies) / len(latencies), 2),
+                "max": round(latencies[-1], 2)
+            }
+        }
+    total = len(samples)
+    errors = sum(r["errors"] for r in routes.values())
+    return {
+        "requests": total,
+        "durationSeconds": round(elapsed, 3),
+        "throughput": round(total / elapsed, 2) if elapsed else 0,
+        "errors": errors,
+        "errorRate": round(errors / total, 4) if total else 0,
+        "routes": routes
+    }
+
+@contextmanager
+def _test_app(config):
+    """A fresh app on a temporary SQLite file, with an admin to seed through; the file goes afterwards."""
+    from App.main import create_app
+    from App.database import db
+    from App.models.admin import Admin
+
+    with tempfile.TemporaryDirectory(prefix="rostering-loadtest-") as directory:
+        path = os.path.join(directory, "loadtest.db")
+        app = create_app(dict({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"}, **(config or {})))
+        with app.app_context():
+            db.create_all()
+            admin = Admin(username="loadtest-admin", email="loadtest-admin@example.com", type="admin")
+            admin.set_password("loadtest")
+            db.session.add(admin)
+            db.session.commit()
+        try:
+            yield app, {"username": "loadtest-admin", "password": "loadtest"}
+        finally:
+            # close pooled connections so the file can be removed (Windows won't delete open files)
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+def run_loadtest(url=None, clients=10, duration=10.0, max_requests=None, mix=None, admin=None,
+                 collection=COLLECTION, seed=0, app_config=None):
+    """
+    Drive `clients` concurrent virtual users for `duration` seconds (or until
+    `max_requests` requests) against `url`, or an in-process test client when
+    url is None. `admin` is the login used for seeding; by default the
+    collection's own Admin Login body. Returns the JSON-able summary.
+    """
+    requests = load_collection(collection)
+    weights = mix if isinstance(mix, dict) else parse_mix(mix)
+    scenarios = {name: steps for name, (_, steps) in SCENARIOS.items() if weights.get(name)}
+    missing = {n for steps in scenarios.values() for n in steps} - set(requests)
+    if missing:
+        raise ValueError(f"Collection has no request named {', '.join(sorted(missing))}")
+
+    with ExitStack() as cleanup:
+        if url:
+            transports = [HttpTransport(url) for _ in range(clients)]
+            admin = admin or requests["Admin Login"].render({})[1]
+        else:
+            app, test_admin = cleanup.enter_context(_test_app(app_config))
+            transports = [TestClientTransport(app) for _ in range(clients)]
+            admin = admin or test_admin
+        variables = _seed(transports, requests, admin)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        sent = [0]
+
+        def budget():
+            if max_requests is None:
+                return True
+            with lock:
+                if sent[0] >= max_requests:
+                    return False
+                sent[0] += 1
+                return True
+
+        samples = [[] for _ in range(clients)]
+        runs = [Counter() for _ in range(clients)]
+        threads = [
+            threading.Thread(target=_client_loop, name=f"loadtest-{i}", daemon=True, args=(
+                transports[i], requests, scenarios, [weights[n] for n in scenarios], variables[i],
+                stop, budget, random.Random(seed + i), samples[i], runs[i]))
+            for i in range(clients)
+        ]
+        started_at, started = datetime.utcnow(), time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(0.0, duration - (time.perf_counter() - started)) if duration else None)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = {
+            "target": url or "test-client",
+            "clients": clients,
+            "startedAt": started_at.isoformat(),
+            "mix": {name: weights[name] for name in scenarios},
+            "scenarios": dict(sum(runs, Counter()))
+        }
+        result.update(summarize([s for client in samples for s in client], elapsed))
+        return result
@@ -0,0 +1,128 @@
+# App/locations.py
+"""
+Per-location request scoping.
+
+Each request may be scoped to one location: staff are always scoped to their
+own, admins choose one with the X-Location-Id header (or ?location=) and see
+every site without it. While scoped, every ORM query on a LocationScoped model
+(staff, rosters, shifts and their archive copies) gets the location filter
+added by a do_orm_execute hook, so controllers don't repeat it, and new rows
+default to the request's location.
+
+Optionally each location keeps its own database: set LOCATION_DATABASE_URI to
+a pattern such as "sqlite:///sites/site-{location_id}.db" and the session sends
+everything on the default bind to that file for the request (the locations
+registry itself stays in the main database). Tokens then carry the location
+they were issued for and are only accepted there.
+"""
+import threading
+
+from flask import current_app, g, has_app_context, jsonify, request
+from flask_jwt_extended import get_current_user, verify_jwt_in_request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import with_loader_criteria
+
+from App.database import db
+from App.models.location import Location, LocationScoped
+
+LOCATION_HEADER = "X-Location-Id"
+# skip the automatic filter for one statement: .execution_options(all_locations=True)
+ALL_LOCATIONS = "all_locations"
+
+
+def current_location():
+    """The location this request is scoped to, or None (also the default for new rows)."""
+    if not has_app_context():
+        return None
+    return g.get("location_id")
+
+def _scope_query(execute_state):
+    location_id = current_location()
+    if (location_id is None
+            or execute_state.is_column_load or execute_state.is_relationship_load
+            or execute_state.execution_options.get(ALL_LOCATIONS)):
+        return
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        execute_state.statement = execute_state.statement.options(with_loader_criteria(
+            LocationScoped, lambda cls: cls.locationId == location_id, include_aliases=True
+        ))
+
+
+class LocationEngines:
+    """One engine per location database, created (with its tables) on first use."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.engines = {}
+        self._lock = threading.Lock()
+
+    def get(self, location_id):
+        engine = self.engines.get(location_id)
+        if engine is None:
+            with self._lock:
+                engine = self.engines.get(location_id)
+                if engine is None:
+                    engine = create_engine(self.pattern.format(location_id=location_id))
+                    db.metadata.create_all(engine)
+                    self.engines[location_id] = engine
+        return engine
+
+def location_engine(default_engine, mapper=None):
+    """
+    The engine for this request's location database when per-location databases
+    are on and `default_engine` is the main one; otherwise None.
+    """
+    if not has_app_context() or g.get("location_id") is None:
+        return None
+    engines = current_app.extensions.get("location_engines")
+    if engines is None or default_engine is not db.engine:
+        return None
+    if mapper is not None and getattr(mapper.class_, "__location_shared__", False):
+        return None
+    return engines.get(g.location_id)
+
+
+def _bad_request(message, status=400):
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+def _select_location():
+    g.pop("location_id", None)
+    requested = request.headers.get(LOCATION_HEADER) or request.args.get("location")
+    if requested:
+        try:
+            requested = int(requested)
+        except ValueError:
+            return _bad_request(f"{LOCATION_HEADER} must be a location id")
+        if db.session.get(Location, requested) is None:
+            return _bad_request("Unknown location", 404)
+        g.location_id = requested
+
+    try:
+        verify_jwt_in_request(optional=True)
+        user = get_current_user()
+    except Exception:
+        # bad tokens are rejected by the view's own @jwt_required()
+        user = None
+    pinned = getattr(user, "locationId", None)
+    if pinned is not None:
+        # staff only ever see their own site, whatever they ask for
+        g.location_id = pinned
+    return None
+
+def _clear_location(exc=None):
+    # the app context (and g) can outlive the request, e.g. under the test client or /batch
+    g.pop("location_id", None)
+
+def init_app(app):
+    """Pick each request's location, and route to per-location databases when configured."""
+    pattern = app.config.get("LOCATION_DATABASE_URI")
+    if pattern:
+        app.extensions["location_engines"] = LocationEngines(pattern)
+    app.before_request(_select_location)
+    app.teardown_request(_clear_location)
+
+
+# applies to every session; a no-op outside location-scoped requests
+event.listen(db.session, "do_orm_execute", _scope_query)
@@ -1,20 +1,12 @@
 # App/main.py
 import os
-from flask import Flask, jsonify, render_template
-from flask_cors import CORS
+from flask import Flask, g, jsonify, render_template
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 
 from App.models.user import User
 from App.database import init_db
 from App.config import load_config
 
-# Blueprints (Views)
-from App.views.auth_views import auth_bp
-from App.views.staff_views import staff_bp
-from App.views.admin_views import admin_bp
-from App.views.system_views import system_bp
-from App.views.index import index_views
-
 def create_app(overrides: dict = None):
     """
     Application factory for the Rostering App.
@@ -27,7 +19,9 @@ def create_app(overrides: dict = None):
 
     # Load config
     load_config(app, overrides)
-    CORS(app)
+    if app.config.get("CORS_ENABLED", True):
+        from flask_cors import CORS
+        CORS(app)
 
     # Initialize Database
     init_db(app)
@@ -43,6 +37,8 @@ def create_app(overrides: dict = None):
     jwt = JWTManager(app)
 
     from App.database import db
+    from App import locations
+    from App.revocation import revocations
 
     @jwt.user_identity_loader
     def user_identity_lookup(identity):
@@ -52,6 +48,12 @@ def create_app(overrides: dict = None):
         """
         return str(identity)
 
+    @jwt.additional_claims_loader
+    def add_location_claim(identity):
+        """With per-location databases a token is only valid for the site it was issued at."""
+        location_id = locations.current_location()
+        return {"loc": location_id} if location_id is not None else {}
+
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
         """
@@ -62,16 +64,62 @@ def create_app(overrides: dict = None):
             user_id = int(identity)
         except (TypeError, ValueError):
             return None
+        if app.config.get("LOCATION_DATABASE_URI") and jwt_data.get("loc") != g.get("location_id"):
+            return None
+        # inside POST /batch every sub-request carries the same token
+        batch_user = g.get("batch_user")
+        if batch_user is not None and batch_user.userId == user_id:
+            return batch_user
         return db.session.get(User, user_id)
 
+    @jwt.token_in_blocklist_loader
+    def token_revoked(_jwt_header, jwt_data):
+        """Logged-out tokens, answered from memory on the common path (see App/revocation.py)."""
+        jti = jwt_data.get("jti")
+        return jti is not None and revocations.is_revoked(jti)
+
+    # staff see their own site, admins pick one with X-Location-Id
+    locations.init_app(app)
+
     # ----------------------------
     # Blueprint Registration
     # ----------------------------
+    # imported here so `import App.main` alone stays cheap
+    from App.views.auth_views import auth_bp
+    from App.views.staff_views import staff_bp
+    from App.views.admin_views import admin_bp
+    from App.views.system_views import system_bp
+    from App.views.index import index_views
+    from App.views.batch_views import batch_bp
+
     app.register_blueprint(index_views)         # /
     app.register_blueprint(auth_bp)            # /admin/login, /staff/login, etc.
     app.register_blueprint(staff_bp, url_prefix="/staff")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(system_bp, url_prefix="/system")
+    app.register_blueprint(batch_bp)             # /batch
+
+    # ----------------------------
+    # Admission Control
+    # ----------------------------
+    # expensive routes get a few slots and a short queue so they can't take every
+    # worker; clock-in/out is never limited. Tune with ADMISSION_POLICIES.
+    from App.admission import AdmissionControl, Policy
+    AdmissionControl(app, {
+        "admin_bp.generate_report": Policy(concurrency=2, queue=4, deadline=2.0),
+        "admin_bp.list_shifts": Policy(concurrency=4, queue=8, deadline=2.0),
+        "admin_bp.list_rosters": Policy(concurrency=4, queue=8, deadline=2.0),
+        "system_bp.initialize_app": Policy(concurrency=1, queue=0),
+        "staff_bp.time_in": Policy(priority=True),
+        "staff_bp.time_out": Policy(priority=True),
+        "staff_bp": Policy(rate=10, burst=30),
+        "admin_bp": Policy(rate=20, burst=60),
+        "batch_bp": Policy(rate=2, burst=10),
+    })
+
+    # gzip/deflate (zstd when installed) for JSON, text and CSV responses
+    from App.compression import Compression
+    Compression(app)
 
     # ----------------------------
     # Protected Pages
@@ -1,7 +1,15 @@
+from .location import *
 from .user import *
 from .admin import *
 from .staff import *
 from .shift import *
 from .roster import *
 from .attendance import *
-from .shiftreport import *
\ No newline at end of file
+from .shiftreport import *
+from .shifttemplate import *
+from .archive import *
+from .broadcast import *
+from .staffhours import *
+from .idempotencykey import *
+from .schedulelog import *
+from .revokedtoken import *
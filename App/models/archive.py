@@ -0,0 +1,85 @@
+# App/models/archive.py
+# Cold storage for rosters past the archive cutoff. These tables live on the
+# "archive" bind (ARCHIVE_DATABASE_URI, defaulting to the main database) and keep
+# the ids the rows had while hot, so reports and exports can read either side.
+from App.database import db
+from App.models.location import LocationScoped
+from App.models.shift import Shift
+from App.models.roster import Roster
+from App.models.shiftreport import ShiftReport, ShiftReportEntry
+
+class ArchivedRoster(db.Model, LocationScoped):
+    __bind_key__ = "archive"
+    __tablename__ = "archived_rosters"
+    rosterId = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    locationId = db.Column(db.Integer, nullable=True, index=True)
+    weekStartDate = db.Column(db.Date, nullable=False, index=True)
+    weekEndDate = db.Column(db.Date, nullable=False)
+    archivedAt = db.Column(db.DateTime)
+
+    def getCombinedRoster(self):
+        return ArchivedShift.query.filter_by(rosterId=self.rosterId).all()
+
+    get_json = Roster.get_json
+
+class ArchivedShift(db.Model, LocationScoped):
+    __bind_key__ = "archive"
+    __tablename__ = "archived_shifts"
+    shiftId = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rosterId = db.Column(db.Integer, index=True)
+    locationId = db.Column(db.Integer, nullable=True)
+    staffId = db.Column(db.Integer)
+    startTime = db.Column(db.DateTime, nullable=False, index=True)
+    endTime = db.Column(db.DateTime, nullable=False)
+    role = db.Column(db.String(50), nullable=True)
+    templateId = db.Column(db.Integer, nullable=True)
+    isOffered = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    getDuration = Shift.getDuration
+    get_json = Shift.get_json
+
+class ArchivedAttendanceRecord(db.Model):
+    __bind_key__ = "archive"
+    __tablename__ = "archived_attendance_records"
+    recordId = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    staffId = db.Column(db.Integer)
+    shiftId = db.Column(db.Integer, index=True)
+    timeIn = db.Column(db.DateTime)
+    timeOut = db.Column(db.DateTime)
+
+class ArchivedShiftReport(db.Model):
+    __bind_key__ = "archive"
+    __tablename__ = "archived_shift_reports"
+    # reports can also be generated after archival, so they get their own key
+    archiveId = db.Column(db.Integer, primary_key=True)
+    reportId = db.Column(db.Integer, nullable=True)
+    rosterId = db.Column(db.Integer, index=True)
+    weekStartDate = db.Column(db.Date, nullable=False)
+    weekEndDate = db.Column(db.Date, nullable=False)
+    summary = db.Column(db.Text)
+    totalShifts = db.Column(db.Integer)
+    totalStaff = db.Column(db.Integer)
+    totalHours = db.Column(db.Float)
+    generatedAt = db.Column(db.DateTime)
+
+    def get_json(self):
+        # reports generated after archival have no reportId, only an archiveId
+        return dict(ShiftReport.get_json(self), archiveId=self.archiveId)
+
+class ArchivedShiftReportEntry(db.Model):
+    __bind_key__ = "archive"
+    __tablename__ = "archived_shift_report_entries"
+    # entries copied from hot storage keep entryId/reportId; entries of reports
+    # generated after archival point at their report through archiveId instead
+    archivedEntryId = db.Column(db.Integer, primary_key=True)
+    entryId = db.Column(db.Integer, nullable=True)
+    reportId = db.Column(db.Integer, nullable=True, index=True)
+    archiveId = db.Column(db.Integer, nullable=True, index=True)
+    staffId = db.Column(db.Integer)
+    staffName = db.Column(db.String(120), nullable=False)
+    shiftId = db.Column(db.Integer)
+    shiftStart = db.Column(db.DateTime)
+    shiftEnd = db.Column(db.DateTime)
+    timeIn = db.Column(db.DateTime)
+    timeOut = db.Column(db.DateTime)
+    hoursWorked = db.Column(db.Float)
@@ -2,11 +2,14 @@ from App.database import db
 
 class AttendanceRecord(db.Model):
     __tablename__ = "attendance_records"
+    # never reuse ids: archived rows keep theirs (see App/models/archive.py)
+    __table_args__ = {"sqlite_autoincrement": True}
     recordId = db.Column(db.Integer, primary_key=True)
     staffId = db.Column(db.Integer, db.ForeignKey("staff.userId"))
     shiftId = db.Column(db.Integer, db.ForeignKey("shifts.shiftId"))
     timeIn = db.Column(db.DateTime)
     timeOut = db.Column(db.DateTime)
+    shift = db.relationship("Shift", back_populates="attendance", lazy="raise")
 
     @staticmethod
     def get_or_create(staff_id, shift_id):
@@ -0,0 +1,19 @@
+# App/models/broadcast.py
+import json
+from datetime import datetime
+from App.database import db
+
+class BroadcastEvent(db.Model):
+    """Short-lived change notifications shared between worker processes (see App/events.py)."""
+    __tablename__ = "broadcast_events"
+    __table_args__ = {"sqlite_autoincrement": True}
+    eventId = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    staffId = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    createdAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def get_json(self):
+        data = json.loads(self.payload)
+        data.update({"id": self.eventId, "type": self.kind, "staffId": self.staffId})
+        return data
@@ -0,0 +1,18 @@
+from App.database import db
+
+class IdempotencyKey(db.Model):
+    """
+    A client's Idempotency-Key and the response it got, so a retried write is
+    answered from here instead of running again. Rows expire after IDEMPOTENCY_TTL.
+    """
+    __tablename__ = "idempotency_keys"
+    userId = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    # sha256 of method, path and body: the same key must mean the same request
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # None while the first request is still running
+    status = db.Column(db.Integer, nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    createdAt = db.Column(db.DateTime, nullable=False)
+    expiresAt = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,30 @@
+from sqlalchemy.orm import declared_attr
+
+from App.database import db
+
+class Location(db.Model):
+    """A site. Staff, rosters and shifts belong to one (see App/locations.py for request scoping)."""
+    __tablename__ = "locations"
+    # the site registry stays in the main database even when sites have their own files
+    __location_shared__ = True
+    locationId = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+
+    def get_json(self):
+        return {"locationId": self.locationId, "name": self.name}
+
+
+def _request_location():
+    from App.locations import current_location
+    return current_location()
+
+
+class LocationScoped:
+    """
+    Adds locationId. While a request is scoped to a location, every ORM query on
+    these models gets `locationId = <that location>` added and new rows default to it.
+    """
+
+    @declared_attr
+    def locationId(cls):
+        return db.Column(db.Integer, db.ForeignKey("locations.locationId"), nullable=True, default=_request_location)
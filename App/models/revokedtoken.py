@@ -0,0 +1,16 @@
+from App.database import db
+
+class RevokedToken(db.Model):
+    """
+    A JWT (by its jti) that was logged out before it expired. Workers keep these
+    in memory (see App/revocation.py); a row is only needed until the token
+    would have expired anyway.
+    """
+    __tablename__ = "revoked_tokens"
+    # tokens are checked before a request is routed to its location's database
+    __location_shared__ = True
+    jti = db.Column(db.String(64), primary_key=True)
+    userId = db.Column(db.Integer, nullable=True)
+    # workers catch up by reading rows revoked since their last sync
+    revokedAt = db.Column(db.DateTime, nullable=False, index=True)
+    expiresAt = db.Column(db.DateTime, nullable=False, index=True)
@@ -1,18 +1,27 @@
 from App.database import db
+from App.models.location import LocationScoped
 
-class Roster(db.Model):
+class Roster(db.Model, LocationScoped):
     __tablename__ = "rosters"
+    # never reuse ids: archived rows keep theirs (see App/models/archive.py)
+    __table_args__ = (
+        db.Index("ix_rosters_location_week", "locationId", "weekStartDate"),
+        {"sqlite_autoincrement": True},
+    )
     rosterId = db.Column(db.Integer, primary_key=True)
-    weekStartDate = db.Column(db.Date, nullable=False)
+    weekStartDate = db.Column(db.Date, nullable=False, index=True)
     weekEndDate = db.Column(db.Date, nullable=False)
+    # load with selectinload(Roster.shifts) where it's needed; touching it unloaded raises
+    shifts = db.relationship("Shift", back_populates="roster", lazy="raise", passive_deletes="all",
+                             order_by="Shift.startTime")
 
     def getCombinedRoster(self):
-        from App.models.shift import Shift
-        return Shift.query.filter_by(rosterId=self.rosterId).all()
+        return self.shifts
     
     def get_json(self):
         return {
             "rosterId": self.rosterId,
+            "locationId": self.locationId,
             "weekStartDate": self.weekStartDate.isoformat(),
             "weekEndDate": self.weekEndDate.isoformat(),
             "shifts": [shift.get_json() for shift in self.getCombinedRoster()]
@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+from App.database import db
+
+class ScheduleEvent(db.Model):
+    """
+    One scheduling or staff change, appended and never updated. `state` is the
+    shift (or staff member) as it was after the change, as JSON; None once deleted.
+    """
+    __tablename__ = "schedule_events"
+    __table_args__ = (
+        # replaying one roster from a snapshot is a range scan
+        db.Index("ix_schedule_events_roster_event", "rosterId", "eventId"),
+        {"sqlite_autoincrement": True},
+    )
+    eventId = db.Column(db.Integer, primary_key=True)
+    occurredAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    kind = db.Column(db.String(50), nullable=False)
+    actorId = db.Column(db.Integer, nullable=True)
+    rosterId = db.Column(db.Integer, nullable=True)
+    shiftId = db.Column(db.Integer, nullable=True, index=True)
+    staffId = db.Column(db.Integer, nullable=True)
+    state = db.Column(db.Text, nullable=True)
+
+    def get_json(self):
+        return {
+            "eventId": self.eventId,
+            "occurredAt": self.occurredAt.isoformat(),
+            "kind": self.kind,
+            "actorId": self.actorId,
+            "rosterId": self.rosterId,
+            "shiftId": self.shiftId,
+            "staffId": self.staffId,
+            "state": json.loads(self.state) if self.state else None
+        }
+
+class RosterSnapshot(db.Model):
+    """Every shift of a roster as of event `eventId`, so history replays start here."""
+    __tablename__ = "roster_snapshots"
+    __table_args__ = (db.Index("ix_roster_snapshots_roster_event", "rosterId", "eventId"),)
+    snapshotId = db.Column(db.Integer, primary_key=True)
+    rosterId = db.Column(db.Integer, nullable=False)
+    eventId = db.Column(db.Integer, nullable=False)
+    takenAt = db.Column(db.DateTime, nullable=False)
+    # {shiftId: state} as JSON
+    shifts = db.Column(db.Text, nullable=False)
@@ -1,12 +1,31 @@
 from App.database import db
+from App.models.location import LocationScoped
 
-class Shift(db.Model):
+class Shift(db.Model, LocationScoped):
     __tablename__ = "shifts"
+    __table_args__ = (
+        # "is this person free then?" lookups for claims, swaps and candidates
+        db.Index("ix_shifts_staff_start", "staffId", "startTime"),
+        # per-site listings and rosters stay an index range however many sites there are
+        db.Index("ix_shifts_location_start", "locationId", "startTime"),
+        # never reuse ids: archived rows keep theirs (see App/models/archive.py)
+        {"sqlite_autoincrement": True},
+    )
     shiftId = db.Column(db.Integer, primary_key=True)
     rosterId = db.Column(db.Integer, db.ForeignKey("rosters.rosterId"))
     staffId = db.Column(db.Integer, db.ForeignKey("staff.userId"))
-    startTime = db.Column(db.DateTime, nullable=False)
+    startTime = db.Column(db.DateTime, nullable=False, index=True)
     endTime = db.Column(db.DateTime, nullable=False)
+    role = db.Column(db.String(50), nullable=True)
+    templateId = db.Column(db.Integer, db.ForeignKey("shift_templates.templateId"), nullable=True)
+    # the assignee has put the shift up for someone else to claim or swap for
+    isOffered = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    # lazy="raise": callers say how to load these (joinedload/selectinload) instead of
+    # paying a query per row; passive_deletes="all" leaves children alone on delete, as before
+    roster = db.relationship("Roster", back_populates="shifts", lazy="raise")
+    staff = db.relationship("Staff", back_populates="shifts", lazy="raise")
+    attendance = db.relationship("AttendanceRecord", back_populates="shift", lazy="raise", passive_deletes="all")
 
     def assignStaff(self, staff):
         self.staffId = staff.userId
@@ -19,7 +38,10 @@ class Shift(db.Model):
         return {
             "shiftId": self.shiftId,
             "rosterId": self.rosterId,
+            "locationId": self.locationId,
             "staffId": self.staffId,
+            "role": self.role,
+            "isOffered": bool(self.isOffered),
             "startTime": self.startTime.isoformat(),
             "endTime": self.endTime.isoformat(),
             "durationHours": self.getDuration()
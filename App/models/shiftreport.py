@@ -2,11 +2,20 @@ from App.database import db
 
 class ShiftReport(db.Model):
     __tablename__ = "shift_reports"
+    # never reuse ids: archived rows keep theirs (see App/models/archive.py)
+    __table_args__ = {"sqlite_autoincrement": True}
     reportId = db.Column(db.Integer, primary_key=True)
     rosterId = db.Column(db.Integer, db.ForeignKey("rosters.rosterId"))
     weekStartDate = db.Column(db.Date, nullable=False)
     weekEndDate = db.Column(db.Date, nullable=False)
-    summary = db.Column(db.String(5000))
+    # one-line overview; the detail lives in ShiftReportEntry rows and is rendered on
+    # demand (see App/controllers/report_controller.py). Reports from before that
+    # change kept their full text here, hence Text rather than a sized String.
+    summary = db.Column(db.Text)
+    totalShifts = db.Column(db.Integer)
+    totalStaff = db.Column(db.Integer)
+    totalHours = db.Column(db.Float)
+    generatedAt = db.Column(db.DateTime)
 
     def generateReport(self, roster, attendance):
         staff_count = len({a.staffId for a in attendance})
@@ -21,5 +30,25 @@ class ShiftReport(db.Model):
             "rosterId": self.rosterId,
             "weekStartDate": self.weekStartDate.isoformat(),
             "weekEndDate": self.weekEndDate.isoformat(),
-            "summary": self.summary
-        }
\ No newline at end of file
+            "summary": self.summary,
+            "totalShifts": self.totalShifts,
+            "totalStaff": self.totalStaff,
+            "totalHours": self.totalHours,
+            "generatedAt": self.generatedAt.isoformat() if self.generatedAt else None
+        }
+
+class ShiftReportEntry(db.Model):
+    """One attendance record as it stood when the report was generated."""
+    __tablename__ = "shift_report_entries"
+    __table_args__ = {"sqlite_autoincrement": True}
+    entryId = db.Column(db.Integer, primary_key=True)
+    reportId = db.Column(db.Integer, db.ForeignKey("shift_reports.reportId"), nullable=False, index=True)
+    staffId = db.Column(db.Integer)
+    staffName = db.Column(db.String(120), nullable=False)
+    shiftId = db.Column(db.Integer)
+    shiftStart = db.Column(db.DateTime)
+    shiftEnd = db.Column(db.DateTime)
+    timeIn = db.Column(db.DateTime)
+    timeOut = db.Column(db.DateTime)
+    # None when the record is missing a time in or out
+    hoursWorked = db.Column(db.Float)
\ No newline at end of file
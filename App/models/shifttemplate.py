@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from App.database import db
+
+class ShiftTemplate(db.Model):
+    __tablename__ = "shift_templates"
+    templateId = db.Column(db.Integer, primary_key=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    startTime = db.Column(db.Time, nullable=False)
+    durationMinutes = db.Column(db.Integer, nullable=False)
+    staffId = db.Column(db.Integer, db.ForeignKey("staff.userId"), nullable=True)
+    role = db.Column(db.String(50), nullable=True)
+    effectiveFrom = db.Column(db.Date, nullable=False)
+    effectiveTo = db.Column(db.Date, nullable=True)
+
+    def occurrence(self, week_start):
+        """Return the (start, end) datetimes of this template in the given week, or None."""
+        day = week_start + timedelta(days=self.weekday)
+        if day < self.effectiveFrom or (self.effectiveTo and day > self.effectiveTo):
+            return None
+        start = datetime.combine(day, self.startTime)
+        return start, start + timedelta(minutes=self.durationMinutes)
+
+    def get_json(self):
+        return {
+            "templateId": self.templateId,
+            "weekday": self.weekday,
+            "startTime": self.startTime.strftime("%H:%M"),
+            "durationMinutes": self.durationMinutes,
+            "staffId": self.staffId,
+            "role": self.role,
+            "effectiveFrom": self.effectiveFrom.isoformat(),
+            "effectiveTo": self.effectiveTo.isoformat() if self.effectiveTo else None
+        }
@@ -1,12 +1,22 @@
 # App/models/staff.py
-from sqlalchemy.orm import mapped_column, Mapped
+from typing import List
+from sqlalchemy.orm import mapped_column, Mapped, relationship
 from App.database import db
 from App.models.user import User
+from App.models.location import LocationScoped
 
-class Staff(User):
+class Staff(User, LocationScoped):
     __tablename__ = "staff"
+    __table_args__ = (db.Index("ix_staff_location_role", "locationId", "role"),)
     userId: Mapped[int] = mapped_column(db.Integer, db.ForeignKey("users.userId"), primary_key=True)
-    role: Mapped[str] = mapped_column(db.String(50), nullable=True)
+    role: Mapped[str] = mapped_column(db.String(50), nullable=True, index=True)
+    # personal hour caps; None falls back to ROLE_HOUR_CAPS, then the global defaults
+    maxWeeklyHours: Mapped[float] = mapped_column(db.Float, nullable=True)
+    maxDailyHours: Mapped[float] = mapped_column(db.Float, nullable=True)
+    # secret in the personal calendar feed URL (see calendar_controller)
+    calendarToken: Mapped[str] = mapped_column(db.String(64), nullable=True, unique=True)
+    # deleting staff leaves their past shifts in place (future ones are reopened first)
+    shifts: Mapped[List["Shift"]] = relationship(back_populates="staff", lazy="raise", passive_deletes="all")
 
     __mapper_args__ = {
         "polymorphic_identity": "staff"
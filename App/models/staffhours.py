@@ -0,0 +1,19 @@
+from App.database import db
+
+class StaffHours(db.Model):
+    """
+    Running total of scheduled minutes per person per week, kept up to date by
+    every write that assigns or removes shifts, so caps can be checked without
+    summing shifts.
+    """
+    __tablename__ = "staff_hours"
+    staffId = db.Column(db.Integer, db.ForeignKey("staff.userId"), primary_key=True)
+    weekStartDate = db.Column(db.Date, primary_key=True, index=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    def get_json(self):
+        return {
+            "staffId": self.staffId,
+            "weekStartDate": self.weekStartDate.isoformat(),
+            "hours": round(self.minutes / 60, 2)
+        }
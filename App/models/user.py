@@ -2,7 +2,7 @@
 from typing import Optional
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from App.database import db
 
@@ -14,12 +14,20 @@ class User(db.Model):
     passwordHash: Mapped[str] = mapped_column(db.String(256), nullable=False)
     email: Mapped[str] = mapped_column(db.String(120), unique=True, nullable=False)
     type: Mapped[Optional[str]] = mapped_column(db.String(50), nullable=True)
+    # lowercase copies kept in sync by _normalize, indexed for case-insensitive prefix search
+    usernameLower: Mapped[Optional[str]] = mapped_column(db.String(120), index=True, nullable=True)
+    emailLower: Mapped[Optional[str]] = mapped_column(db.String(120), index=True, nullable=True)
 
     __mapper_args__ = {
         "polymorphic_on": type,
         "polymorphic_identity": "user"
     }
 
+    @validates("username", "email")
+    def _normalize(self, key, value):
+        setattr(self, f"{key}Lower", value.lower() if value else None)
+        return value
+
     def set_password(self, raw_password: str):
         """Hash and set the user's password."""
         self.passwordHash = generate_password_hash(raw_password)
@@ -0,0 +1,178 @@
+# App/revocation.py
+"""
+Logout for JWTs without a database lookup per request.
+
+Logging out records the token's jti in revoked_tokens. Every request's token is
+checked against those revocations, but in memory: each worker holds a Bloom
+filter over all live revocations plus an exact set of up to
+REVOCATION_CACHE_SIZE of them, loaded from the table on first use and topped up
+with rows revoked since the last sync at most every REVOCATION_SYNC_INTERVAL
+seconds (its own logouts are added straight away). A token the filter has never
+seen -- nearly every request -- is accepted without touching the database; a
+filter hit is settled by the exact set, or by the table only when there are
+more live revocations than the set holds. A revocation matters only until the
+token would have expired, so entries are pruned at expiry and expired rows are
+removed by sweep_expired (`flask system sweep-revocations`).
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from App.database import db
+from App.models.revokedtoken import RevokedToken
+
+# tokens issued without an exp claim stay revoked this long
+NO_EXPIRY = timedelta(days=365)
+# re-read this far back on each sync, for logouts committed out of order by other workers
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size set membership with no false negatives and about `error_rate` false positives at `capacity`."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class RevocationList:
+    """This worker's view of revoked_tokens: a Bloom filter over all live rows and an exact subset."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything; the next check reloads from the table."""
+        with self._lock:
+            self.bloom = None
+            self.exact = {}        # jti -> expiresAt
+            self.complete = True   # exact holds every live revocation
+            self.synced_at = None  # database time covered by the last sync
+            self.next_sync = 0.0
+            self.next_prune = None
+
+    def _add(self, jti, expires):
+        self.bloom.add(jti)
+        if jti in self.exact or len(self.exact) < current_app.config.get("REVOCATION_CACHE_SIZE", 10000):
+            self.exact[jti] = expires
+            if self.next_prune is None or expires < self.next_prune:
+                self.next_prune = expires
+        else:
+            self.complete = False
+
+    def _empty(self):
+        config = current_app.config
+        self.bloom = BloomFilter(config.get("REVOCATION_BLOOM_CAPACITY", 100000),
+                                 config.get("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+        self.exact, self.complete, self.next_prune = {}, True, None
+
+    def _load(self, now):
+        self._empty()
+        # latest expiry first, so the exact set keeps the tokens most likely still in use
+        rows = db.session.execute(
+            select(RevokedToken.jti, RevokedToken.expiresAt)
+            .where(RevokedToken.expiresAt > now)
+            .order_by(RevokedToken.expiresAt.desc())
+            .execution_options(yield_per=1000)
+        )
+        for jti, expires in rows:
+            self._add(jti, expires)
+        self.synced_at = now
+
+    def _sync(self, now):
+        for jti, expires in db.session.execute(
+            select(RevokedToken.jti, RevokedToken.expiresAt)
+            .where(RevokedToken.revokedAt >= self.synced_at - SYNC_OVERLAP, RevokedToken.expiresAt > now)
+        ):
+            self._add(jti, expires)
+        self.synced_at = now
+
+    def _prune(self, now):
+        # a Bloom filter can't forget, so pruning rebuilds it from what is still live
+        if self.complete:
+            live = [(jti, expires) for jti, expires in self.exact.items() if expires > now]
+            self._empty()
+            for jti, expires in live:
+                self._add(jti, expires)
+        else:
+            self._load(now)
+        # however staggered the expiries, rebuild at most once per REVOCATION_PRUNE_INTERVAL
+        if self.next_prune is not None:
+            interval = timedelta(seconds=current_app.config.get("REVOCATION_PRUNE_INTERVAL", 60))
+            self.next_prune = max(self.next_prune, now + interval)
+
+    def is_revoked(self, jti, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            interval = current_app.config.get("REVOCATION_SYNC_INTERVAL", 1.0)
+            if self.bloom is None:
+                self._load(now)
+                self.next_sync = time.monotonic() + interval
+            elif time.monotonic() >= self.next_sync:
+                self._sync(now)
+                self.next_sync = time.monotonic() + interval
+            if self.next_prune is not None and now >= self.next_prune:
+                self._prune(now)
+            if jti not in self.bloom:
+                return False
+            expires = self.exact.get(jti)
+            if expires is not None:
+                return expires > now
+            if self.complete:
+                return False  # a false positive
+        # more live revocations than we keep exactly: settle the filter hit in the table
+        return db.session.get(RevokedToken, jti) is not None
+
+    def add(self, jti, expires):
+        with self._lock:
+            if self.bloom is not None:
+                self._add(jti, expires)
+
+
+revocations = RevocationList()
+
+
+def revoke(jwt_data, user_id=None):
+    """Log a decoded token out, here at once and in other workers within REVOCATION_SYNC_INTERVAL."""
+    now = datetime.utcnow()
+    expires = datetime.utcfromtimestamp(jwt_data["exp"]) if jwt_data.get("exp") else now + NO_EXPIRY
+    if expires <= now:
+        return False
+    jti = jwt_data["jti"]
+    if db.session.get(RevokedToken, jti) is None:
+        db.session.add(RevokedToken(jti=jti, userId=user_id, revokedAt=now, expiresAt=expires))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # the same token logged out twice at once
+            db.session.rollback()
+    revocations.add(jti, expires)
+    return True
+
+def sweep_expired(now=None):
+    """Delete rows for tokens that have expired anyway; returns how many."""
+    result = db.session.execute(delete(RevokedToken).where(RevokedToken.expiresAt <= (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
@@ -1,11 +1,16 @@
-import os, tempfile, pytest, unittest
+import io, os, tempfile, pytest, unittest
+from contextlib import contextmanager
 from datetime import datetime, timedelta, date
 import warnings
-from sqlalchemy.exc import SAWarning
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import SAWarning, InvalidRequestError
+from sqlalchemy.orm import selectinload
 warnings.filterwarnings("ignore", category=SAWarning)
 
 
 from werkzeug.security import generate_password_hash
+from flask import current_app, g
+from flask_jwt_extended import create_access_token, decode_token
 
 from App.main import create_app
 from App.database import db
@@ -15,7 +20,38 @@ from App.models.staff import Staff
 from App.models.roster import Roster
 from App.models.shift import Shift
 from App.models.attendance import AttendanceRecord
-from App.controllers import auth_controller, staff_controller
+from App.models.shifttemplate import ShiftTemplate
+from App.models.archive import ArchivedRoster, ArchivedShift, ArchivedAttendanceRecord
+from App.models.staffhours import StaffHours
+from App.models.shiftreport import ShiftReport
+from App.models.location import Location
+from App.controllers import auth_controller, staff_controller, admin_controller, template_controller, archive_controller, snapshot_controller, swap_controller, report_controller, hours_controller, repair_controller, staff_import_controller, history_controller, calendar_controller, duty_controller, forecast_controller
+from App.controllers.initialize import initialize
+from App import events
+from App.admission import ConcurrencyLimiter, TokenBuckets, Policy
+from App.compression import choose_encoding
+from App import idempotency, loadtest, revocation
+from App.models.idempotencykey import IdempotencyKey
+from App.models.schedulelog import ScheduleEvent, RosterSnapshot
+from App.models.revokedtoken import RevokedToken
+from App.models.broadcast import BroadcastEvent
+
+
+def auth_headers(user):
+    """Bearer header for calling protected routes through the test client."""
+    return {"Authorization": f"Bearer {create_access_token(identity=user.userId)}"}
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail if the block sends more than `limit` SQL statements; yields the list of them."""
+    queries = []
+    listener = lambda *args: queries.append(args[2])
+    sa_event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        yield queries
+    finally:
+        sa_event.remove(db.engine, "before_cursor_execute", listener)
+    assert len(queries) <= limit, f"{len(queries)} queries (limit {limit}):\n" + "\n".join(queries)
 
 
 """
@@ -156,5 +192,1630 @@ class IntegrationTests(unittest.TestCase):
         assert result is None
 
 
+class ShiftTemplateTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.staff = Staff(username="cook1", email="cook1@example.com", role="Cook", type="staff")
+        self.staff.set_password("cookpass")
+        db.session.add(self.staff)
+        db.session.commit()
+        self.monday = date(2030, 1, 7)
+        template_controller.create_template({
+            "weekday": 0, "start": "09:00", "durationHours": 8,
+            "staffId": self.staff.userId, "effectiveFrom": "2030-01-01"
+        })
+        template_controller.create_template({
+            "weekday": 4, "start": "17:00", "durationMinutes": 300,
+            "role": "Waiter", "effectiveFrom": "2030-01-01", "effectiveTo": "2030-01-31"
+        })
+
+    def test_create_template_requires_staff_or_role(self):
+        result = template_controller.create_template({"weekday": 1, "start": "09:00", "durationHours": 4})
+        assert "error" in result
+
+    def test_expansion_is_lazy_and_respects_effective_range(self):
+        occurrences = template_controller.expand_templates(self.monday, 8)
+        first = next(occurrences)
+        assert first[1] == datetime(2030, 1, 7, 9, 0)
+        assert Shift.query.count() == 0
+        preview = template_controller.preview_templates(self.monday, 8, limit=100)
+        waiter = [p for p in preview if p["role"] == "Waiter"]
+        assert len(waiter) == 3  # Fridays in January only
+        assert len(preview) == 11
+
+    def test_materialize_is_idempotent(self):
+        first = template_controller.materialize_templates(4, self.monday)
+        assert first["created"] == 7
+        second = template_controller.materialize_templates(4, self.monday)
+        assert second["created"] == 0
+        assert second["skipped"] == 7
+        assert Shift.query.count() == 7
+        assert Roster.query.count() == 4
+        open_shift = Shift.query.filter_by(role="Waiter").first()
+        assert open_shift.staffId is None
+
+    def test_materialize_skips_manually_scheduled_shift(self):
+        roster = Roster(weekStartDate=self.monday, weekEndDate=self.monday + timedelta(days=6))
+        db.session.add(roster)
+        db.session.commit()
+        db.session.add(Shift(rosterId=roster.rosterId, staffId=self.staff.userId,
+                             startTime=datetime(2030, 1, 7, 9), endTime=datetime(2030, 1, 7, 17)))
+        db.session.commit()
+        result = template_controller.materialize_templates(1, self.monday)
+        assert result["created"] == 1
+        assert Roster.query.count() == 1
+
+    def test_bad_start_or_weeks_is_a_400(self):
+        admin = Admin(username="tmpl_admin", email="tmpl_admin@example.com", passwordHash="x", type="admin")
+        db.session.add(admin)
+        db.session.commit()
+        client, headers = current_app.test_client(), auth_headers(admin)
+        assert client.get("/admin/templates/preview?start=bad", headers=headers).status_code == 400
+        for body in ({"weeks": "x"}, {"start": "bad"}):
+            response = client.post("/admin/templates/materialize", json=body, headers=headers)
+            assert response.status_code == 400 and "error" in response.get_json()
+        assert Shift.query.count() == 0
+
+
+class RosterRangeTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.staff = Staff(username="staff1", email="staff1@example.com", role="Cook", type="staff")
+        self.staff.set_password("staffpass")
+        db.session.add(self.staff)
+        db.session.commit()
+        self.first_week = date(2030, 1, 7)
+        for w in range(5):
+            week = self.first_week + timedelta(weeks=w)
+            roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+            db.session.add(roster)
+            db.session.commit()
+            if w == 2:
+                continue  # an empty week still shows up
+            start = datetime.combine(week, datetime.min.time()) + timedelta(hours=9)
+            db.session.add(Shift(rosterId=roster.rosterId, staffId=self.staff.userId,
+                                 startTime=start, endTime=start + timedelta(hours=8)))
+            db.session.commit()
+
+    def test_range_groups_by_week(self):
+        result = staff_controller.view_roster_range("2030-01-09", "2030-01-31")
+        assert result["from"] == "2030-01-07"
+        assert [w["weekStartDate"] for w in result["weeks"]] == ["2030-01-07", "2030-01-14", "2030-01-21", "2030-01-28"]
+        assert result["weeks"][2]["shifts"] == []
+        assert result["weeks"][0]["shifts"][0]["staffId"] == self.staff.userId
+
+    def test_compact_mode_uses_positional_rows(self):
+        result = staff_controller.view_roster_range("2030-01-07", "2030-01-13", compact=True)
+        assert result["fields"][0] == "shiftId"
+        row = result["weeks"][0]["shifts"][0]
+        assert isinstance(row, list) and len(row) == len(result["fields"])
+
+    def test_range_is_bounded(self):
+        assert "error" in staff_controller.view_roster_range("2030-01-07", "2031-06-01")
+        assert "error" in staff_controller.view_roster_range("2030-02-07", "2030-01-01")
+
+    def test_roster_range_route(self):
+        client = current_app.test_client()
+        resp = client.get("/staff/roster?from=2030-01-07&to=2030-02-09&compact=1", headers=auth_headers(self.staff))
+        assert resp.status_code == 200
+        assert len(resp.get_json()["weeks"]) == 5
+
+
+class StaffSearchTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        people = [("Alice", "Cashier"), ("alfred", "Cook"), ("Albert", "Cook"),
+                  ("bob", "Cook"), ("carol", "Waiter")]
+        for name, role in people:
+            s = Staff(username=name, email=f"{name.lower()}@example.com", role=role, type="staff")
+            s.passwordHash = "x"
+            db.session.add(s)
+        s = Staff(username="zed", email="ALwaysEarly@example.com", role="Cook", type="staff")
+        s.passwordHash = "x"
+        db.session.add(s)
+        db.session.commit()
+
+    def test_lowercase_columns_are_maintained(self):
+        staff = Staff.query.filter_by(username="Alice").first()
+        assert staff.usernameLower == "alice"
+        staff.email = "NEW@Example.com"
+        db.session.commit()
+        assert staff.emailLower == "new@example.com"
+
+    def test_prefix_search_is_case_insensitive_and_covers_email(self):
+        result = admin_controller.search_staff(q="AL")
+        names = [r["username"] for r in result["results"]]
+        assert names == ["Albert", "alfred", "Alice", "zed"]
+
+    def test_role_filter_and_cursor_pagination(self):
+        first = admin_controller.search_staff(q="al", role="Cook", limit=2)
+        assert [r["username"] for r in first["results"]] == ["Albert", "alfred"]
+        second = admin_controller.search_staff(q="al", role="Cook", limit=2, cursor=first["nextCursor"])
+        assert [r["username"] for r in second["results"]] == ["zed"]
+        assert second["nextCursor"] is None
+        assert "error" in admin_controller.search_staff(q="al", cursor="not-a-cursor")
+
+
+class ArchiveTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.staff = Staff(username="staff1", email="staff1@example.com", role="Cook", type="staff")
+        self.staff.set_password("staffpass")
+        db.session.add(self.staff)
+        db.session.commit()
+        self.first_week = date(2020, 1, 6)
+        self.rosters = []
+        for w in range(4):
+            week = self.first_week + timedelta(weeks=w)
+            roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+            db.session.add(roster)
+            db.session.commit()
+            start = datetime.combine(week, datetime.min.time()) + timedelta(hours=9)
+            shift = Shift(rosterId=roster.rosterId, staffId=self.staff.userId,
+                          startTime=start, endTime=start + timedelta(hours=8))
+            db.session.add(shift)
+            db.session.commit()
+            db.session.add(AttendanceRecord(staffId=self.staff.userId, shiftId=shift.shiftId,
+                                            timeIn=start, timeOut=start + timedelta(hours=8)))
+            db.session.commit()
+            self.rosters.append(roster.rosterId)
+
+    def test_archive_moves_old_rosters_in_batches(self):
+        result = archive_controller.archive_rosters(cutoff=date(2020, 1, 27), batch_rosters=2)
+        assert result["batches"] == 2
+        assert result["rosters"] == 3 and result["shifts"] == 3 and result["attendance_records"] == 3
+        assert Roster.query.count() == 1
+        assert ArchivedRoster.query.count() == 3
+        assert AttendanceRecord.query.count() == 1
+        # nothing left to do on a re-run
+        assert archive_controller.archive_rosters(cutoff=date(2020, 1, 27))["batches"] == 0
+
+    def test_interrupted_run_resumes(self):
+        first = archive_controller.archive_rosters(cutoff=date(2020, 2, 3), batch_rosters=1, max_batches=1)
+        assert first["rosters"] == 1
+        rest = archive_controller.archive_rosters(cutoff=date(2020, 2, 3), batch_rosters=1)
+        assert rest["rosters"] == 3
+        assert ArchivedShift.query.count() == 4
+        assert Shift.query.count() == 0
+
+    def test_reads_span_hot_and_archive(self):
+        archive_controller.archive_rosters(cutoff=date(2020, 1, 20))
+        result = staff_controller.view_roster_range("2020-01-06", "2020-01-31")
+        assert [len(w["shifts"]) for w in result["weeks"]] == [1, 1, 1, 1]
+        assert staff_controller.view_roster("2020-01-06")["rosterId"] == self.rosters[0]
+
+        resp = admin_controller.generate_shift_report(self.rosters[0])
+        assert "8.00 hrs" in resp.get_data(as_text=True)
+
+
+class SnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.path = os.path.join(tempfile.mkdtemp(), "demo.snap.gz")
+
+    def test_initialize_seeds_once(self):
+        counts = initialize()
+        assert counts == {"admins": 2, "staff": 6, "rosters": 5, "shifts": 30, "attendance": 30}
+        assert AttendanceRecord.query.count() == 30
+
+    def test_snapshot_round_trip(self):
+        initialize()
+        before = [s.get_json() for s in Shift.query.order_by(Shift.shiftId)]
+        snapshot_controller.save_snapshot(self.path)
+
+        db.session.add(Staff(username="extra", email="extra@example.com", passwordHash="x", type="staff"))
+        db.session.commit()
+        counts = snapshot_controller.load_snapshot(self.path)
+
+        assert counts["shifts"] == 30
+        assert Staff.query.filter_by(username="extra").first() is None
+        assert [s.get_json() for s in Shift.query.order_by(Shift.shiftId)] == before
+        assert auth_controller.authenticate("alice", "alicepass") is not None
+
+    def test_initialize_prefers_seed_snapshot(self):
+        initialize()
+        snapshot_controller.save_snapshot(self.path)
+        current_app.config["SEED_SNAPSHOT"] = self.path
+        try:
+            counts = initialize()
+        finally:
+            current_app.config.pop("SEED_SNAPSHOT")
+        assert counts["shifts"] == 30
+
+    def test_initialize_drops_caches_and_resyncs_subscribers(self):
+        initialize()
+        events.publish("shift.scheduled", shiftId=1)
+        before = events.latest_id()
+        calendar_controller.feed_cache.put("token", object())
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+        duty_controller.on_duty()
+        forecast_controller.forecast_cache.get("key", (0, 0), dict)
+        subscription = events.hub.subscribe(lambda event: False)
+        try:
+            initialize()
+        finally:
+            events.hub.unsubscribe(subscription)
+        assert len(calendar_controller.feed_cache) == 0
+        assert not duty_controller.duty_index.built
+        assert len(forecast_controller.forecast_cache) == 0
+        assert subscription.overflowed and subscription.wait(0) == []
+        # the table was recreated, but the reset event still lands past every old cursor
+        reset = db.session.get(BroadcastEvent, before + 1)
+        assert reset.kind == events.RESET and events.latest_id() == before + 1
+
+    def test_rejects_unknown_version(self):
+        import gzip, json
+        with gzip.open(self.path, "wt") as fh:
+            json.dump({"format": "rostering-snapshot", "version": 99, "binds": {}}, fh)
+        with self.assertRaises(ValueError):
+            snapshot_controller.load_snapshot(self.path)
+
+
+class StartupTests(unittest.TestCase):
+
+    def test_startup_skips_optional_modules(self):
+        import subprocess, sys
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        code = "import sys, wsgi; print(','.join(m for m in ('pytest', 'flask_admin', 'alembic') if m in sys.modules))"
+        out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == ""
+
+
+class EventStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+
+    def test_many_idle_subscribers_get_one_publish(self):
+        subscriptions = [events.hub.subscribe() for _ in range(5000)]
+        try:
+            event = events.publish("shift.scheduled", shiftId=1)
+            assert all(s.wait(0) == [event] for s in subscriptions)
+        finally:
+            for s in subscriptions:
+                events.hub.unsubscribe(s)
+        assert len(events.hub) == 0
+
+    def test_staff_filter_and_replay(self):
+        alice = Staff(username="ev_alice", email="ev_a@example.com", passwordHash="x", type="staff")
+        db.session.add(alice)
+        db.session.commit()
+        first = events.publish("attendance.time_in", staff_id=alice.userId + 1, shiftId=1)
+        events.publish("attendance.time_in", staff_id=alice.userId, shiftId=2)
+
+        client = current_app.test_client()
+        headers = dict(auth_headers(alice), **{"Last-Event-ID": str(first["id"] - 1)})
+        response = client.get("/staff/events", headers=headers, buffered=False)
+        assert response.mimetype == "text/event-stream"
+        chunks = response.response
+        assert next(chunks).startswith(b"retry:")
+        replay = next(chunks).decode()
+        response.close()
+        assert '"shiftId":2' in replay and '"shiftId":1' not in replay
+        assert len(events.hub) == 0
+
+    def test_poller_skips_idle_backlog_and_follows_a_reset(self):
+        def other_worker(count):
+            # rows another worker published; this one only sees them by polling
+            db.session.add_all([BroadcastEvent(kind="shift.scheduled", payload="{}") for _ in range(count)])
+            db.session.commit()
+
+        hub = events.hub
+        other_worker(3)
+        hub.poll()  # nobody listening
+        subscription = hub.subscribe()
+        try:
+            hub.poll()
+            assert subscription.wait(0) == []
+            other_worker(1)
+            hub.poll()
+            assert len(subscription.wait(0)) == 1
+            # /system/init recreates the tables, so ids start again below the cursor
+            db.drop_all()
+            db.create_all()
+            other_worker(2)
+            hub.poll()
+            assert subscription.overflowed
+            assert [e["id"] for e in subscription.wait(0)] == [1, 2]
+        finally:
+            hub.unsubscribe(subscription)
+
+
+class BatchTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.staff = Staff(username="batcher", email="batcher@example.com", passwordHash="x", type="staff")
+        db.session.add(self.staff)
+        db.session.commit()
+        self.client = current_app.test_client()
+
+    def test_dashboard_calls_in_one_round_trip(self):
+        response = self.client.post("/batch", headers=auth_headers(self.staff), json={"requests": [
+            {"id": "profile", "path": "/staff/profile"},
+            {"id": "roster", "path": "/staff/roster"},
+            {"id": "mine", "path": "/staff/my-shifts"},
+            {"id": "bad", "path": "/staff/roster?from=2030-01-07&to=2029-01-07"},
+            {"id": "admin", "path": "/admin/staff"},
+            {"id": "nested", "method": "POST", "path": "/batch"},
+        ]})
+        assert response.status_code == 200
+        results = {r["id"]: r for r in response.get_json()["responses"]}
+        assert results["profile"]["status"] == 200
+        assert results["profile"]["body"]["username"] == "batcher"
+        assert results["roster"]["status"] == 200
+        assert results["mine"]["status"] == 200
+        assert results["bad"]["status"] == 400
+        assert results["admin"]["status"] == 403
+        assert results["nested"]["status"] == 400
+
+    def test_batch_size_is_capped(self):
+        items = [{"path": "/staff/profile"}] * (current_app.config["BATCH_MAX_REQUESTS"] + 1)
+        response = self.client.post("/batch", headers=auth_headers(self.staff), json={"requests": items})
+        assert response.status_code == 400
+        assert self.client.post("/batch", json={"requests": [{"path": "/staff/profile"}]}).status_code == 401
+
+
+class ShiftSwapTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.nurses = [Staff(username=f"nurse{i}", email=f"nurse{i}@example.com", passwordHash="x",
+                             type="staff", role="nurse") for i in range(3)]
+        self.porter = Staff(username="porter", email="porter@example.com", passwordHash="x", type="staff", role="porter")
+        db.session.add_all(self.nurses + [self.porter])
+        db.session.commit()
+        self.start = datetime.utcnow().replace(microsecond=0) + timedelta(days=2)
+
+    def add_shift(self, staff_id, hours_from_start=0, role="nurse"):
+        shift = Shift(staffId=staff_id, role=role,
+                      startTime=self.start + timedelta(hours=hours_from_start),
+                      endTime=self.start + timedelta(hours=hours_from_start + 8))
+        db.session.add(shift)
+        db.session.commit()
+        return shift.shiftId
+
+    def test_claim_open_shift(self):
+        a, b, c = (n.userId for n in self.nurses)
+        open_id = self.add_shift(None)
+        self.add_shift(c, hours_from_start=4)
+
+        candidates = {s["userId"] for s in swap_controller.find_candidates(open_id)}
+        assert candidates == {a, b}
+        assert [s["shiftId"] for s in swap_controller.list_open_shifts(a)] == [open_id]
+        assert swap_controller.list_open_shifts(c) == []
+
+        assert "error" in swap_controller.claim_shift(self.porter.userId, open_id)
+        assert swap_controller.claim_shift(a, open_id)["staffId"] == a
+        assert swap_controller.claim_shift(b, open_id)["conflict"] is True
+
+    def test_offer_and_swap(self):
+        a, b, _ = (n.userId for n in self.nurses)
+        mine = self.add_shift(a)
+        theirs = self.add_shift(b, hours_from_start=24)
+        assert swap_controller.swap_shift(a, mine, theirs)["conflict"] is True
+
+        assert swap_controller.set_offered(b, theirs)["isOffered"] is True
+        result = swap_controller.swap_shift(a, mine, theirs)
+        assert result["shift"]["staffId"] == a and result["shift"]["isOffered"] is False
+        assert result["gaveAway"]["staffId"] == b
+
+    def test_concurrent_claims_have_one_winner(self):
+        import threading
+        path = os.path.join(tempfile.mkdtemp(), "claims.db")
+        claim_app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 60}, 'pool_size': 20,
+                                          'max_overflow': 0, 'pool_timeout': 120},
+            'EVENTS_POLL_INTERVAL': 0
+        })
+        claimants = 500
+        with claim_app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(User), [
+                {"username": f"c{i}", "usernameLower": f"c{i}", "email": f"c{i}@example.com",
+                 "emailLower": f"c{i}@example.com", "passwordHash": "x", "type": "staff"}
+                for i in range(claimants)
+            ])
+            ids = [u.userId for u in User.query.order_by(User.userId)]
+            db.session.execute(db.insert(Staff.__table__), [{"userId": i, "role": "nurse"} for i in ids])
+            shift = Shift(role="nurse", startTime=self.start, endTime=self.start + timedelta(hours=8))
+            db.session.add(shift)
+            db.session.commit()
+            shift_id = shift.shiftId
+
+        barrier = threading.Barrier(claimants)
+        results = {}
+
+        def claim(staff_id):
+            with claim_app.app_context():
+                barrier.wait()
+                results[staff_id] = swap_controller.claim_shift(staff_id, shift_id)
+
+        threads = [threading.Thread(target=claim, args=(i,)) for i in ids]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        winners = [sid for sid, r in results.items() if "error" not in r]
+        assert len(results) == claimants and len(winners) == 1
+        assert all(r.get("conflict") for sid, r in results.items() if sid != winners[0])
+        with claim_app.app_context():
+            assert db.session.get(Shift, shift_id).staffId == winners[0]
+
+
+class AdmissionTests(unittest.TestCase):
+
+    def test_limiter_queues_then_sheds(self):
+        import threading, time
+        limiter = ConcurrencyLimiter(limit=1, queue=1, deadline=0.05)
+        assert limiter.acquire() == "admitted"
+        outcomes = []
+        waiter = threading.Thread(target=lambda: outcomes.append(limiter.acquire()))
+        waiter.start()
+        while limiter.waiting == 0:
+            time.sleep(0.001)
+        assert limiter.acquire() == "full"
+        waiter.join()
+        assert outcomes == ["shed"]
+
+        waiter = threading.Thread(target=lambda: outcomes.append(limiter.acquire()))
+        waiter.start()
+        while limiter.waiting == 0:
+            time.sleep(0.001)
+        limiter.release()
+        waiter.join()
+        assert outcomes[-1] == "queued" and limiter.active == 1
+
+    def test_token_bucket(self):
+        buckets = TokenBuckets(rate=1, burst=2)
+        assert buckets.take("a") == 0 and buckets.take("a") == 0
+        assert 0 < buckets.take("a") <= 1
+        assert buckets.take("b") == 0
+
+    def test_policy_override_rederives_burst(self):
+        assert Policy(rate=2).updated(rate=10).burst == 10
+        assert Policy(rate=2).updated(rate=10, burst=4).burst == 4
+        assert Policy(rate=2, burst=30).updated(rate=10).burst == 30
+
+    def test_rate_limit_spares_clock_in(self):
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'EVENTS_POLL_INTERVAL': 0,
+            'ADMISSION_POLICIES': {"staff_bp": {"rate": 0.01, "burst": 2}}
+        })
+        with app.app_context():
+            db.create_all()
+            staff = Staff(username="limited", email="limited@example.com", passwordHash="x", type="staff")
+            db.session.add(staff)
+            db.session.commit()
+            client, headers = app.test_client(), auth_headers(staff)
+
+            assert [client.get("/staff/profile", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+            limited = client.get("/staff/my-shifts", headers=headers)
+            assert int(limited.headers["Retry-After"]) >= 1
+            assert client.post("/staff/shifts/1/time-in", headers=headers, json={}).status_code == 200
+
+            admin = Admin(username="limits_admin", email="limits_admin@example.com", passwordHash="x", type="admin")
+            db.session.add(admin)
+            db.session.commit()
+            assert client.get("/system/admission").status_code == 401
+            assert client.get("/system/admission", headers=headers).status_code == 403
+            metrics = client.get("/system/admission", headers=auth_headers(admin)).get_json()
+            assert metrics["staff_bp"]["rateLimited"] == 2
+            assert metrics["staff_bp.time_in"]["priority"] == 1
+            db.session.remove()
+
+
+class CompressionTests(unittest.TestCase):
+
+    def respond(self, response, accept="gzip, deflate"):
+        with current_app.test_request_context(headers={"Accept-Encoding": accept}):
+            return current_app.process_response(response)
+
+    def test_negotiation(self):
+        assert choose_encoding("gzip, deflate, br") == "gzip"
+        assert choose_encoding("deflate;q=1, gzip;q=0.5") == "deflate"
+        assert choose_encoding("gzip;q=0, identity") is None
+        assert choose_encoding(None) is None
+
+    def test_buffered_json(self):
+        import gzip, json
+        from flask import jsonify
+        with current_app.test_request_context():
+            big = jsonify([{"shiftId": i, "role": "nurse"} for i in range(500)])
+            small = jsonify({"ok": True})
+        big_body = big.get_data()
+        big = self.respond(big)
+        assert big.headers["Content-Encoding"] == "gzip"
+        assert int(big.headers["Content-Length"]) < len(big_body) / 5
+        assert json.loads(gzip.decompress(big.get_data())) == json.loads(big_body)
+        assert "Content-Encoding" not in self.respond(small).headers
+        assert "Accept-Encoding" in self.respond(small).headers["Vary"]
+
+    def test_streamed_chunk_by_chunk(self):
+        import zlib
+        from flask import Response
+        produced = []
+
+        def lines():
+            for i in range(2000):
+                produced.append(i)
+                yield f"line {i}\n"
+
+        response = self.respond(Response(lines(), mimetype="text/plain"), accept="deflate")
+        assert response.headers["Content-Encoding"] == "deflate"
+        chunks = iter(response.response)
+        first = next(chunks)
+        assert len(produced) < 2000  # output started before the body was fully generated
+        body = zlib.decompress(first + b"".join(chunks)).decode()
+        assert body == "".join(f"line {i}\n" for i in range(2000))
+
+        events_response = self.respond(Response(iter(["data: x\n\n"]), mimetype="text/event-stream"))
+        assert "Content-Encoding" not in events_response.headers
+
+
+class ShiftReportTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.staff = [Staff(username=f"rep{i}", email=f"rep{i}@example.com", passwordHash="x", type="staff")
+                      for i in range(2)]
+        db.session.add_all(self.staff)
+        db.session.commit()
+
+    def add_roster(self, week, records):
+        roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+        db.session.add(roster)
+        db.session.flush()
+        monday = datetime.combine(week, datetime.min.time())
+        shifts = [{"rosterId": roster.rosterId, "staffId": self.staff[i % 2].userId,
+                   "startTime": monday + timedelta(minutes=i), "endTime": monday + timedelta(minutes=i, hours=8)}
+                  for i in range(records)]
+        db.session.execute(db.insert(Shift), shifts)
+        rows = db.session.execute(db.select(Shift.shiftId, Shift.staffId, Shift.startTime)
+                                  .where(Shift.rosterId == roster.rosterId)).all()
+        db.session.execute(db.insert(AttendanceRecord), [
+            {"shiftId": shift_id, "staffId": staff_id, "timeIn": start,
+             "timeOut": start + timedelta(hours=8) if n else None}
+            for n, (shift_id, staff_id, start) in enumerate(rows)
+        ])
+        db.session.commit()
+        return roster.rosterId
+
+    def render(self, report, fmt):
+        return "".join(report_controller.render_report(report, fmt))
+
+    def test_formats(self):
+        import csv, json
+        report = report_controller.create_report(self.add_roster(date(2030, 1, 7), 3))
+        assert (report.totalShifts, report.totalStaff, report.totalHours) == (3, 2, 16.0)
+        assert report_controller.create_report(999999) == {"error": "Roster not found"}
+
+        text = self.render(report, "text")
+        assert text.startswith("Shift Report\n+----")
+        assert "Incomplete (No time in/out)" in text
+        assert " rep0: 8.00 hrs\n rep1: 8.00 hrs" in text
+        assert text.endswith(" Total Hours Worked: 16.00 hrs")
+
+        data = json.loads(self.render(report, "json"))
+        assert len(data["entries"]) == 3 and data["entries"][0]["hoursWorked"] is None
+        assert data["staff"] == [{"staffName": "rep0", "hoursWorked": 8.0}, {"staffName": "rep1", "hoursWorked": 8.0}]
+        rows = list(csv.reader(self.render(report, "csv").splitlines()))
+        assert rows[0] == report_controller.CSV_FIELDS and len(rows) == 4
+
+    def test_report_routes(self):
+        roster_id = self.add_roster(date(2030, 1, 7), 3)
+        admin = Admin(username="rep_admin", email="rep_admin@example.com", passwordHash="x", type="admin")
+        db.session.add(admin)
+        db.session.commit()
+        client = current_app.test_client()
+        created = client.post(f"/admin/roster/{roster_id}/report?format=json", headers=auth_headers(admin))
+        assert created.status_code == 201
+        report_id = created.get_json()["reportId"]
+        response = client.get(f"/admin/reports/{report_id}?format=csv", headers=auth_headers(admin))
+        assert response.mimetype == "text/csv" and response.get_data(as_text=True).count("\n") == 4
+        assert client.get("/admin/reports/999999", headers=auth_headers(admin)).status_code == 404
+        assert client.post("/admin/roster/999999/report", headers=auth_headers(admin)).status_code == 404
+
+    def test_bad_format_saves_nothing(self):
+        roster_id = self.add_roster(date(2030, 1, 7), 3)
+        admin = Admin(username="rep_admin", email="rep_admin@example.com", passwordHash="x", type="admin")
+        db.session.add(admin)
+        db.session.commit()
+        client = current_app.test_client()
+        response = client.post(f"/admin/roster/{roster_id}/report?format=bogus", headers=auth_headers(admin))
+        assert response.status_code == 400
+        assert ShiftReport.query.count() == 0
+
+    def test_rendering_memory_is_flat(self):
+        import tracemalloc
+        small = report_controller.create_report(self.add_roster(date(2030, 1, 7), 2000))
+        large = report_controller.create_report(self.add_roster(date(2030, 1, 14), 10000))
+        peaks = []
+        tracemalloc.start()
+        try:
+            for report in (small, small, large):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                size = sum(len(chunk) for chunk in report_controller.render_report(report, "text"))
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            tracemalloc.stop()
+        assert size > 1_500_000
+        # 5x the records, but peak memory while rendering stays about the same
+        assert peaks[2] < peaks[1] * 1.5
+
+
+class HoursCapTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.guard = Staff(username="guard", email="guard@example.com", passwordHash="x", type="staff", role="Security")
+        self.cook = Staff(username="cook", email="cook@example.com", passwordHash="x", type="staff", role="Cook",
+                          maxWeeklyHours=20)
+        db.session.add_all([self.guard, self.cook])
+        db.session.commit()
+        current_app.config["ROLE_HOUR_CAPS"] = {"Security": {"weekly": 40, "daily": 10}}
+
+    def tearDown(self):
+        current_app.config["ROLE_HOUR_CAPS"] = {}
+
+    def schedule(self, staff, day, hour=8, hours=8, **extra):
+        start = datetime(2030, 1, 7 + day, hour)
+        return admin_controller.schedule_shift(dict(
+            staffId=staff.userId, start=start.isoformat(), end=(start + timedelta(hours=hours)).isoformat(), **extra))
+
+    def test_weekly_and_daily_caps(self):
+        for day in range(5):
+            assert "error" not in self.schedule(self.guard, day)
+        assert hours_controller.weekly_minutes(self.guard.userId, date(2030, 1, 7)) == 40 * 60
+        assert "cap 40h" in self.schedule(self.guard, 5)["error"]
+        assert "error" not in self.schedule(self.guard, 5, allowOvertime=True)
+
+        assert "error" not in self.schedule(self.cook, 0)
+        assert "cap 10h" not in self.schedule(self.cook, 0, hour=17, hours=4).get("error", "")
+        assert "cap 12h" in self.schedule(self.cook, 0, hour=20, hours=2)["error"]  # default daily cap
+        assert "cap 20h" in self.schedule(self.cook, 1, hours=10)["error"]  # personal weekly cap
+
+    def test_concurrent_bookings_cannot_both_pass_the_weekly_cap(self):
+        import threading
+        path = os.path.join(tempfile.mkdtemp(), "caps.db")
+        caps_app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 60}},
+            'EVENTS_POLL_INTERVAL': 0,
+            'ROLE_HOUR_CAPS': {"Security": {"weekly": 40, "daily": 10}}
+        })
+        monday = date.today() - timedelta(days=date.today().weekday())
+        with caps_app.app_context():
+            db.create_all()
+            guard = Staff(username="guard", email="guard@example.com", passwordHash="x", type="staff", role="Security")
+            db.session.add_all([guard, Roster(weekStartDate=monday, weekEndDate=monday + timedelta(days=6))])
+            db.session.commit()
+            guard_id = guard.userId
+
+        barrier = threading.Barrier(7)
+        results = []
+
+        def book(day):
+            start = datetime(2030, 1, 7 + day, 8)
+            with caps_app.app_context():
+                barrier.wait()
+                results.append(admin_controller.schedule_shift({
+                    "staffId": guard_id, "start": start.isoformat(), "end": (start + timedelta(hours=8)).isoformat()}))
+
+        threads = [threading.Thread(target=book, args=(day,)) for day in range(7)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 7 x 8h requested at once against a 40h cap
+        assert sum("error" not in r for r in results) == 5
+        with caps_app.app_context():
+            assert hours_controller.weekly_minutes(guard_id, date(2030, 1, 7)) == 40 * 60
+            assert Shift.query.count() == 5
+            db.session.remove()
+
+    def test_shift_with_attendance_is_not_deleted(self):
+        shift = self.schedule(self.guard, 0)
+        db.session.add(AttendanceRecord(staffId=self.guard.userId, shiftId=shift["shiftId"],
+                                        timeIn=datetime(2030, 1, 7, 8)))
+        db.session.commit()
+        admin = Admin(username="caps_admin", email="caps_admin@example.com", passwordHash="x", type="admin")
+        db.session.add(admin)
+        db.session.commit()
+        response = current_app.test_client().delete(f"/admin/shifts/{shift['shiftId']}", headers=auth_headers(admin))
+        assert response.status_code == 409
+        assert db.session.get(Shift, shift["shiftId"]) is not None
+        assert hours_controller.weekly_minutes(self.guard.userId, date(2030, 1, 7)) == 8 * 60
+
+    def test_totals_follow_deletes_and_claims(self):
+        shift = self.schedule(self.guard, 0)
+        assert admin_controller.delete_shift(shift["shiftId"])
+        assert hours_controller.weekly_minutes(self.guard.userId, date(2030, 1, 7)) == 0
+
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+        open_shift = admin_controller.schedule_shift({"start": start.isoformat(),
+                                                      "end": (start + timedelta(hours=6)).isoformat()})
+        assert "error" not in swap_controller.claim_shift(self.cook.userId, open_shift["shiftId"])
+        assert hours_controller.weekly_minutes(self.cook.userId, hours_controller.week_of(start)) == 360
+
+        db.session.add(StaffHours(staffId=self.cook.userId, weekStartDate=date(2000, 1, 3), minutes=999))
+        db.session.commit()
+        hours_controller.rebuild_hours()
+        assert StaffHours.query.count() == 1
+
+    def test_near_cap_report(self):
+        for day in range(4):
+            self.schedule(self.guard, day, hours=9)
+        self.schedule(self.cook, 0)
+        report = hours_controller.hours_report(date(2030, 1, 9))
+        assert [(s["username"], s["utilisation"], s["overCap"]) for s in report["staff"]] == [("guard", 0.9, False)]
+        report = hours_controller.hours_report(date(2030, 1, 9), ratio=0.4)
+        assert [(s["username"], s["capHours"]) for s in report["staff"]] == [("guard", 40), ("cook", 20)]
+
+
+class RosterRepairTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.cooks = [Staff(username=f"cook{i}", email=f"cook{i}@example.com", passwordHash="x", type="staff",
+                            role="Cook") for i in range(3)]
+        self.waiter = Staff(username="waiter", email="waiter@example.com", passwordHash="x", type="staff",
+                            role="Waiter")
+        db.session.add_all(self.cooks + [self.waiter])
+        db.session.commit()
+        self.day = datetime.combine(date.today() + timedelta(days=2), datetime.min.time())
+
+    def shift(self, staff, start_hour, hours, role="Cook"):
+        start = self.day + timedelta(hours=start_hour)
+        return admin_controller.schedule_shift({
+            "staffId": staff.userId if staff else None, "role": role,
+            "start": start.isoformat(), "end": (start + timedelta(hours=hours)).isoformat()
+        })["shiftId"]
+
+    def test_call_off_is_covered_by_someone_free(self):
+        a, b, c = self.cooks
+        called_off = self.shift(a, 9, 8)
+        self.shift(b, 10, 4)
+        result = repair_controller.call_off(a.userId, called_off)
+        assert result["shift"]["staffId"] == c.userId
+        assert result["repair"]["changes"] == 1 and result["repair"]["applied"]
+        week = hours_controller.week_of(self.day)
+        assert hours_controller.weekly_minutes(a.userId, week) == 0
+        assert hours_controller.weekly_minutes(c.userId, week) == 8 * 60
+        assert "error" in repair_controller.call_off(a.userId, called_off)
+
+    def test_two_step_move_when_nobody_is_free(self):
+        a, b, c = self.cooks
+        target = self.shift(a, 9, 8)
+        self.shift(c, 8, 10)
+        handed = self.shift(b, 10, 4, role=None)  # anyone can work this one, including the waiter
+        result = repair_controller.call_off(a.userId, target)
+        moves = {m["shiftId"]: (m["previousStaffId"], m["staffId"]) for m in result["repair"]["assignments"]}
+        assert moves == {handed: (b.userId, self.waiter.userId), target: (None, b.userId)}
+        assert db.session.get(Shift, handed).staffId == self.waiter.userId
+
+    def test_two_step_respects_caps_in_the_next_week(self):
+        a, b, c = self.cooks
+        c.maxWeeklyHours = 20
+        db.session.commit()
+        sunday = (6 - self.day.weekday()) % 7          # days from self.day
+        target = self.shift(a, sunday * 24 + 18, 8)     # Sunday 18:00 to Monday 02:00
+        self.shift(b, sunday * 24 + 25, 8)              # Monday 01:00, so b can't take it as is
+        for day in (-3, -2, 3, 4):                      # c has 16h in this week and in the next
+            self.shift(c, (sunday + day) * 24 + 9, 8)
+        result = repair_controller.call_off(a.userId, target)
+        # b could take it by handing Monday to c, but that would put c at 24h in a 20h week
+        assert result["repair"]["uncovered"] == [target] and result["repair"]["changes"] == 0
+
+    def test_delete_staff_reopens_and_recovers_future_shifts(self):
+        a, b, _ = self.cooks
+        past = Shift(staffId=a.userId, role="Cook", startTime=datetime(2020, 1, 6, 9), endTime=datetime(2020, 1, 6, 17))
+        db.session.add(past)
+        db.session.commit()
+        future = self.shift(a, 9, 8)
+        assert admin_controller.delete_staff(a.userId)
+        assert db.session.get(Shift, future).staffId in (b.userId, self.cooks[2].userId)
+        assert db.session.get(Shift, past.shiftId).staffId == a.userId
+
+    def test_proposals_respect_role_and_budget(self):
+        open_ids = [self.shift(None, 9 + i, 1) for i in range(3)]
+        plan = repair_controller.repair_shifts(apply=False)
+        assert not plan["applied"] and plan["uncovered"] == []
+        assert {m["staffId"] for m in plan["assignments"]} <= {c.userId for c in self.cooks}
+        assert all(db.session.get(Shift, i).staffId is None for i in open_ids)
+        starved = repair_controller.propose_repair(open_ids, budget=0)
+        assert starved["timedOut"] and starved["uncovered"] == open_ids
+
+        admin = Admin(username="boss", email="boss@example.com", passwordHash="x", type="admin")
+        db.session.add(admin)
+        db.session.commit()
+        res = current_app.test_client().post("/admin/repair", json={"shiftIds": open_ids, "apply": True},
+                                             headers=auth_headers(admin))
+        assert res.status_code == 200 and res.get_json()["applied"]
+        assert all(db.session.get(Shift, i).staffId is not None for i in open_ids)
+
+
+class IdempotencyTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.admin = Admin(username="boss", email="boss@example.com", passwordHash="x", type="admin")
+        self.staff = Staff(username="cook", email="cook@example.com", passwordHash="x", type="staff", role="Cook")
+        db.session.add_all([self.admin, self.staff])
+        db.session.commit()
+        self.client = current_app.test_client()
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+        self.body = {"staffId": self.staff.userId, "start": start.isoformat(),
+                     "end": (start + timedelta(hours=4)).isoformat()}
+
+    def post_shift(self, key, body=None):
+        headers = dict(auth_headers(self.admin), **{"Idempotency-Key": key})
+        return self.client.post("/admin/shifts", json=body or self.body, headers=headers)
+
+    def test_retry_is_replayed_without_a_second_shift(self):
+        first = self.post_shift("abc")
+        again = self.post_shift("abc")
+        assert first.status_code == again.status_code == 201
+        assert again.get_json() == first.get_json()
+        assert again.headers["Idempotent-Replayed"] == "true"
+        assert Shift.query.count() == 1
+        assert self.post_shift("abc", dict(self.body, role="Cook")).status_code == 422
+        assert self.post_shift("other").status_code == 201 and Shift.query.count() == 2
+
+    def test_keys_are_per_user_and_clock_in_is_replayed(self):
+        shift_id = self.post_shift("k1").get_json()["shiftId"]
+        headers = dict(auth_headers(self.staff), **{"Idempotency-Key": "k1"})
+        path = f"/staff/shifts/{shift_id}/time-in"
+        first = self.client.post(path, json={}, headers=headers)
+        assert first.status_code == 200
+        assert self.client.post(path, json={}, headers=headers).get_json() == first.get_json()
+        assert AttendanceRecord.query.count() == 1
+        assert IdempotencyKey.query.count() == 2
+
+    def test_expired_keys_are_swept_in_batches(self):
+        past = datetime.utcnow() - timedelta(days=2)
+        db.session.add_all([IdempotencyKey(userId=1, key=f"k{i}", fingerprint="x", status=200, body=b"{}",
+                                           createdAt=past, expiresAt=past + timedelta(days=1)) for i in range(25)])
+        db.session.commit()
+        self.post_shift("live")
+        assert idempotency.sweep_expired(batch_size=10) == 25
+        assert [r.key for r in IdempotencyKey.query] == ["live"]
+
+
+class StaffImportTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        db.session.add(Staff(username="Existing", email="existing@example.com", passwordHash="x", type="staff"))
+        db.session.commit()
+
+    def test_import_reports_bad_rows_and_keeps_the_rest(self):
+        data = io.StringIO(
+            "username,email,password,role,maxWeeklyHours\n"
+            "amy,amy@example.com,pw1,Cook,30\n"
+            "existing,new@example.com,pw2,,\n"
+            "bo,not-an-email,pw3,,\n"
+            "AMY,amy2@example.com,pw4,,\n"
+            "cy,cy@example.com,,Cook,\n"
+            "dee,dee@example.com,pw5,Cook,lots\n"
+            "eve,eve@example.com,pw6,Waiter,\n"
+        )
+        result = staff_import_controller.import_staff(data, batch_size=2, workers=1)
+        assert result["imported"] == 2
+        assert [(e["line"], e["error"]) for e in result["errors"]] == [
+            (3, "username or email already exists"), (4, "invalid email 'not-an-email'"),
+            (5, "duplicate in file"), (6, "username, email and password are required"),
+            (7, "maxWeeklyHours must be a number")
+        ]
+        amy = Staff.query.filter_by(username="amy").one()
+        assert amy.check_password("pw1") and amy.maxWeeklyHours == 30 and amy.usernameLower == "amy"
+        assert admin_controller.search_staff(q="ev")["results"][0]["username"] == "eve"
+
+        out = io.StringIO()
+        assert staff_import_controller.export_staff(out) == 3
+        assert out.getvalue().splitlines()[0] == "userId,username,email,role,locationId,maxWeeklyHours,maxDailyHours"
+        assert "pw1" not in out.getvalue()
+
+    def test_unknown_locations_are_rejected(self):
+        site = Location(name="Harbour")
+        admin = Admin(username="imp_admin", email="imp_admin@example.com", passwordHash="x", type="admin")
+        db.session.add_all([site, admin])
+        db.session.commit()
+        data = io.StringIO(f"username,email,password,locationId\n"
+                           f"gus,gus@example.com,pw,{site.locationId}\nhal,hal@example.com,pw,404\n")
+        result = staff_import_controller.import_staff(data, workers=1)
+        assert result["imported"] == 1 and result["errors"][0]["error"] == "unknown location 404"
+
+        client = current_app.test_client()
+        for location_id in (404, "1"):
+            response = client.post("/admin/staff", headers=auth_headers(admin), json={
+                "username": "ida", "email": "ida@example.com", "password": "pw", "locationId": location_id})
+            assert response.status_code == 400
+        response = client.post("/admin/staff", headers=auth_headers(admin), json={
+            "username": "ida", "email": "ida@example.com", "password": "pw", "locationId": site.locationId})
+        assert response.status_code == 201
+        assert Staff.query.filter_by(username="ida").one().locationId == site.locationId
+
+    def test_missing_columns_and_dry_run(self):
+        assert "error" in staff_import_controller.import_staff(io.StringIO("username,email\na,a@b.c\n"))
+        result = staff_import_controller.import_staff(io.StringIO("username,email,password\nzed,z@e.d,pw\n"),
+                                                      dry_run=True)
+        assert result["valid"] == 1 and result["imported"] == 0 and Staff.query.count() == 1
+
+
+class LocationScopingTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        north, south = Location(name="North"), Location(name="South")
+        db.session.add_all([north, south])
+        db.session.flush()
+        admin = Admin(username="boss", email="boss@example.com", passwordHash="x", type="admin")
+        ann = Staff(username="ann", email="ann@example.com", passwordHash="x", type="staff", role="Cook",
+                    locationId=north.locationId)
+        sam = Staff(username="sam", email="sam@example.com", passwordHash="x", type="staff", role="Cook",
+                    locationId=south.locationId)
+        db.session.add_all([admin, ann, sam])
+        db.session.commit()
+        self.north, self.south = north.locationId, south.locationId
+        self.admin, self.ann, self.sam = admin.userId, ann.userId, sam.userId
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+        for staff_id in (self.ann, self.sam, None):
+            admin_controller.schedule_shift({"staffId": staff_id, "role": "Cook", "start": start.isoformat(),
+                                             "end": (start + timedelta(hours=4)).isoformat()})
+        self.client = current_app.test_client()
+        # requests normally start with an empty session; don't serve them from setUp's identity map
+        db.session.remove()
+
+    def headers(self, user_id, location_id=None):
+        headers = {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
+        if location_id is not None:
+            headers["X-Location-Id"] = str(location_id)
+        return headers
+
+    def test_shifts_and_rosters_follow_their_staff(self):
+        assert {s.staffId: s.locationId for s in Shift.query} == {self.ann: self.north, self.sam: self.south,
+                                                                  None: None}
+        assert {r.locationId for r in Roster.query} == {self.north, self.south, None}
+
+    def test_admin_header_scopes_every_query(self):
+        assert len(self.client.get("/admin/shifts", headers=self.headers(self.admin)).get_json()) == 3
+        north = self.headers(self.admin, self.north)
+        assert [s["staffId"] for s in self.client.get("/admin/shifts", headers=north).get_json()] == [self.ann]
+        assert [s["username"] for s in self.client.get("/admin/staff", headers=north).get_json()] == ["ann"]
+        assert self.client.delete(f"/admin/staff/{self.sam}", headers=north).status_code == 404
+        assert self.client.get("/admin/shifts", headers=self.headers(self.admin, 99)).status_code == 404
+
+    def test_staff_are_pinned_to_their_site(self):
+        mine = self.client.get("/staff/my-shifts", headers=self.headers(self.ann, self.south)).get_json()
+        assert [s["locationId"] for s in mine] == [self.north]
+
+        g.location_id = self.north
+        try:
+            assert db.session.execute(db.update(Shift).values(role="Chef")).rowcount == 1
+            assert Staff.query.count() == 1
+            created = admin_controller.create_staff({"username": "new", "email": "new@example.com", "password": "pw"})
+        finally:
+            g.pop("location_id")
+        assert db.session.get(Staff, created["userId"]).locationId == self.north
+        assert Shift.query.filter_by(role="Chef").count() == 1
+
+    def test_per_location_database_files(self):
+        folder = tempfile.mkdtemp()
+        site_app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(folder, 'main.db')}",
+            'LOCATION_DATABASE_URI': f"sqlite:///{folder}/site-{{location_id}}.db",
+            'EVENTS_POLL_INTERVAL': 0
+        })
+        with site_app.app_context():
+            db.create_all()
+            site = Location(name="Harbour")
+            db.session.add(site)
+            db.session.commit()
+            site_id = site.locationId
+            g.location_id = site_id
+            admin = Admin(username="harbour-admin", email="h@example.com", passwordHash="x", type="admin")
+            db.session.add(admin)
+            db.session.commit()
+            token = create_access_token(identity=admin.userId)
+            g.pop("location_id")
+            start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+            client = site_app.test_client()
+            headers = {"Authorization": f"Bearer {token}", "X-Location-Id": str(site_id)}
+            res = client.post("/admin/shifts", headers=headers, json={
+                "start": start.isoformat(), "end": (start + timedelta(hours=4)).isoformat()})
+            assert res.status_code == 201
+            assert Shift.query.count() == 0 and User.query.count() == 0
+            assert os.path.exists(os.path.join(folder, f"site-{site_id}.db"))
+            assert len(client.get("/admin/shifts", headers=headers).get_json()) == 1
+            # a token is only good at the site that issued it
+            del headers["X-Location-Id"]
+            assert client.get("/admin/shifts", headers=headers).status_code == 401
+
+
+class ScheduleHistoryTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        self.admin = Admin(username="boss", email="boss@example.com", passwordHash="x", type="admin")
+        db.session.add(self.admin)
+        db.session.commit()
+        self.cooks = [admin_controller.create_staff({"username": f"cook{i}", "email": f"cook{i}@example.com",
+                                                     "password": "pw", "role": "Cook"}) for i in range(2)]
+        self.start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+
+    def schedule(self, staff_id, hours_from_start):
+        start = self.start + timedelta(hours=hours_from_start)
+        return admin_controller.schedule_shift({"staffId": staff_id, "role": "Cook", "start": start.isoformat(),
+                                                "end": (start + timedelta(hours=4)).isoformat()})
+
+    def test_roster_is_rebuilt_as_it_was(self):
+        a, b = (c["userId"] for c in self.cooks)
+        first = self.schedule(a, 0)
+        second = self.schedule(a, 6)
+        before = datetime.utcnow()
+        swap_controller.set_offered(a, first["shiftId"])
+        assert swap_controller.claim_shift(b, first["shiftId"])["staffId"] == b
+        admin_controller.delete_shift(second["shiftId"])
+
+        then = history_controller.roster_at(first["rosterId"], before.isoformat())
+        assert [(s["shiftId"], s["staffId"]) for s in then["shifts"]] == [(first["shiftId"], a), (second["shiftId"], a)]
+        now = history_controller.roster_at(first["rosterId"])
+        assert [(s["shiftId"], s["staffId"], s["isOffered"]) for s in now["shifts"]] == [(first["shiftId"], b, False)]
+        kinds = [e.kind for e in ScheduleEvent.query.order_by(ScheduleEvent.eventId)]
+        assert kinds == ["staff.created"] * 2 + ["shift.scheduled"] * 2 + ["shift.offered", "shift.claimed",
+                                                                            "shift.deleted"]
+
+    def test_snapshots_bound_the_replay(self):
+        current_app.config["ROSTER_SNAPSHOT_EVERY"] = 5
+        try:
+            a = self.cooks[0]["userId"]
+            shift = self.schedule(a, 0)
+            for i in range(11):
+                swap_controller.set_offered(a, shift["shiftId"], offered=i % 2 == 0)
+        finally:
+            current_app.config["ROSTER_SNAPSHOT_EVERY"] = 50
+        assert RosterSnapshot.query.count() == 2
+        latest = history_controller.roster_at(shift["rosterId"])
+        assert latest["replayedEvents"] == 2 and latest["shifts"][0]["isOffered"]
+        RosterSnapshot.query.delete()
+        full = history_controller.roster_at(shift["rosterId"])
+        assert full["replayedEvents"] == 12 and full["shifts"] == latest["shifts"]
+
+    def test_history_endpoint(self):
+        shift = self.schedule(self.cooks[0]["userId"], 0)
+        client = current_app.test_client()
+        headers = auth_headers(self.admin)
+        res = client.get(f"/admin/roster/{shift['rosterId']}/history", headers=headers)
+        assert res.status_code == 200 and [s["shiftId"] for s in res.get_json()["shifts"]] == [shift["shiftId"]]
+        assert client.get(f"/admin/roster/{shift['rosterId']}/history?at=2000-01-01",
+                          headers=headers).get_json()["shifts"] == []
+        assert client.get(f"/admin/roster/{shift['rosterId']}/history?at=soon", headers=headers).status_code == 400
+        assert client.get("/admin/roster/999/history", headers=headers).status_code == 404
+
+
+class LoadTestTests(unittest.TestCase):
+
+    def test_mix_and_percentiles(self):
+        assert loadtest.parse_mix("report=0,login=2")["report"] == 0
+        assert loadtest.parse_mix("")["view-roster"] == loadtest.SCENARIOS["view-roster"][0]
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("stampede=1")
+        values = list(range(1, 101))
+        assert [loadtest.percentile(values, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+        assert loadtest.load_collection()["Time In"].route == "POST /staff/shifts/:shift_id/time-in"
+
+    def test_collection_scenarios_run_against_the_test_client(self):
+        def leftovers():
+            return {d for d in os.listdir(tempfile.gettempdir()) if d.startswith("rostering-loadtest-")}
+        before = leftovers()
+        result = loadtest.run_loadtest(clients=2, duration=30, max_requests=40, mix="login=0",
+                                       app_config={"ADMISSION_ENABLED": False, "EVENTS_POLL_INTERVAL": 0})
+        assert result["requests"] == 40 and result["errors"] == 0
+        assert set(result["routes"]) <= {
+            "GET /staff/roster", "GET /staff/my-shifts", "POST /admin/roster/:roster_id/report",
+            "POST /staff/shifts/:shift_id/time-in", "POST /staff/shifts/:shift_id/time-out"
+        }
+        route = result["routes"]["GET /staff/roster"]
+        assert route["latencyMs"]["p50"] <= route["latencyMs"]["p95"] <= route["latencyMs"]["p99"]
+        assert leftovers() == before  # the temporary database is removed
+
+
+class CalendarFeedTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+        self.alice = Staff(username="cal_alice", email="cal_a@example.com", passwordHash="x", type="staff", role="Cook")
+        self.bob = Staff(username="cal_bob", email="cal_b@example.com", passwordHash="x", type="staff", role="Cook")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.client = current_app.test_client()
+        self.start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+        self.shift(self.alice)
+        self.shift(self.bob)
+
+    def tearDown(self):
+        cache = calendar_controller.feed_cache
+        if cache._subscription is not None:
+            events.hub.unsubscribe(cache._subscription)
+            cache._subscription = None
+        cache.clear()
+
+    def shift(self, staff, offset_hours=0):
+        start = self.start + timedelta(hours=offset_hours)
+        return admin_controller.schedule_shift({"staffId": staff.userId, "start": start.isoformat(),
+                                                "end": (start + timedelta(hours=4)).isoformat()})
+
+    def feed_path(self, staff):
+        url = self.client.get("/staff/calendar", headers=auth_headers(staff)).get_json()["url"]
+        return url[url.index("/staff/"):]
+
+    def get(self, path, **headers):
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        sa_event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            return self.client.get(path, headers=headers), queries
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", listener)
+
+    def test_polls_are_served_from_cache_and_conditionally(self):
+        path = self.feed_path(self.alice)
+        first, _ = self.get(path)
+        assert first.status_code == 200 and first.mimetype == "text/calendar"
+        body = first.get_data(as_text=True)
+        assert body.startswith("BEGIN:VCALENDAR\r\n") and body.count("BEGIN:VEVENT") == 1
+        again, queries = self.get(path)
+        assert again.get_data() == first.get_data() and queries == []
+        not_modified, queries = self.get(path, **{"If-None-Match": first.headers["ETag"]})
+        assert not_modified.status_code == 304 and queries == []
+        assert self.get("/staff/not-a-token/calendar.ics")[0].status_code == 404
+
+    def test_only_the_changed_persons_feed_is_rebuilt(self):
+        alice_path, bob_path = self.feed_path(self.alice), self.feed_path(self.bob)
+        alice_tag = self.get(alice_path)[0].headers["ETag"]
+        self.get(bob_path)
+        self.shift(self.alice, offset_hours=6)
+        changed, queries = self.get(alice_path, **{"If-None-Match": alice_tag})
+        assert changed.status_code == 200 and queries
+        assert changed.get_data(as_text=True).count("BEGIN:VEVENT") == 2
+        assert self.get(bob_path)[1] == []
+        self.client.post("/staff/calendar", headers=auth_headers(self.alice))
+        assert self.get(alice_path)[0].status_code == 404
+
+
+class OnDutyTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+        self.admin = Admin(username="duty_admin", email="duty_admin@example.com", passwordHash="x", type="admin")
+        self.people = {}
+        for name in ("alice", "bob", "carol", "dave"):
+            self.people[name] = Staff(username=f"duty_{name}", email=f"duty_{name}@example.com",
+                                      passwordHash="x", type="staff")
+        db.session.add_all([self.admin, *self.people.values()])
+        db.session.commit()
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    def tearDown(self):
+        duty_controller.duty_index.reset()
+
+    def shift(self, name, started_minutes_ago, hours=8, role="Cook"):
+        start = self.now - timedelta(minutes=started_minutes_ago)
+        return admin_controller.schedule_shift({"staffId": self.people[name].userId, "role": role,
+                                                "start": start.isoformat(),
+                                                "end": (start + timedelta(hours=hours)).isoformat()})
+
+    def board(self, now=None):
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        sa_event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            result = duty_controller.on_duty(now=now)
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", listener)
+        return {s["username"]: s for s in result["onDuty"]}, result, queries
+
+    def test_flags_late_and_no_shows_per_role(self):
+        alice = self.shift("alice", 120)
+        staff_controller.time_in(self.people["alice"].userId, alice["shiftId"], alice["startTime"])
+        self.shift("bob", 10)
+        self.shift("carol", 40, role="Server")
+        self.shift("dave", -120)           # not started yet
+        self.shift("dave", 600, hours=2)   # already over
+        response = current_app.test_client().get("/admin/on-duty", headers=auth_headers(self.admin))
+        assert response.status_code == 200
+        board = {s["username"]: s for s in response.get_json()["onDuty"]}
+        assert set(board) == {"duty_alice", "duty_bob", "duty_carol"}
+        assert board["duty_alice"]["status"] == "on-duty" and not board["duty_alice"]["late"]
+        assert board["duty_bob"]["status"] == "late" and board["duty_bob"]["late"]
+        assert board["duty_carol"]["status"] == "no-show" and board["duty_carol"]["noShow"]
+        assert response.get_json()["byRole"] == {
+            "Cook": {"scheduled": 2, "clockedIn": 1, "late": 1, "noShow": 0},
+            "Server": {"scheduled": 1, "clockedIn": 0, "late": 0, "noShow": 1}
+        }
+        servers = current_app.test_client().get("/admin/on-duty?role=Server", headers=auth_headers(self.admin))
+        assert [s["username"] for s in servers.get_json()["onDuty"]] == ["duty_carol"]
+        staff_response = current_app.test_client().get("/admin/on-duty", headers=auth_headers(self.people["bob"]))
+        assert staff_response.status_code == 403
+
+    def test_open_shifts_are_not_no_shows(self):
+        start = self.now - timedelta(hours=1)
+        admin_controller.schedule_shift({"role": "Cook", "start": start.isoformat(),
+                                         "end": (start + timedelta(hours=8)).isoformat()})
+        carol = self.shift("carol", 60)
+        board, result, _ = self.board()
+        assert set(board) == {"duty_carol"} and result["byRole"]["Cook"]["noShow"] == 1
+        # a shift that loses its holder leaves the board instead of counting as a no-show
+        db.session.get(Shift, carol["shiftId"]).staffId = None
+        db.session.commit()
+        events.publish("shift.unassigned", shiftId=carol["shiftId"])
+        board, result, _ = self.board()
+        assert board == {} and result["byRole"] == {} and result["total"] == 0
+
+    def test_index_follows_writes_and_the_clock(self):
+        bob = self.shift("bob", 1)
+        self.shift("carol", -60)
+        board, _, _ = self.board()
+        assert set(board) == {"duty_bob"} and board["duty_bob"]["status"] == "expected"
+        # clock-ins are applied from the event alone
+        staff_controller.time_in(self.people["bob"].userId, bob["shiftId"], None)
+        board, result, queries = self.board()
+        assert board["duty_bob"]["status"] == "on-duty" and result["clockedIn"] == 1 and queries == []
+        # a new shift is picked up; the clock moving on just pops the heap
+        alice = self.shift("alice", 5)
+        board, _, _ = self.board()
+        assert set(board) == {"duty_alice", "duty_bob"}
+        board, _, queries = self.board(now=self.now + timedelta(minutes=90))
+        assert set(board) == {"duty_alice", "duty_bob", "duty_carol"} and queries == []
+        assert board["duty_alice"]["status"] == "no-show"
+        admin_controller.delete_shift(alice["shiftId"])
+        board, _, _ = self.board(now=self.now + timedelta(hours=8, minutes=30))
+        assert set(board) == {"duty_carol"}
+
+
+class QueryCountTests(unittest.TestCase):
+    # (path, who, most queries allowed); counts include loading the caller from the token
+    ROUTES = [
+        ("/staff/roster", "staff", 3),
+        ("/staff/roster?from={week}&to={next_week}", "staff", 2),
+        ("/staff/my-shifts", "staff", 2),
+        ("/staff/profile", "staff", 2),
+        ("/admin/staff", "admin", 2),
+        ("/admin/shifts", "admin", 2),
+        ("/admin/rosters?from={week}", "admin", 2),
+        ("/admin/on-duty", "admin", 5),
+        ("/admin/roster/{roster}/history", "admin", 5),
+    ]
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+        # keep the periodic revocation sync out of the counts
+        current_app.config["REVOCATION_SYNC_INTERVAL"] = 3600
+        revocation.revocations.reset()
+        revocation.revocations.is_revoked("")
+        self.admin = Admin(username="qc_admin", email="qc_admin@example.com", passwordHash="x", type="admin")
+        db.session.add(self.admin)
+        db.session.commit()
+        self.client = current_app.test_client()
+
+    def tearDown(self):
+        duty_controller.duty_index.reset()
+        current_app.config["REVOCATION_SYNC_INTERVAL"] = 1.0
+
+    def seed(self, people):
+        start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+        for i in range(people):
+            staff = Staff(username=f"qc_{people}_{i}", email=f"qc_{people}_{i}@example.com",
+                          passwordHash="x", type="staff", role="Cook")
+            db.session.add(staff)
+            db.session.commit()
+            for day in range(2):
+                shift = admin_controller.schedule_shift({"staffId": staff.userId, "role": "Cook",
+                                                         "start": (start + timedelta(days=day)).isoformat(),
+                                                         "end": (start + timedelta(days=day, hours=4)).isoformat(),
+                                                         "allowOvertime": True})
+                staff_controller.time_in(staff.userId, shift["shiftId"], shift["startTime"])
+        return staff
+
+    def check_routes(self, staff):
+        week = date.today() - timedelta(days=date.today().weekday())
+        values = {"week": week, "next_week": week + timedelta(days=7),
+                  "roster": Roster.query.filter_by(weekStartDate=week).first().rosterId}
+        for path, who, limit in self.ROUTES:
+            headers = auth_headers(staff if who == "staff" else self.admin)
+            with assert_max_queries(limit):
+                response = self.client.get(path.format(**values), headers=headers)
+            assert response.status_code == 200, path
+
+    def test_route_query_counts_do_not_grow_with_data(self):
+        self.check_routes(self.seed(3))
+        self.check_routes(self.seed(12))
+
+    def test_unplanned_lazy_loads_raise(self):
+        staff_id = self.seed(1).userId
+        db.session.expunge_all()
+        shift = Shift.query.filter_by(staffId=staff_id).first()
+        with pytest.raises(InvalidRequestError):
+            shift.staff
+        roster = Roster.query.options(selectinload(Roster.shifts).selectinload(Shift.attendance)).first()
+        with assert_max_queries(0):
+            assert len(roster.shifts) == 2 and all(len(s.attendance) == 1 for s in roster.shifts)
+
+
+class RosterCloneTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config["EVENTS_POLL_INTERVAL"] = 0
+        self.admin = Admin(username="cl_admin", email="cl_admin@example.com", passwordHash="x", type="admin")
+        self.alice = Staff(username="cl_alice", email="cl_alice@example.com", passwordHash="x", type="staff")
+        db.session.add_all([self.admin, self.alice])
+        db.session.commit()
+        self.week = date.today() - timedelta(days=date.today().weekday())
+        self.monday = datetime.combine(self.week, datetime.min.time())
+        for day, staff_id in ((0, self.alice.userId), (2, self.alice.userId), (3, None)):
+            shift = admin_controller.schedule_shift({
+                "staffId": staff_id, "role": "Cook",
+                "start": (self.monday + timedelta(days=day, hours=9)).isoformat(),
+                "end": (self.monday + timedelta(days=day, hours=17)).isoformat()})
+        self.roster_id = shift["rosterId"]
+        # a shift still held by someone since deleted
+        db.session.add(Shift(rosterId=self.roster_id, staffId=999999, role="Cook",
+                             startTime=self.monday + timedelta(days=4, hours=9),
+                             endTime=self.monday + timedelta(days=4, hours=17)))
+        db.session.commit()
+
+    def clone(self, to_week, **flags):
+        query = "&".join([f"to_week={to_week}"] + [f"{k}={v}" for k, v in flags.items()])
+        return current_app.test_client().post(f"/admin/roster/{self.roster_id}/clone?{query}",
+                                              headers=auth_headers(self.admin))
+
+    def test_clone_shifts_dates_and_updates_hours_and_history(self):
+        next_week = self.week + timedelta(days=7)
+        response = self.clone(next_week + timedelta(days=3))  # any day in the week
+        assert response.status_code == 201
+        result = response.get_json()
+        assert result["weekStartDate"] == next_week.isoformat() and result["createdRoster"]
+        assert (result["created"], result["skippedDeletedStaff"], result["skippedConflicts"]) == (3, 1, 0)
+        copies = Shift.query.filter_by(rosterId=result["rosterId"]).order_by(Shift.startTime).all()
+        assert [(s.staffId, s.startTime) for s in copies] == [
+            (self.alice.userId, self.monday + timedelta(days=7, hours=9)),
+            (self.alice.userId, self.monday + timedelta(days=9, hours=9)),
+            (None, self.monday + timedelta(days=10, hours=9)),
+        ]
+        assert not any(s.isOffered for s in copies) and all(s.role == "Cook" for s in copies)
+        assert db.session.get(StaffHours, (self.alice.userId, next_week)).minutes == 16 * 60
+        assert ScheduleEvent.query.filter_by(kind="shift.cloned").count() == 3
+        again = self.clone(next_week).get_json()
+        assert (again["rosterId"], again["created"], again["skippedConflicts"]) == (result["rosterId"], 0, 3)
+        assert self.clone("soon").status_code == 400
+        assert self.clone(self.week).status_code == 400
+        assert current_app.test_client().post(f"/admin/roster/{self.roster_id + 99}/clone?to_week={next_week}",
+                                              headers=auth_headers(self.admin)).status_code == 404
+
+    def test_conflicts_and_deleted_staff_can_be_kept(self):
+        next_week = self.week + timedelta(days=7)
+        self.alice.maxWeeklyHours = 20
+        db.session.commit()
+        db.session.add(Shift(staffId=self.alice.userId, startTime=self.monday + timedelta(days=7, hours=12),
+                             endTime=self.monday + timedelta(days=7, hours=14)))
+        db.session.commit()
+        result = template_controller.clone_roster(self.roster_id, next_week)
+        assert (result["created"], result["skippedConflicts"], result["overCap"]) == (2, 1, [])
+        result = template_controller.clone_roster(self.roster_id, next_week, skip_deleted_staff=False,
+                                                  skip_conflicts=False)
+        assert (result["created"], result["skippedDeletedStaff"]) == (4, 0)
+        assert result["overCap"] == [{"staffId": self.alice.userId, "username": "cl_alice", "hours": 24.0, "cap": 20}]
+
+
+class TokenRevocationTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        revocation.revocations.reset()
+        self.staff = Staff(username="rv_staff", email="rv_staff@example.com", type="staff")
+        self.staff.set_password("rvpass")
+        db.session.add(self.staff)
+        db.session.commit()
+        self.client = current_app.test_client()
+
+    def tearDown(self):
+        current_app.config.update(REVOCATION_SYNC_INTERVAL=1.0, REVOCATION_CACHE_SIZE=10000)
+        revocation.revocations.reset()
+
+    def profile(self, token):
+        return self.client.get("/staff/profile", headers={"Authorization": f"Bearer {token}"}).status_code
+
+    def test_logout_revokes_only_that_token(self):
+        login = {"username": "rv_staff", "password": "rvpass"}
+        first, second = (self.client.post("/staff/login", json=login).get_json()["access_token"] for _ in range(2))
+        assert self.profile(first) == 200
+        response = self.client.post("/staff/logout", headers={"Authorization": f"Bearer {first}"})
+        assert response.status_code == 200
+        assert self.profile(first) == 401 and self.profile(second) == 200
+        assert self.client.post("/staff/logout").status_code == 200
+        assert RevokedToken.query.count() == 1
+        # a worker that starts afterwards picks it up from the table
+        revocation.revocations.reset()
+        assert self.profile(first) == 401 and self.profile(second) == 200
+
+    def test_checks_stay_in_memory_and_entries_expire(self):
+        current_app.config["REVOCATION_SYNC_INTERVAL"] = 3600
+        revocations = revocation.revocations
+        revocations.is_revoked("")  # first use loads the table
+        tokens = [decode_token(create_access_token(identity=self.staff.userId, expires_delta=timedelta(minutes=m)))
+                  for m in (1, 2, 30)]
+        for token in tokens:
+            revocation.revoke(token, self.staff.userId)
+        later = datetime.utcnow() + timedelta(minutes=5)
+        with assert_max_queries(0):
+            assert not revocations.is_revoked("never-revoked")
+            assert revocations.is_revoked(tokens[0]["jti"])
+            assert not revocations.is_revoked(tokens[0]["jti"], now=later)
+            assert revocations.is_revoked(tokens[2]["jti"], now=later)
+        assert set(revocations.exact) == {tokens[2]["jti"]}
+        assert revocation.sweep_expired(later) == 2
+        # more revocations than the exact set holds: filter hits go to the table
+        revocation.revoke(tokens[1], self.staff.userId)
+        current_app.config["REVOCATION_CACHE_SIZE"] = 1
+        revocations.reset()
+        with assert_max_queries(2):
+            assert revocations.is_revoked(tokens[1]["jti"])
+
+        bloom = revocation.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        assert all(f"jti-{i}" in bloom for i in range(1000))
+        assert sum(f"other-{i}" in bloom for i in range(10000)) < 300
+
+
+class ForecastTests(unittest.TestCase):
+
+    def setUp(self):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        current_app.config.update(EVENTS_POLL_INTERVAL=0, FORECAST_HISTORY_WEEKS=4,
+                                  FORECAST_WINDOW_WEEKS=2, FORECAST_SMOOTHING=0)
+        self.admin = Admin(username="fc_admin", email="fc_admin@example.com", passwordHash="x", type="admin")
+        self.alice = Staff(username="fc_alice", email="fc_alice@example.com", passwordHash="x", type="staff")
+        self.bob = Staff(username="fc_bob", email="fc_bob@example.com", passwordHash="x", type="staff")
+        db.session.add_all([self.admin, self.alice, self.bob])
+        db.session.commit()
+        self.today = date(2031, 3, 12)
+        self.first_monday = datetime(2031, 2, 10)
+        # Mondays 9-13 for four weeks: alice always on time; bob 10 minutes late once, then absent twice
+        for week in range(4):
+            start = self.first_monday + timedelta(weeks=week, hours=9)
+            for person, late in ((self.alice, 0), (self.bob, (0, 10, None, None)[week])):
+                shift = admin_controller.schedule_shift({"staffId": person.userId, "role": "Cook",
+                                                         "start": start.isoformat(),
+                                                         "end": (start + timedelta(hours=4)).isoformat()})
+                if late is not None:
+                    db.session.add(AttendanceRecord(staffId=person.userId, shiftId=shift["shiftId"],
+                                                    timeIn=start + timedelta(minutes=late)))
+        db.session.commit()
+
+    def tearDown(self):
+        forecast_controller.forecast_cache.clear()
+        current_app.config.update(FORECAST_HISTORY_WEEKS=12, FORECAST_WINDOW_WEEKS=4, FORECAST_SMOOTHING=5)
+
+    def test_expected_and_no_show_adjusted_headcount(self):
+        result = forecast_controller.forecast(today=self.today)
+        assert result["fromWeek"] == "2031-02-10" and result["windowWeeks"] == 2
+        cook = result["roles"]["Cook"]
+        assert cook["shifts"] == 8 and cook["noShowRate"] == 0.25
+        assert cook["lateRate"] == round(1 / 6, 3)
+        # two people for two weeks, then one: the rolling average follows the recent weeks
+        assert [w["hours"] for w in cook["weeklyHours"]] == [8, 8, 4, 4]
+        assert cook["weeklyHours"][-1]["rollingAverage"] == 4
+        assert cook["weekdayProfile"]["Mon"] == 1.0 and cook["weekdayProfile"]["Tue"] == 0
+        assert [(s["weekday"], s["hour"]) for s in cook["hours"]] == [("Mon", 9), ("Mon", 10), ("Mon", 11), ("Mon", 12)]
+        # one person expected each hour; with a quarter not turning up, roster two
+        assert all(s["expected"] == 1.0 and s["noShowRate"] == 0.25 and s["schedule"] == 2 for s in cook["hours"])
+
+        client = current_app.test_client()
+        response = client.get("/admin/forecast?role=Server", headers=auth_headers(self.admin))
+        assert response.status_code == 200 and response.get_json()["roles"] == {}
+        assert client.get("/admin/forecast?weeks=0", headers=auth_headers(self.admin)).status_code == 400
+        assert client.get("/admin/forecast", headers=auth_headers(self.alice)).status_code == 403
+
+    def test_cached_until_the_data_changes(self):
+        first = forecast_controller.forecast(today=self.today)
+        # the version check is all a repeat costs
+        with assert_max_queries(1):
+            assert forecast_controller.forecast(today=self.today) == first
+        start = self.first_monday + timedelta(weeks=3, hours=9)
+        bob_shift = Shift.query.filter_by(staffId=self.bob.userId, startTime=start).one()
+        db.session.add(AttendanceRecord(staffId=self.bob.userId, shiftId=bob_shift.shiftId, timeIn=start))
+        db.session.commit()
+        second = forecast_controller.forecast(today=self.today)
+        assert second["dataVersion"] != first["dataVersion"]
+        assert second["roles"]["Cook"]["weeklyHours"][-1]["hours"] == 8
+        assert second["roles"]["Cook"]["noShowRate"] == 0.125
+
+    def test_clock_out_changes_the_version_and_weeks_replace_each_other(self):
+        first = forecast_controller.forecast(today=self.today)
+        start = self.first_monday + timedelta(weeks=3, hours=9)
+        alice_shift = Shift.query.filter_by(staffId=self.alice.userId, startTime=start).one()
+        # an in-place update to an existing attendance row
+        staff_controller.time_out(self.alice.userId, alice_shift.shiftId, (start + timedelta(hours=1)).isoformat())
+        second = forecast_controller.forecast(today=self.today)
+        assert second["dataVersion"] != first["dataVersion"]
+        assert second["roles"]["Cook"]["weeklyHours"][-1]["hours"] == 1
+        forecast_controller.forecast(today=self.today + timedelta(weeks=1))
+        assert len(forecast_controller.forecast_cache) == 1
+
+    def test_clocking_in_this_week_keeps_the_cache(self):
+        start = self.first_monday + timedelta(weeks=4, hours=9)
+        shift = admin_controller.schedule_shift({"staffId": self.alice.userId, "role": "Cook",
+                                                 "start": start.isoformat(),
+                                                 "end": (start + timedelta(hours=4)).isoformat()})
+        first = forecast_controller.forecast(today=self.today)
+        staff_controller.time_in(self.alice.userId, shift["shiftId"], start.isoformat())
+        staff_controller.time_out(self.alice.userId, shift["shiftId"], (start + timedelta(hours=4)).isoformat())
+        # this week isn't part of the forecast, so only the version is read
+        with assert_max_queries(1):
+            assert forecast_controller.forecast(today=self.today) == first
+
+
 if __name__ == "__main__":
     pytest.main(["-v"])
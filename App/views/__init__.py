@@ -4,5 +4,6 @@ from .staff_views import staff_bp
 from .admin_views import admin_bp
 from .index import index_views
 from .system_views import system_bp
+from .batch_views import batch_bp
 
-__all__ = ["auth_bp", "staff_bp", "admin_bp", "system_bp", "index_views"]
+__all__ = ["auth_bp", "staff_bp", "admin_bp", "system_bp", "index_views", "batch_bp"]
@@ -1,22 +1,25 @@
 # App/views/admin.py
-from flask_admin.contrib.sqla import ModelView
-from flask_jwt_extended import jwt_required, current_user, unset_jwt_cookies, set_access_cookies
-from flask_admin import Admin
+# Flask-Admin is optional and heavy, so it is only imported when setup_admin() is called.
+from flask_jwt_extended import jwt_required, current_user
 from flask import flash, redirect, url_for, request
 from App.database import db
-from App.models import User
+from App.models.user import User
 
-class AdminView(ModelView):
+def setup_admin(app):
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
 
-    @jwt_required()
-    def is_accessible(self):
-        return current_user is not None
+    class AdminView(ModelView):
 
-    def inaccessible_callback(self, name, **kwargs):
-        # redirect to login page if user doesn't have access
-        flash("Login to access admin")
-        return redirect(url_for('index_page', next=request.url))
+        @jwt_required()
+        def is_accessible(self):
+            return current_user is not None
+
+        def inaccessible_callback(self, name, **kwargs):
+            # redirect to login page if user doesn't have access
+            flash("Login to access admin")
+            return redirect(url_for('index_page', next=request.url))
 
-def setup_admin(app):
     admin = Admin(app, name='FlaskMVC', template_mode='bootstrap3')
-    admin.add_view(AdminView(User, db.session))
\ No newline at end of file
+    admin.add_view(AdminView(User, db.session))
+    return admin
\ No newline at end of file
@@ -1,7 +1,12 @@
 # App/views/admin_views.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, current_user
-from App.controllers import admin_controller
+from App import events
+from App.idempotency import idempotent
+from datetime import date
+from App.controllers import (admin_controller, staff_controller, template_controller, swap_controller,
+                             report_controller, repair_controller, history_controller, duty_controller,
+                             forecast_controller)
 
 
 admin_bp = Blueprint('admin_bp', __name__, url_prefix="/admin")
@@ -16,13 +21,29 @@ def list_staff():
         return jsonify({"error": "Admins only"}), 403
     return jsonify(admin_controller.list_staff()), 200
 
+@admin_bp.route('/staff/search', methods=['GET'])
+@jwt_required()
+def search_staff():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = admin_controller.search_staff(
+        q=request.args.get("q"),
+        role=request.args.get("role"),
+        limit=request.args.get("limit", admin_controller.SEARCH_DEFAULT_LIMIT, type=int),
+        cursor=request.args.get("cursor")
+    )
+    return jsonify(result), 400 if "error" in result else 200
+
 @admin_bp.route('/staff', methods=['POST'])
 @jwt_required()
 def add_staff():
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
     data = request.get_json()
-    return jsonify(admin_controller.create_staff(data)), 201
+    staff = admin_controller.create_staff(data)
+    if "error" in staff:
+        return jsonify(staff), 400
+    return jsonify(staff), 201
 
 @admin_bp.route('/staff/<int:staff_id>', methods=['DELETE'])
 @jwt_required()
@@ -34,15 +55,51 @@ def delete_staff(staff_id):
         return jsonify({"error": "Staff not found"}), 404
     return jsonify({"message": "Staff deleted"}), 200
 
+@admin_bp.route('/locations', methods=['GET'])
+@jwt_required()
+def list_locations():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(admin_controller.list_locations()), 200
+
+@admin_bp.route('/locations', methods=['POST'])
+@jwt_required()
+def create_location():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = admin_controller.create_location(request.get_json(silent=True))
+    return jsonify(result), 400 if "error" in result else 201
+
 @admin_bp.route('/shifts', methods=['POST'])
 @jwt_required()
+@idempotent
 def schedule_shift():
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
     data = request.get_json()
     shift = admin_controller.schedule_shift(data)
+    if "error" in shift:
+        return jsonify(shift), 404 if shift["error"] == "Staff not found" else 400
     return jsonify(shift), 201
 
+@admin_bp.route('/shifts/<int:shift_id>', methods=['DELETE'])
+@jwt_required()
+def delete_shift(shift_id):
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = admin_controller.delete_shift(shift_id)
+    if "error" in result:
+        return jsonify(result), 404 if result["error"] == "Shift not found" else 409
+    return jsonify(result), 200
+
+@admin_bp.route('/hours', methods=['GET'])
+@jwt_required()
+def hours_near_cap():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = admin_controller.hours_near_cap(request.args.get("week"), request.args.get("ratio"))
+    return jsonify(result), 400 if "error" in result else 200
+
 @admin_bp.route('/shifts', methods=['GET'])
 @jwt_required()
 def list_shifts():
@@ -50,10 +107,176 @@ def list_shifts():
         return jsonify({"error": "Admins only"}), 403
     return jsonify(admin_controller.list_shifts()), 200
 
+@admin_bp.route('/shifts/open', methods=['GET'])
+@jwt_required()
+def list_open_shifts():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(swap_controller.list_open_shifts()), 200
+
+@admin_bp.route('/shifts/<int:shift_id>/candidates', methods=['GET'])
+@jwt_required()
+def shift_candidates(shift_id):
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = swap_controller.find_candidates(shift_id)
+    return jsonify(result), 404 if "error" in result else 200
+
+@admin_bp.route('/shifts/<int:shift_id>/call-off', methods=['POST'])
+@jwt_required()
+def call_off(shift_id):
+    """Record a call-off on someone's behalf (e.g. they phoned in)."""
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = repair_controller.call_off(None, shift_id)
+    return jsonify(result), 404 if "error" in result else 200
+
+@admin_bp.route('/repair', methods=['POST'])
+@jwt_required()
+def repair_roster():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    data = request.get_json(silent=True) or {}
+    budget = data.get("budgetMs")
+    result = repair_controller.repair_shifts(
+        data.get("shiftIds"),
+        apply=bool(data.get("apply", False)),
+        budget=budget / 1000 if isinstance(budget, (int, float)) else None
+    )
+    return jsonify(result), 409 if "error" in result else 200
+
+@admin_bp.route('/rosters', methods=['GET'])
+@jwt_required()
+def list_rosters():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    today = date.today()
+    result = staff_controller.view_roster_range(
+        request.args.get("from", today.isoformat()),
+        request.args.get("to"),
+        compact=request.args.get("compact", "").lower() in ("1", "true", "yes")
+    )
+    return jsonify(result), 400 if "error" in result else 200
+
+@admin_bp.route('/events', methods=['GET'])
+@jwt_required()
+def event_stream():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    subscription = events.subscribe(last_event_id=request.headers.get("Last-Event-ID", type=int))
+    return Response(events.stream(subscription, current_app.config.get("EVENTS_HEARTBEAT", 15.0)),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @admin_bp.route('/roster/<int:roster_id>/report', methods=['POST'])
 @jwt_required()
 def generate_report(roster_id):
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
-    report = admin_controller.generate_shift_report(roster_id)
-    return report, 201
+    result = admin_controller.generate_shift_report(roster_id, request.args.get("format", "text"))
+    if isinstance(result, dict):
+        return jsonify(result), 404 if result["error"] == "Roster not found" else 400
+    return result
+
+@admin_bp.route('/roster/<int:roster_id>/history', methods=['GET'])
+@jwt_required()
+def roster_history(roster_id):
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = history_controller.roster_at(roster_id, request.args.get("at"))
+    if "error" in result:
+        return jsonify(result), 404 if result["error"] == "Roster not found" else 400
+    return jsonify(result), 200
+
+@admin_bp.route('/roster/<int:roster_id>/clone', methods=['POST'])
+@jwt_required()
+def clone_roster(roster_id):
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = template_controller.clone_roster(
+        roster_id,
+        request.args.get("to_week"),
+        skip_deleted_staff=request.args.get("skip_deleted_staff", "true").lower() not in ("0", "false", "no"),
+        skip_conflicts=request.args.get("skip_conflicts", "true").lower() not in ("0", "false", "no")
+    )
+    if "error" in result:
+        return jsonify(result), 404 if result["error"] == "Roster not found" else 400
+    return jsonify(result), 201
+
+@admin_bp.route('/on-duty', methods=['GET'])
+@jwt_required()
+def on_duty():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(duty_controller.on_duty(role=request.args.get("role"))), 200
+
+@admin_bp.route('/forecast', methods=['GET'])
+@jwt_required()
+def staffing_forecast():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    result = forecast_controller.forecast(role=request.args.get("role"),
+                                          weeks=request.args.get("weeks", type=int))
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result), 200
+
+@admin_bp.route('/reports/<int:report_id>', methods=['GET'])
+@jwt_required()
+def view_report(report_id):
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    archived = request.args.get("archived", "").lower() in ("1", "true", "yes")
+    report = report_controller.find_report(report_id, archived)
+    if not report:
+        return jsonify({"error": "Report not found"}), 404
+    result = report_controller.report_response(report, request.args.get("format", "text"))
+    if isinstance(result, dict):
+        return jsonify(result), 400
+    return result
+
+@admin_bp.route('/templates', methods=['GET'])
+@jwt_required()
+def list_templates():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(template_controller.list_templates()), 200
+
+@admin_bp.route('/templates', methods=['POST'])
+@jwt_required()
+def create_template():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    template = template_controller.create_template(request.get_json() or {})
+    if "error" in template:
+        return jsonify(template), 400
+    return jsonify(template), 201
+
+@admin_bp.route('/templates/preview', methods=['GET'])
+@jwt_required()
+def preview_templates():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    start = request.args.get("start")
+    weeks = request.args.get("weeks", 1, type=int)
+    limit = min(request.args.get("limit", 200, type=int), 1000)
+    try:
+        start = date.fromisoformat(start) if start else None
+    except ValueError:
+        return jsonify({"error": "start must be a YYYY-MM-DD date"}), 400
+    return jsonify(template_controller.preview_templates(start, weeks, limit)), 200
+
+@admin_bp.route('/templates/materialize', methods=['POST'])
+@jwt_required()
+def materialize_templates():
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        weeks = int(data.get("weeks", 1))
+        start = date.fromisoformat(data["start"]) if data.get("start") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "weeks must be a number and start a YYYY-MM-DD date"}), 400
+    if not 1 <= weeks <= 104:
+        return jsonify({"error": "weeks must be between 1 and 104"}), 400
+    return jsonify(template_controller.materialize_templates(weeks, start)), 201
@@ -1,9 +1,23 @@
 # App/views/auth_views.py
 from flask import Blueprint, request, jsonify, make_response
-from App.controllers.auth_controller import authenticate_user
+from flask_jwt_extended import get_jwt, get_current_user, verify_jwt_in_request
+from App.controllers.auth_controller import authenticate_user, logout_user
 
 auth_bp = Blueprint('auth_bp', __name__)
 
+def _logout(message):
+    try:
+        verify_jwt_in_request(optional=True)
+        jwt_data, user = get_jwt(), get_current_user()
+    except Exception:
+        # expired, already revoked or malformed: nothing left to revoke
+        jwt_data, user = None, None
+    if jwt_data:
+        logout_user(jwt_data, user.userId if user else None)
+    resp = make_response(jsonify({"message": message}))
+    resp.delete_cookie("access_token_cookie")
+    return resp, 200
+
 @auth_bp.route('/admin/login', methods=['POST'])
 def admin_login():
     data = request.get_json() or {}
@@ -25,9 +39,7 @@ def admin_login():
 
 @auth_bp.route('/admin/logout', methods=['POST'])
 def admin_logout():
-    resp = make_response(jsonify({"message": "Admin logged out"}))
-    resp.delete_cookie("access_token_cookie")
-    return resp, 200
+    return _logout("Admin logged out")
 
 
 @auth_bp.route('/staff/login', methods=['POST'])
@@ -51,6 +63,4 @@ def staff_login():
 
 @auth_bp.route('/staff/logout', methods=['POST'])
 def staff_logout():
-    resp = make_response(jsonify({"message": "Staff logged out"}))
-    resp.delete_cookie("access_token_cookie")
-    return resp, 200
+    return _logout("Staff logged out")
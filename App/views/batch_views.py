@@ -0,0 +1,63 @@
+# App/views/batch_views.py
+from flask import Blueprint, current_app, g, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+from App.database import db
+
+batch_bp = Blueprint('batch_bp', __name__)
+
+BATCH_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+# headers a sub-request inherits from the batch call
+FORWARDED_HEADERS = ("Authorization", "Cookie", "Accept-Language", "User-Agent")
+
+
+def _run(item):
+    """Dispatch one sub-request through the normal routing/JWT/view stack."""
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str) or not item["path"].startswith("/"):
+        return 400, {"error": "Each request needs a path starting with '/'"}
+    method = str(item.get("method", "GET")).upper()
+    if method not in BATCH_METHODS:
+        return 405, {"error": f"Method {method} is not allowed in a batch"}
+    if item["path"].split("?", 1)[0].rstrip("/") == "/batch":
+        return 400, {"error": "Batches cannot be nested"}
+
+    headers = {k: request.headers[k] for k in FORWARDED_HEADERS if k in request.headers}
+    if item.get("idempotencyKey"):
+        headers["Idempotency-Key"] = str(item["idempotencyKey"])
+    # the nested request context reuses the batch's app context, so g, the
+    # cached user and the DB session are shared by every sub-request
+    with current_app.test_request_context(item["path"], method=method, json=item.get("body"),
+                                          headers=headers, environ_base={"REMOTE_ADDR": request.remote_addr}):
+        try:
+            response = current_app.full_dispatch_request()
+        except Exception:
+            current_app.logger.exception("batched %s %s failed", method, item["path"])
+            db.session.rollback()
+            return 500, {"error": "Internal server error"}
+        if response.is_streamed:
+            response.close()
+            return 400, {"error": "Streaming endpoints cannot be batched"}
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return response.status_code, body
+
+@batch_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def run_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty 'requests' list"}), 400
+    limit = current_app.config.get("BATCH_MAX_REQUESTS", 20)
+    if len(items) > limit:
+        return jsonify({"error": f"A batch may contain at most {limit} requests"}), 400
+
+    g.batch_user = current_user._get_current_object()
+    try:
+        results = []
+        for item in items:
+            status, body = _run(item)
+            results.append({"id": item.get("id") if isinstance(item, dict) else None, "status": status, "body": body})
+    finally:
+        g.pop("batch_user", None)
+    return jsonify({"responses": results}), 200
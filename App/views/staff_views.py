@@ -1,7 +1,9 @@
 # App/views/staff_views.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
 from flask_jwt_extended import jwt_required, current_user
-from App.controllers import staff_controller
+from App.controllers import staff_controller, swap_controller, repair_controller, calendar_controller
+from App import events
+from App.idempotency import idempotent
 
 staff_bp = Blueprint('staff_bp', __name__, url_prefix="/staff")
 
@@ -20,6 +22,13 @@ def view_profile():
 def view_roster():
     if not is_staff():
         return jsonify({"error": "Staff only"}), 403
+    if request.args.get("from"):
+        result = staff_controller.view_roster_range(
+            request.args.get("from"),
+            request.args.get("to"),
+            compact=request.args.get("compact", "").lower() in ("1", "true", "yes")
+        )
+        return jsonify(result), 400 if "error" in result else 200
     week_start = request.args.get("week_start")
     return jsonify(staff_controller.view_roster(week_start)), 200
 
@@ -32,6 +41,7 @@ def my_shifts():
 
 @staff_bp.route('/shifts/<int:shift_id>/time-in', methods=['POST'])
 @jwt_required()
+@idempotent
 def time_in(shift_id):
     if not is_staff():
         return jsonify({"error": "Staff only"}), 403
@@ -40,8 +50,96 @@ def time_in(shift_id):
 
 @staff_bp.route('/shifts/<int:shift_id>/time-out', methods=['POST'])
 @jwt_required()
+@idempotent
 def time_out(shift_id):
     if not is_staff():
         return jsonify({"error": "Staff only"}), 403
     ts = request.json.get("timestamp") if request.json else None
     return jsonify(staff_controller.time_out(current_user.userId, shift_id, ts)), 200
+
+@staff_bp.route('/open-shifts', methods=['GET'])
+@jwt_required()
+def open_shifts():
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    return jsonify(swap_controller.list_open_shifts(current_user.userId)), 200
+
+@staff_bp.route('/shifts/<int:shift_id>/offer', methods=['POST', 'DELETE'])
+@jwt_required()
+def offer_shift(shift_id):
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    result = swap_controller.set_offered(current_user.userId, shift_id, offered=request.method == 'POST')
+    return jsonify(result), 404 if "error" in result else 200
+
+@staff_bp.route('/shifts/<int:shift_id>/claim', methods=['POST'])
+@jwt_required()
+def claim_shift(shift_id):
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    result = swap_controller.claim_shift(current_user.userId, shift_id)
+    if "error" in result:
+        return jsonify(result), 409 if result.get("conflict") else 400
+    return jsonify(result), 200
+
+@staff_bp.route('/shifts/<int:shift_id>/swap', methods=['POST'])
+@jwt_required()
+def swap_shift(shift_id):
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    data = request.get_json() or {}
+    if not data.get("withShiftId"):
+        return jsonify({"error": "withShiftId is required"}), 400
+    result = swap_controller.swap_shift(current_user.userId, shift_id, data["withShiftId"])
+    if "error" in result:
+        return jsonify(result), 409 if result.get("conflict") else 400
+    return jsonify(result), 200
+
+@staff_bp.route('/shifts/<int:shift_id>/call-off', methods=['POST'])
+@jwt_required()
+def call_off(shift_id):
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    result = repair_controller.call_off(current_user.userId, shift_id)
+    return jsonify(result), 404 if "error" in result else 200
+
+@staff_bp.route('/calendar', methods=['GET', 'POST'])
+@jwt_required()
+def calendar_link():
+    """GET: your feed URL; POST: replace it (the old URL stops working)."""
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    result = calendar_controller.calendar_token(current_user.userId, reset=request.method == "POST")
+    if "error" in result:
+        return jsonify(result), 404
+    result["url"] = url_for("staff_bp.calendar_feed", token=result["token"], _external=True)
+    return jsonify(result), 200
+
+@staff_bp.route('/<token>/calendar.ics', methods=['GET'])
+def calendar_feed(token):
+    # the token in the URL is the credential: calendar apps can't send a JWT
+    feed = calendar_controller.calendar_feed(token)
+    if feed is None:
+        return jsonify({"error": "Unknown calendar"}), 404
+    response = Response(feed.body, mimetype="text/calendar")
+    response.set_etag(feed.etag)
+    response.last_modified = feed.last_modified
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get("CALENDAR_MAX_AGE", 300)
+    return response.make_conditional(request)
+
+@staff_bp.route('/events', methods=['GET'])
+@jwt_required()
+def event_stream():
+    if not is_staff():
+        return jsonify({"error": "Staff only"}), 403
+    staff_id = current_user.userId
+
+    def accepts(event):
+        # roster-wide shift changes plus anything about this person
+        return event["type"].startswith("shift.") or event.get("staffId") in (None, staff_id)
+
+    subscription = events.subscribe(accepts, request.headers.get("Last-Event-ID", type=int))
+    return Response(events.stream(subscription, current_app.config.get("EVENTS_HEARTBEAT", 15.0)),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
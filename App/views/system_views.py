@@ -1,6 +1,8 @@
 # App/views/system_views.py
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
+from flask_jwt_extended import jwt_required
 from App.controllers import initialize
+from App.views.admin_views import is_admin
 
 system_bp = Blueprint('system_bp', __name__, url_prefix="/system")
 
@@ -13,3 +15,11 @@ def initialize_app():
     })
     return response, 200
 
+
+@system_bp.route('/admission', methods=['GET'])
+@jwt_required()
+def admission_metrics():
+    """Admitted/queued/rejected counters per admission policy."""
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(current_app.extensions["admission"].snapshot()), 200
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Standalone performance checks, run with `python -m benchmarks.<name>`.
@@ -0,0 +1,62 @@
+# benchmarks/bench_calendar.py
+"""Calendar app polling: cached .ics feeds (and 304s) vs rebuilding every feed on each poll."""
+import secrets
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.controllers import calendar_controller
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 500
+SHIFTS_PER_PERSON = 40
+POLLS = 5000
+
+
+def build():
+    bulk_staff(STAFF)
+    staff_ids = db.session.scalars(select(Staff.userId)).all()
+    db.session.execute(update(Staff), [{"userId": sid, "calendarToken": secrets.token_urlsafe(24)}
+                                       for sid in staff_ids])
+    today = datetime.combine(date.today(), datetime.min.time())
+    db.session.execute(insert(Shift), [
+        {"staffId": sid, "role": "Cook", "startTime": today + timedelta(days=d, hours=9),
+         "endTime": today + timedelta(days=d, hours=17)}
+        for sid in staff_ids for d in range(-5, SHIFTS_PER_PERSON - 5)
+    ])
+    db.session.commit()
+    return db.session.scalars(select(Staff.calendarToken)).all()
+
+
+def poll(client, tokens, conditional=None):
+    for i in range(POLLS):
+        token = tokens[i % len(tokens)]
+        headers = {"If-None-Match": conditional[token]} if conditional else {}
+        response = client.get(f"/staff/{token}/calendar.ics", headers=headers)
+        assert response.status_code == (304 if conditional else 200)
+
+
+def main():
+    app = make_app(ADMISSION_ENABLED=False, COMPRESS_ENABLED=False, EVENTS_POLL_INTERVAL=0)
+    with app.app_context():
+        tokens = build()
+    client = app.test_client()
+    app.config["CALENDAR_CACHE_TTL"] = 0
+    with timed(f"{POLLS} polls, no cache (rebuild each time)"):
+        poll(client, tokens)
+    app.config["CALENDAR_CACHE_TTL"] = 3600
+    calendar_controller.feed_cache.clear()
+    with timed(f"{POLLS} polls, cache cold then warm"):
+        poll(client, tokens)
+    with timed(f"{POLLS} polls, warm cache"):
+        poll(client, tokens)
+    etags = {t: client.get(f"/staff/{t}/calendar.ics").headers["ETag"] for t in tokens}
+    with timed(f"{POLLS} conditional polls (304)"):
+        poll(client, tokens, etags)
+
+
+if __name__ == "__main__":
+    main()
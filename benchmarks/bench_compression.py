@@ -0,0 +1,76 @@
+# benchmarks/bench_compression.py
+"""Bytes on the wire and compression CPU per route and encoding, for a 5,000-shift week."""
+import time
+from datetime import date, datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.admin import Admin
+from App.models.staff import Staff
+from App.models.roster import Roster
+from App.models.shift import Shift
+from App.compression import compressor, _zstd
+from benchmarks.common import make_app, bulk_staff
+
+STAFF = 500
+SHIFTS = 5_000
+RUNS = 20
+
+
+def build_week():
+    bulk_staff(STAFF)
+    admin = Admin(username="bench_admin", email="bench_admin@example.com", passwordHash="x", type="admin")
+    db.session.add(admin)
+    week = date.today() - timedelta(days=date.today().weekday())
+    roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+    db.session.add(roster)
+    db.session.flush()
+    staff_ids = [r[0] for r in db.session.execute(select(Staff.userId))]
+    monday = datetime.combine(week, datetime.min.time())
+    db.session.execute(insert(Shift), [
+        {
+            "rosterId": roster.rosterId,
+            "staffId": staff_ids[i % STAFF],
+            "role": "Cook",
+            "startTime": monday + timedelta(days=i % 7, hours=6 + i % 12),
+            "endTime": monday + timedelta(days=i % 7, hours=14 + i % 12)
+        }
+        for i in range(SHIFTS)
+    ])
+    db.session.commit()
+    return admin.userId, staff_ids[0]
+
+
+def main():
+    app = make_app(ADMISSION_ENABLED=False)
+    encodings = ["gzip", "deflate"] + (["zstd"] if _zstd() else [])
+    with app.app_context():
+        admin_id, staff_id = build_week()
+        routes = {
+            "/admin/shifts": create_access_token(identity=admin_id),
+            "/staff/roster": create_access_token(identity=staff_id),
+        }
+        client = app.test_client()
+        print(f"{'route':<16} {'encoding':<9} {'level':>5} {'bytes':>10} {'saved':>7} {'cpu/resp':>10}")
+        for path, token in routes.items():
+            headers = {"Authorization": f"Bearer {token}"}
+            raw = client.get(path, headers=dict(headers, **{"Accept-Encoding": "identity"})).get_data()
+            print(f"{path:<16} {'identity':<9} {'-':>5} {len(raw):>10} {'':>7} {'':>10}")
+            for encoding in encodings:
+                for level in (1, 6, 9):
+                    start = time.process_time()
+                    for _ in range(RUNS):
+                        encoder = compressor(encoding, level)
+                        body = encoder.compress(raw) + encoder.flush()
+                    cpu_ms = (time.process_time() - start) / RUNS * 1000
+                    saved = 1 - len(body) / len(raw)
+                    print(f"{path:<16} {encoding:<9} {level:>5} {len(body):>10} {saved:>6.1%} {cpu_ms:>8.2f}ms")
+            # end-to-end check that the middleware actually serves the negotiated encoding
+            served = client.get(path, headers=dict(headers, **{"Accept-Encoding": "gzip"}))
+            assert served.headers.get("Content-Encoding") == "gzip"
+
+
+if __name__ == "__main__":
+    main()
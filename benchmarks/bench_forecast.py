@@ -0,0 +1,77 @@
+# benchmarks/bench_forecast.py
+"""Staffing forecast: prefix sums over column arrays vs counting every shift-hour, and cached repeats."""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.models.attendance import AttendanceRecord
+from App.controllers import forecast_controller
+from App.controllers.hours_controller import week_of
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 1000
+WEEKS = 12
+REPEATS = 200
+
+
+def build(first_monday):
+    bulk_staff(STAFF)
+    staff_ids = db.session.scalars(select(Staff.userId)).all()
+    db.session.execute(insert(Shift), [
+        {"staffId": sid, "role": ("Cook", "Server", "Host")[i % 3],
+         "startTime": first_monday + timedelta(weeks=w, days=d, hours=6 + i % 12),
+         "endTime": first_monday + timedelta(weeks=w, days=d, hours=14 + i % 12)}
+        for i, sid in enumerate(staff_ids) for w in range(WEEKS) for d in range(5)
+    ])
+    # roughly one shift in eleven missed, one in seven a quarter hour late
+    shifts = db.session.execute(select(Shift.shiftId, Shift.staffId, Shift.startTime)).all()
+    db.session.execute(insert(AttendanceRecord), [
+        {"staffId": staff_id, "shiftId": shift_id, "timeIn": start + timedelta(minutes=15 * (shift_id % 7 == 0))}
+        for shift_id, staff_id, start in shifts if shift_id % 11
+    ])
+    db.session.commit()
+    return len(shifts)
+
+
+def count_hour_by_hour(first_monday):
+    """The direct version: walk every hour of every shift."""
+    scheduled, present = Counter(), Counter()
+    rows = db.session.execute(
+        select(Shift.role, Shift.startTime, Shift.endTime, AttendanceRecord.timeIn)
+        .outerjoin(AttendanceRecord, AttendanceRecord.shiftId == Shift.shiftId)
+        .where(Shift.startTime >= first_monday)
+    )
+    for role, start, end, time_in in rows:
+        hour = start
+        while hour < end:
+            slot = (role, hour.weekday() * 24 + hour.hour)
+            scheduled[slot] += 1
+            present[slot] += time_in is not None and time_in <= hour + timedelta(minutes=30)
+            hour += timedelta(hours=1)
+    return scheduled, present
+
+
+def main():
+    app = make_app(EVENTS_POLL_INTERVAL=0, FORECAST_HISTORY_WEEKS=WEEKS)
+    today = datetime.utcnow()
+    first_monday = datetime.combine(week_of(today) - timedelta(weeks=WEEKS), datetime.min.time())
+    with app.app_context():
+        print(build(first_monday), "shifts")
+        with timed("count every shift-hour (aggregates only)"):
+            count_hour_by_hour(first_monday)
+        with timed("forecast (column arrays, prefix sums)"):
+            result = forecast_controller.forecast(today=today)
+        with timed(f"{REPEATS} repeat forecasts, cached by data version"):
+            for _ in range(REPEATS):
+                forecast_controller.forecast(today=today)
+        for role, data in result["roles"].items():
+            print(role, "no-show", data["noShowRate"], "late", data["lateRate"])
+        forecast_controller.forecast_cache.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_history.py
+"""Point-in-time roster reconstruction vs history length: nearest snapshot + replay, and full replay."""
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from App.database import db
+from App.models.roster import Roster
+from App.models.schedulelog import RosterSnapshot
+from App.controllers import history_controller
+from benchmarks.common import make_app, timed
+
+SHIFTS = 50
+HISTORY = (1000, 10000, 50000)
+RUNS = 5
+
+
+def add_history(roster_id, monday, events, start_n):
+    """`events` reassignments spread over the roster's shifts, one change of every shift per call."""
+    for n in range(start_n, start_n + events, SHIFTS):
+        history_controller.record_shifts("shift.reassigned", [
+            SimpleNamespace(shiftId=i + 1, rosterId=roster_id, staffId=(n + i) % 40 + 1, role="Cook",
+                            isOffered=False, startTime=monday + timedelta(hours=i * 3),
+                            endTime=monday + timedelta(hours=i * 3 + 8), locationId=None)
+            for i in range(SHIFTS)
+        ])
+    db.session.commit()
+
+
+def main():
+    app = make_app(ADMISSION_ENABLED=False)
+    with app.app_context():
+        week = date.today() - timedelta(days=date.today().weekday())
+        roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+        db.session.add(roster)
+        db.session.commit()
+        monday = datetime.combine(week, datetime.min.time())
+        total = 0
+        for length in HISTORY:
+            add_history(roster.rosterId, monday, length - total, total)
+            total = length
+            warm = history_controller.roster_at(roster.rosterId)
+            with timed(f"{length:>6} events: latest, from snapshot"):
+                for _ in range(RUNS):
+                    latest = history_controller.roster_at(roster.rosterId)
+            # drop the snapshots and replay the whole log instead
+            snapshots = [(s.rosterId, s.eventId, s.takenAt, s.shifts) for s in RosterSnapshot.query]
+            RosterSnapshot.query.delete()
+            with timed(f"{length:>6} events: latest, full replay"):
+                for _ in range(RUNS):
+                    full = history_controller.roster_at(roster.rosterId)
+            db.session.rollback()
+            assert full["shifts"] == latest["shifts"] and warm["shifts"] == latest["shifts"]
+            print(f"  replayed {latest['replayedEvents']} vs {full['replayedEvents']} events "
+                  f"({len(snapshots)} snapshots; times are for {RUNS} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_locations.py
+"""Per-site query cost as the number of sites grows (fixed 200 shifts per site)."""
+import time
+from datetime import date, datetime, timedelta
+
+from flask import g
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.location import Location
+from App.models.shift import Shift
+from App.controllers import admin_controller
+from benchmarks.common import make_app
+
+SITE_COUNTS = (10, 100, 1000)
+SHIFTS_PER_SITE = 200
+RUNS = 50
+
+
+def add_sites(start_id, count):
+    monday = datetime.combine(date.today() - timedelta(days=date.today().weekday()), datetime.min.time())
+    db.session.execute(insert(Location), [{"name": f"site{i}"} for i in range(start_id, start_id + count)])
+    ids = db.session.scalars(select(Location.locationId).where(Location.locationId > start_id - 1)).all()
+    db.session.execute(insert(Shift), [
+        {"locationId": site, "role": "Cook",
+         "startTime": monday + timedelta(hours=i), "endTime": monday + timedelta(hours=i + 8)}
+        for site in ids for i in range(SHIFTS_PER_SITE)
+    ])
+    db.session.commit()
+
+
+def main():
+    app = make_app(ADMISSION_ENABLED=False)
+    with app.app_context():
+        total = 0
+        print(f"{'sites':>6} {'shifts':>9} {'list one site':>15} {'week query':>12}")
+        for count in SITE_COUNTS:
+            add_sites(total + 1, count - total)
+            total = count
+            g.location_id = count // 2
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                rows = admin_controller.list_shifts()
+                db.session.expunge_all()
+            listing = (time.perf_counter() - start) / RUNS * 1000
+            monday = datetime.combine(date.today() - timedelta(days=date.today().weekday()), datetime.min.time())
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                db.session.scalars(select(Shift).where(Shift.startTime >= monday,
+                                                       Shift.startTime < monday + timedelta(days=1))).all()
+                db.session.expunge_all()
+            week = (time.perf_counter() - start) / RUNS * 1000
+            g.pop("location_id")
+            assert len(rows) == SHIFTS_PER_SITE
+            print(f"{count:>6} {count * SHIFTS_PER_SITE:>9} {listing:>13.2f}ms {week:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
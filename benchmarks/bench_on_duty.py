@@ -0,0 +1,72 @@
+# benchmarks/bench_on_duty.py
+"""Floor-view polling: the in-memory on-duty index vs querying shifts and attendance each time."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, insert, select
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.models.attendance import AttendanceRecord
+from App.controllers import duty_controller
+from App.controllers.swap_controller import MAX_SHIFT_LENGTH
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 2000
+DAYS = 28
+POLLS = 500
+
+
+def build(now):
+    bulk_staff(STAFF)
+    staff_ids = db.session.scalars(select(Staff.userId)).all()
+    # staggered 8-hour shifts for four weeks either side of today
+    first = now.replace(minute=0, second=0) - timedelta(days=DAYS)
+    db.session.execute(insert(Shift), [
+        {"staffId": sid, "role": ("Cook", "Server", "Host")[i % 3],
+         "startTime": first + timedelta(days=d, hours=i % 24),
+         "endTime": first + timedelta(days=d, hours=i % 24 + 8)}
+        for i, sid in enumerate(staff_ids) for d in range(0, 2 * DAYS, 2)
+    ])
+    started = db.session.execute(select(Shift.shiftId, Shift.staffId, Shift.startTime)
+                                 .where(Shift.startTime <= now)).all()
+    db.session.execute(insert(AttendanceRecord), [
+        {"staffId": staff_id, "shiftId": shift_id, "timeIn": start} for shift_id, staff_id, start in started
+    ])
+    db.session.commit()
+
+
+def query_board(now):
+    """What the endpoint would do without the index."""
+    return db.session.execute(
+        select(Shift.shiftId, Shift.staffId, Shift.role, Shift.startTime, Shift.endTime,
+               Staff.username, AttendanceRecord.timeIn, AttendanceRecord.timeOut)
+        .join(Staff, Staff.userId == Shift.staffId)
+        .outerjoin(AttendanceRecord, and_(AttendanceRecord.shiftId == Shift.shiftId,
+                                          AttendanceRecord.staffId == Shift.staffId))
+        .where(Shift.startTime > now - MAX_SHIFT_LENGTH, Shift.startTime <= now, Shift.endTime > now)
+    ).all()
+
+
+def main():
+    app = make_app(EVENTS_POLL_INTERVAL=0)
+    now = datetime.utcnow()
+    with app.app_context():
+        build(now)
+        print(f"{db.session.query(Shift).count()} shifts, {len(query_board(now))} on duty now")
+        with timed(f"{POLLS} polls, range scan + attendance join"):
+            for i in range(POLLS):
+                query_board(now + timedelta(seconds=i))
+        with timed("index build (first poll)"):
+            duty_controller.on_duty(now=now)
+        with timed(f"{POLLS} polls, in-memory index"):
+            for i in range(POLLS):
+                duty_controller.on_duty(now=now + timedelta(seconds=i))
+        with timed(f"{POLLS} polls, in-memory index, clock moving a minute per poll"):
+            for i in range(POLLS):
+                duty_controller.on_duty(now=now + timedelta(minutes=i))
+        duty_controller.duty_index.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_repair.py
+"""Time to re-cover call-offs in a busy week (500 staff working 4 of 7 days) within the repair budget."""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.shift import Shift
+from App.controllers import hours_controller, repair_controller
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 500
+DAYS_WORKED = 4
+CALL_OFFS = (1, 10, 50)
+
+
+def build_week():
+    bulk_staff(STAFF)
+    week = date.today() + timedelta(days=7 - date.today().weekday())
+    monday = datetime.combine(week, datetime.min.time())
+    staff_ids = [r[0] for r in db.session.execute(select(Staff.userId))]
+    # staggered rotas: everyone works 8h on 4 days, so each day some people are off
+    db.session.execute(insert(Shift), [
+        {
+            "staffId": staff_id,
+            "role": "Cook",
+            "startTime": monday + timedelta(days=day, hours=6 + n % 3 * 4),
+            "endTime": monday + timedelta(days=day, hours=14 + n % 3 * 4)
+        }
+        for n, staff_id in enumerate(staff_ids)
+        for day in range(7) if (n + day) % 7 < DAYS_WORKED
+    ])
+    db.session.commit()
+    hours_controller.rebuild_hours()
+
+
+def main():
+    app = make_app(ADMISSION_ENABLED=False)
+    with app.app_context():
+        build_week()
+        for count in CALL_OFFS:
+            ids = db.session.scalars(select(Shift.shiftId).where(Shift.staffId.is_not(None))
+                                     .order_by(Shift.shiftId.desc()).limit(count)).all()
+            db.session.execute(update(Shift).where(Shift.shiftId.in_(ids)).values(staffId=None))
+            db.session.commit()
+            with timed(f"propose cover for {count} call-offs"):
+                plan = repair_controller.propose_repair(ids)
+            with timed(f"apply {plan['changes']} changes"):
+                repair_controller.apply_repair(plan)
+            print(f"  uncovered={len(plan['uncovered'])} timedOut={plan['timedOut']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# benchmarks/bench_revocation.py
+"""Token checks: the in-memory Bloom filter and set vs looking every jti up in revoked_tokens."""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from App.database import db
+from App.models.revokedtoken import RevokedToken
+from App.revocation import revocations
+from benchmarks.common import make_app, timed
+
+REVOKED = 50000
+CHECKS = 20000
+
+
+def main():
+    # exact set large enough for every revocation; with fewer, revoked tokens past it cost a lookup
+    app = make_app(REVOCATION_CACHE_SIZE=REVOKED)
+    with app.app_context():
+        now = datetime.utcnow()
+        revoked = [str(uuid.uuid4()) for _ in range(REVOKED)]
+        db.session.execute(insert(RevokedToken), [
+            {"jti": jti, "revokedAt": now, "expiresAt": now + timedelta(minutes=15)} for jti in revoked
+        ])
+        db.session.commit()
+        live = [str(uuid.uuid4()) for _ in range(CHECKS)]
+
+        with timed(f"{CHECKS} checks, primary-key lookup each"):
+            for jti in live:
+                db.session.get(RevokedToken, jti)
+            db.session.rollback()
+        with timed(f"load {REVOKED} revocations into memory"):
+            revocations.is_revoked("")
+        with timed(f"{CHECKS} checks of live tokens, in memory"):
+            hits = sum(revocations.is_revoked(jti) for jti in live)
+        with timed(f"{CHECKS} checks of revoked tokens, in memory"):
+            assert all(revocations.is_revoked(jti) for jti in revoked[:CHECKS])
+        print(f"live tokens reported revoked: {hits} of {CHECKS} "
+              f"(filter: {len(revocations.bloom.bits) // 1024} KiB, {revocations.bloom.hashes} hashes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_roster_clone.py
+"""Copying a week's roster: one INSERT ... SELECT vs reading and re-adding every shift."""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.roster import Roster
+from App.models.shift import Shift
+from App.models.staff import Staff
+from App.controllers import template_controller
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 2000
+SHIFTS_PER_PERSON = 5
+
+
+def build():
+    bulk_staff(STAFF)
+    staff_ids = db.session.scalars(select(Staff.userId)).all()
+    week = date(2030, 1, 7)
+    roster = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+    db.session.add(roster)
+    db.session.flush()
+    monday = datetime.combine(week, datetime.min.time())
+    db.session.execute(insert(Shift), [
+        {"rosterId": roster.rosterId, "staffId": sid, "role": "Cook",
+         "startTime": monday + timedelta(days=d, hours=9), "endTime": monday + timedelta(days=d, hours=17)}
+        for sid in staff_ids for d in range(SHIFTS_PER_PERSON)
+    ])
+    db.session.commit()
+    return roster.rosterId, week
+
+
+def copy_row_by_row(roster_id, week):
+    """Roughly what a client does today: fetch the roster, then add each shift a week later."""
+    target = Roster(weekStartDate=week, weekEndDate=week + timedelta(days=6))
+    db.session.add(target)
+    db.session.flush()
+    for shift in Shift.query.filter_by(rosterId=roster_id).all():
+        db.session.add(Shift(rosterId=target.rosterId, staffId=shift.staffId, role=shift.role,
+                             startTime=shift.startTime + timedelta(days=7 * 52),
+                             endTime=shift.endTime + timedelta(days=7 * 52)))
+        db.session.flush()
+    db.session.commit()
+
+
+def main():
+    app = make_app(EVENTS_POLL_INTERVAL=0)
+    with app.app_context():
+        roster_id, week = build()
+        with timed(f"copy {STAFF * SHIFTS_PER_PERSON} shifts row by row"):
+            copy_row_by_row(roster_id, week + timedelta(days=7 * 52))
+        with timed(f"clone {STAFF * SHIFTS_PER_PERSON} shifts (INSERT ... SELECT, conflict checks, hours, history)"):
+            result = template_controller.clone_roster(roster_id, week + timedelta(days=7))
+        print(result["created"], "created,", result["skippedConflicts"], "conflicts")
+        with timed("clone again (everything conflicts)"):
+            result = template_controller.clone_roster(roster_id, week + timedelta(days=7))
+        print(result["created"], "created,", result["skippedConflicts"], "conflicts")
+
+
+if __name__ == "__main__":
+    main()
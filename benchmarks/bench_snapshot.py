@@ -0,0 +1,70 @@
+# benchmarks/bench_snapshot.py
+"""Save and restore a ~100k-row data set, compared with the old seed-by-commit approach."""
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.staff import Staff
+from App.models.roster import Roster
+from App.models.shift import Shift
+from App.models.attendance import AttendanceRecord
+from App.controllers.snapshot_controller import save_snapshot, load_snapshot
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 1_000
+WEEKS = 50
+
+
+def build_dataset():
+    bulk_staff(STAFF)
+    staff_ids = [r[0] for r in db.session.execute(select(Staff.userId))]
+    first = date(2024, 1, 1)
+    db.session.execute(insert(Roster), [
+        {"weekStartDate": first + timedelta(weeks=w), "weekEndDate": first + timedelta(weeks=w, days=6)}
+        for w in range(WEEKS)
+    ])
+    rosters = db.session.execute(select(Roster.rosterId, Roster.weekStartDate)).all()
+    shifts = []
+    for roster_id, week in rosters:
+        for i, staff_id in enumerate(staff_ids):
+            start = datetime.combine(week, datetime.min.time()) + timedelta(days=i % 7, hours=8)
+            shifts.append({"rosterId": roster_id, "staffId": staff_id, "startTime": start, "endTime": start + timedelta(hours=8)})
+    db.session.execute(insert(Shift), shifts)
+    db.session.execute(insert(AttendanceRecord), [
+        {"staffId": staff_id, "shiftId": shift_id, "timeIn": start, "timeOut": start + timedelta(hours=8)}
+        for shift_id, staff_id, start in db.session.execute(select(Shift.shiftId, Shift.staffId, Shift.startTime))
+    ])
+    db.session.commit()
+
+
+def main():
+    app = make_app()
+    path = os.path.join(tempfile.mkdtemp(), "bench.snap.gz")
+    with app.app_context():
+        with timed("build data set (bulk inserts)"):
+            build_dataset()
+        with timed("snapshot save"):
+            counts = save_snapshot(path)
+        print(f"rows={sum(counts.values())} file={os.path.getsize(path) / 1024:.0f} KiB")
+        with timed("snapshot load"):
+            load_snapshot(path)
+
+        # the old path: one ORM add + commit per shift
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        roster = Roster(weekStartDate=date(2024, 1, 1), weekEndDate=date(2024, 1, 7))
+        db.session.add(roster)
+        db.session.commit()
+        with timed("row-by-row seed, 1,000 shifts (for scale)"):
+            for i in range(1000):
+                start = datetime(2024, 1, 1, 8) + timedelta(minutes=i)
+                db.session.add(Shift(rosterId=roster.rosterId, staffId=1, startTime=start, endTime=start + timedelta(hours=8)))
+                db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_sse_connections.py
+"""
+Idle SSE connections held by one gunicorn gevent worker: opens real HTTP
+streams to /staff/events (one staff token each), then times how long one event
+written by another process takes to reach all of them. Usage:
+
+    python -m benchmarks.bench_sse_connections [connections]
+"""
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select
+
+from App import events
+from App.database import db
+from App.models.staff import Staff
+from benchmarks.common import make_app, bulk_staff, timed
+
+CONNECTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_worker(database_uri, port):
+    env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=database_uri)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", "gevent", "-w", "1",
+         "--worker-connections", str(CONNECTIONS + 100), "--backlog", "4096",
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning", "wsgi:app"],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("gunicorn did not start")
+
+def worker_rss_kib(master_pid):
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) != master_pid:
+                    continue
+            with open(f"/proc/{pid}/status") as f:
+                return next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+        except (OSError, ValueError):
+            continue
+    return 0
+
+def open_stream(selector, received, port, token):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(f"GET /staff/events HTTP/1.1\r\nHost: bench\r\n"
+                 f"Authorization: Bearer {token}\r\n\r\n".encode())
+    sock.setblocking(False)
+    selector.register(sock, selectors.EVENT_READ)
+    received[sock] = b""
+
+def read_until(selector, received, marker, timeout=120):
+    """Read from every stream until each has sent `marker`; returns how many have."""
+    waiting = {key.fileobj for key in selector.get_map().values() if marker not in received[key.fileobj]}
+    deadline = time.monotonic() + timeout
+    while waiting and time.monotonic() < deadline:
+        for key, _ in selector.select(1):
+            sock = key.fileobj
+            chunk = sock.recv(65536)
+            received[sock] += chunk
+            if marker in received[sock]:
+                waiting.discard(sock)
+    return len(received) - len(waiting)
+
+
+def main():
+    app = make_app(EVENTS_POLL_INTERVAL=0)
+    with app.app_context():
+        bulk_staff(CONNECTIONS, prefix="sse")
+        tokens = [create_access_token(identity=i) for i in db.session.scalars(select(Staff.userId))]
+        database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    port = free_port()
+    server = start_worker(database_uri, port)
+    selector = selectors.DefaultSelector()
+    received = {}
+    try:
+        # the first stream warms the worker up (imports, session, poller), so it isn't counted
+        open_stream(selector, received, port, tokens[0])
+        read_until(selector, received, b"retry:")
+        warm_rss = worker_rss_kib(server.pid)
+        with timed(f"open {CONNECTIONS - 1} more SSE streams"):
+            for token in tokens[1:]:
+                open_stream(selector, received, port, token)
+            connected = read_until(selector, received, b"retry:")
+        rss = worker_rss_kib(server.pid)
+        print(f"{connected} of {CONNECTIONS} streams open; worker RSS {warm_rss // 1024} MiB -> {rss // 1024} MiB "
+              f"({(rss - warm_rss) / max(connected - 1, 1):.1f} KiB per connection)")
+
+        for sock in received:
+            received[sock] = b""
+        with app.app_context(), timed("one event from another process reaches every stream"):
+            events.publish("shift.scheduled", shiftId=-1)
+            delivered = read_until(selector, received, b'"shiftId":-1')
+        print(f"delivered to {delivered} of {connected} (includes up to EVENTS_POLL_INTERVAL of poll delay)")
+    finally:
+        for sock in received:
+            sock.close()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
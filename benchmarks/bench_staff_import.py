@@ -0,0 +1,56 @@
+# benchmarks/bench_staff_import.py
+"""
+Staff onboarding throughput: create_staff one row at a time (the old path) vs the
+CSV import with inline hashing vs the import's process pool (one worker per core).
+"""
+import csv
+import io
+import os
+import sys
+
+from sqlalchemy import delete
+
+from App.database import db
+from App.models.user import User
+from App.models.staff import Staff
+from App.controllers import admin_controller, staff_import_controller
+from benchmarks.common import make_app, timed
+
+# each hash is deliberately slow (scrypt), so keep the default run short; pass a count to override
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+def make_csv(rows):
+    lines = ["username,email,password,role"]
+    lines += [f"season{i},season{i}@example.com,pw-{i}-secret,Cook" for i in range(rows)]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    db.session.execute(delete(Staff.__table__))
+    db.session.execute(delete(User))
+    db.session.commit()
+
+
+def main():
+    app = make_app()
+    data = make_csv(ROWS)
+    results = {}
+    if (os.cpu_count() or 1) == 1:
+        print("only one core: the pool run falls back to inline hashing, expect no speed-up")
+    with app.app_context():
+        with timed(f"create_staff x {ROWS}", results):
+            for row in csv.DictReader(io.StringIO(data)):
+                admin_controller.create_staff(row)
+        reset()
+        for label, workers in (("serial (workers=1)", 1), (f"pool (workers={os.cpu_count()})", None)):
+            with timed(f"import {ROWS} staff, {label}", results):
+                result = staff_import_controller.import_staff(io.StringIO(data), workers=workers)
+            assert result["imported"] == ROWS, result
+            reset()
+        for label, seconds in results.items():
+            print(f"{label:<50} {ROWS / seconds:10.1f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
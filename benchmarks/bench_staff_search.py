@@ -0,0 +1,35 @@
+# benchmarks/bench_staff_search.py
+"""Indexed prefix search vs. the old list-everything-and-filter approach, at 50,000 staff."""
+import time
+
+from App.controllers.admin_controller import list_staff, search_staff
+from benchmarks.common import make_app, bulk_staff, timed
+
+STAFF = 50_000
+QUERIES = ["s", "staff1", "staff4999", "STAFF12", "nobody"]
+
+
+def full_scan(q, limit=10):
+    q = q.lower()
+    matches = [s for s in list_staff() if s["username"].lower().startswith(q) or s["email"].lower().startswith(q)]
+    return matches[:limit]
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        bulk_staff(STAFF)
+        for q in QUERIES:
+            with timed(f"full scan      q={q!r}"):
+                full_scan(q)
+            search_staff(q=q)  # warm the statement cache
+            runs = 50
+            start = time.perf_counter()
+            for _ in range(runs):
+                result = search_staff(q=q)
+            per_query = (time.perf_counter() - start) / runs
+            print(f"{'indexed search q=' + repr(q):<50} {per_query * 1000:10.2f} ms  ({len(result['results'])} hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_startup.py
+"""
+Startup budget for a gunicorn worker: time to import `wsgi` (which builds the app)
+and the resident memory afterwards, measured in fresh interpreters.
+
+    python -m benchmarks.bench_startup [--runs 5] [--budget-ms 1000] [--budget-mb 100] [--no-gevent]
+
+Prints a JSON summary and exits non-zero when the median run is over budget
+or a module that should load lazily was imported at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# only needed by specific commands; a worker should never import them
+LAZY_MODULES = ["pytest", "flask_admin", "flask_migrate", "alembic"]
+
+PROBE = """
+import json, resource, sys, time
+patched = False
+if {gevent}:
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        patched = True
+    except Exception:
+        pass  # report an unpatched measurement rather than none at all
+start = time.perf_counter()
+import wsgi
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_ms": elapsed * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "gevent": patched,
+    "lazy_loaded": [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(gevent=True):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = PROBE.format(gevent=gevent, lazy=LAZY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", 1000)))
+    parser.add_argument("--budget-mb", type=float, default=float(os.environ.get("STARTUP_BUDGET_MB", 100)))
+    parser.add_argument("--no-gevent", action="store_true", help="skip gevent monkey-patching (CLI startup)")
+    args = parser.parse_args()
+
+    measure(not args.no_gevent)  # warm the bytecode cache
+    runs = [measure(not args.no_gevent) for _ in range(args.runs)]
+    summary = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "rss_mb_median": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "modules": runs[-1]["modules"],
+        "gevent": runs[-1]["gevent"],
+        "lazy_loaded": runs[-1]["lazy_loaded"],
+        "budget_ms": args.budget_ms,
+        "budget_mb": args.budget_mb,
+    }
+    summary["ok"] = (
+        summary["import_ms_median"] <= args.budget_ms
+        and summary["rss_mb_median"] <= args.budget_mb
+        and not summary["lazy_loaded"]
+    )
+    print(json.dumps(summary, indent=2))
+    sys.exit(0 if summary["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_templates.py
+"""Materialize 52 weeks x 500 recurring templates, then re-run to check idempotency cost."""
+from datetime import date, time, timedelta
+
+from sqlalchemy import insert
+
+from App.database import db
+from App.models.shift import Shift
+from App.models.staff import Staff
+from App.models.shifttemplate import ShiftTemplate
+from App.controllers.template_controller import materialize_templates
+from benchmarks.common import make_app, bulk_staff, timed
+
+TEMPLATES = 500
+WEEKS = 52
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        bulk_staff(TEMPLATES)
+        staff_ids = [row[0] for row in db.session.query(Staff.userId).all()]
+        start = date.today() - timedelta(days=date.today().weekday())
+        db.session.execute(insert(ShiftTemplate), [
+            {
+                "weekday": i % 7,
+                "startTime": time(8 + i % 8),
+                "durationMinutes": 480,
+                "staffId": staff_ids[i] if i % 5 else None,
+                "role": "Cook",
+                "effectiveFrom": start
+            }
+            for i in range(TEMPLATES)
+        ])
+        db.session.commit()
+
+        with timed(f"materialize {WEEKS} weeks x {TEMPLATES} templates"):
+            first = materialize_templates(WEEKS, start)
+        with timed("re-run (all occurrences already exist)"):
+            second = materialize_templates(WEEKS, start)
+
+        print(f"created={first['created']} rerun_created={second['created']} shifts={Shift.query.count()}")
+
+
+if __name__ == "__main__":
+    main()
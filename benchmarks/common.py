@@ -0,0 +1,47 @@
+# benchmarks/common.py
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import insert
+
+from App.main import create_app
+from App.database import db
+
+
+def make_app(**overrides):
+    """Create an app backed by a throwaway SQLite file (file-backed so timings are realistic)."""
+    path = os.path.join(tempfile.mkdtemp(prefix="rostering-bench-"), "bench.db")
+    config = {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"}
+    config.update(overrides)
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def bulk_staff(count, role="Cook", prefix="staff"):
+    """Insert `count` staff rows with a dummy password hash (hashing is not what we measure)."""
+    from App.models.staff import Staff
+    db.session.execute(insert(Staff), [
+        {
+            "username": f"{prefix}{i}",
+            "email": f"{prefix}{i}@example.com",
+            "usernameLower": f"{prefix}{i}".lower(),
+            "emailLower": f"{prefix}{i}@example.com".lower(),
+            "passwordHash": "x",
+            "role": role,
+            "type": "staff"
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+@contextmanager
+def timed(label, results=None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"{label:<50} {elapsed * 1000:10.1f} ms")
+    if results is not None:
+        results[label] = elapsed
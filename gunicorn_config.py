@@ -11,6 +11,10 @@ workers = 4
 # Use the 'gevent' worker type for async performance.
 worker_class = 'gevent'
 
+# Concurrent connections per gevent worker. SSE dashboards (/staff/events,
+# /admin/events) hold one connection each while idle, so allow plenty.
+worker_connections = 6000
+
 # Log level
 loglevel = 'info'
 
@@ -1,9 +1,16 @@
+import csv
+import json
+import sys
 import click
 from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, date, timedelta
-import random
 
-from App.controllers import auth_controller, staff_controller
+from App.controllers import (auth_controller, staff_controller, admin_controller, template_controller,
+                             archive_controller, snapshot_controller, report_controller, hours_controller,
+                             repair_controller, staff_import_controller, history_controller)
+from App.controllers.initialize import initialize, data_replaced
+from App import events, idempotency, loadtest, revocation
 from App.main import create_app
 from App.database import db
 
@@ -38,90 +45,14 @@ def parse_date(d_str):
 @with_appcontext
 def init_db():
     """Initialize database and seed demo data with admins, staff, rosters, shifts, and randomized attendance records."""
-    db.drop_all()
-    db.create_all()
-
-    # Admins (with hashed passwords)
-    admin1 = Admin(username="admin1", email="admin1@example.com", type="admin")
-    admin1.set_password("adminpass1")
-
-    admin2 = Admin(username="admin2", email="admin2@example.com", type="admin")
-    admin2.set_password("adminpass2")
-
-    # Staff (6 total)
-    staff_members = [
-        Staff(username="alice", email="alice@example.com", role="Cashier", type="staff"),
-        Staff(username="bob", email="bob@example.com", role="Cook", type="staff"),
-        Staff(username="carol", email="carol@example.com", role="Waiter", type="staff"),
-        Staff(username="dave", email="dave@example.com", role="Cleaner", type="staff"),
-        Staff(username="eve", email="eve@example.com", role="Bartender", type="staff"),
-        Staff(username="frank", email="frank@example.com", role="Security", type="staff"),
-    ]
-    default_staff_password = {
-        "alice": "alicepass",
-        "bob": "bobpass",
-        "carol": "carolpass",
-        "dave": "davepass",
-        "eve": "evepass",
-        "frank": "frankpass"
-    }
-    for s in staff_members:
-        s.set_password(default_staff_password[s.username])
-
-    db.session.add_all([admin1, admin2] + staff_members)
-    db.session.commit()
-
-    # Create 5 rosters
-    today = date.today()
-    current_week_start = today - timedelta(days=today.weekday())
-    all_rosters = []
-    for i in range(5):
-        week_start = current_week_start - timedelta(weeks=i)
-        roster = Roster(weekStartDate=week_start, weekEndDate=week_start + timedelta(days=6))
-        db.session.add(roster)
-        all_rosters.append(roster)
-    db.session.commit()
-
-    # Shifts & Attendance
-    all_shifts = []
-    all_attendance = []
-    for roster in all_rosters:
-        for staff in staff_members:
-            day_offset = random.randint(0, 6)
-            start_hour = random.randint(8, 14)
-            shift_start = datetime.combine(roster.weekStartDate, datetime.min.time()) + timedelta(days=day_offset, hours=start_hour)
-            shift_end = shift_start + timedelta(hours=8)
-
-            shift = Shift(rosterId=roster.rosterId, staffId=staff.userId, startTime=shift_start, endTime=shift_end)
-            db.session.add(shift)
-            db.session.commit()
-            all_shifts.append(shift)
-
-            attendance_type = random.choice(["full", "late", "absent", "early_leave"])
-            if attendance_type == "full":
-                time_in = shift_start + timedelta(minutes=random.randint(0, 10))
-                time_out = shift_end - timedelta(minutes=random.randint(0, 10))
-            elif attendance_type == "late":
-                time_in = shift_start + timedelta(minutes=random.randint(15, 60))
-                time_out = shift_end - timedelta(minutes=random.randint(0, 10))
-            elif attendance_type == "early_leave":
-                time_in = shift_start + timedelta(minutes=random.randint(0, 10))
-                time_out = shift_end - timedelta(hours=random.randint(1, 3))
-            else:
-                time_in = None
-                time_out = None
-
-            record = AttendanceRecord(staffId=staff.userId, shiftId=shift.shiftId, timeIn=time_in, timeOut=time_out)
-            db.session.add(record)
-            all_attendance.append(record)
-    db.session.commit()
+    counts = initialize()
 
     print("✅ Database initialized with:")
-    print(" - 2 Admins (with hashed passwords)")
-    print(" - 6 Staff (with hashed passwords)")
-    print(" - 5 Rosters (current + 4 past weeks)")
-    print(f" - {len(all_shifts)} Shifts (randomized)")
-    print(f" - {len(all_attendance)} Attendance Records (varied & randomized)")
+    print(f" - {counts['admins']} Admins (with hashed passwords)")
+    print(f" - {counts['staff']} Staff (with hashed passwords)")
+    print(f" - {counts['rosters']} Rosters (current + past weeks)")
+    print(f" - {counts['shifts']} Shifts (randomized)")
+    print(f" - {counts['attendance']} Attendance Records (varied & randomized)")
 
 @system_cli.command("rollback-db")
 @with_appcontext
@@ -130,6 +61,89 @@ def rollback_db():
     db.session.rollback()
     print("Rolled back uncommitted changes.")
 
+@system_cli.command("archive")
+@with_appcontext
+@click.option("--before", default=None, help="Archive rosters whose week ended before this date (YYYY-MM-DD)")
+@click.option("--batch-size", default=None, type=int, help="Rosters moved per transaction")
+def archive(before, batch_size):
+    """Move old rosters, shifts, attendance and reports into archive storage (safe to re-run)."""
+    result = archive_controller.archive_rosters(parse_date(before) if before else None, batch_size)
+    print(f"✅ Archived rosters ending before {result['cutoff']} in {result['batches']} batches:")
+    print(f" - {result['rosters']} Rosters")
+    print(f" - {result['shifts']} Shifts")
+    print(f" - {result['attendance_records']} Attendance Records")
+    print(f" - {result['shift_reports']} Shift Reports ({result['shift_report_entries']} entries)")
+
+@system_cli.command("sweep-revocations")
+@with_appcontext
+def sweep_revocations():
+    """Delete logged-out tokens that have expired anyway (run from cron)."""
+    removed = revocation.sweep_expired()
+    print(f"✅ Removed {removed} expired revocations")
+
+@system_cli.command("sweep-idempotency")
+@with_appcontext
+@click.option("--batch-size", default=1000, type=int, help="Keys deleted per transaction")
+def sweep_idempotency(batch_size):
+    """Delete expired Idempotency-Key records (run from cron)."""
+    removed = idempotency.sweep_expired(batch_size)
+    print(f"✅ Removed {removed} expired idempotency keys")
+
+@system_cli.command("rebuild-hours")
+@with_appcontext
+def rebuild_hours():
+    """Recompute the running weekly hour totals from the shifts table."""
+    rows = hours_controller.rebuild_hours()
+    print(f"✅ Rebuilt {rows} weekly hour totals")
+
+@system_cli.command("loadtest")
+@click.option("--url", default=None, help="Server to load (e.g. http://127.0.0.1:8080); default an in-process test client")
+@click.option("--clients", default=10, type=int, help="Concurrent virtual users")
+@click.option("--duration", default=10.0, type=float, help="Seconds to run")
+@click.option("--requests", "max_requests", default=None, type=int, help="Stop after this many requests")
+@click.option("--mix", default=None, help="Scenario weights, e.g. login=1,view-roster=6,clock-in-storm=3,report=1")
+@click.option("--admin", nargs=2, default=None, help="Admin USERNAME PASSWORD used to seed (default: the collection's)")
+@click.option("--collection", default=loadtest.COLLECTION, type=click.Path(exists=True), help="Postman collection")
+@click.option("--out", default="-", type=click.File("w"), help="Write the JSON summary here (default stdout)")
+def run_loadtest(url, clients, duration, max_requests, mix, admin, collection, out):
+    """Replay the Postman collection as weighted scenarios and report per-route latency as JSON."""
+    try:
+        result = loadtest.run_loadtest(url, clients, duration, max_requests, mix,
+                                       {"username": admin[0], "password": admin[1]} if admin else None,
+                                       collection)
+    except (ValueError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    json.dump(result, out, indent=2)
+    out.write("\n")
+
+@system_cli.command("snapshot-rosters")
+@with_appcontext
+def snapshot_rosters():
+    """Baseline history snapshots of every roster (run once so older shifts appear in history)."""
+    count = history_controller.snapshot_rosters()
+    print(f"✅ Snapshotted {count} rosters")
+
+snapshot_cli = AppGroup("snapshot", help="Save and restore full database snapshots")
+system_cli.add_command(snapshot_cli)
+
+@snapshot_cli.command("save")
+@with_appcontext
+@click.argument("path")
+def snapshot_save(path):
+    """Write a compressed, versioned dump of every table to PATH."""
+    counts = snapshot_controller.save_snapshot(path)
+    print(f"✅ Saved {sum(counts.values())} rows from {len(counts)} tables to {path}")
+
+@snapshot_cli.command("load")
+@with_appcontext
+@click.argument("path")
+def snapshot_load(path):
+    """Replace the database contents with the snapshot at PATH."""
+    last_event = events.latest_id()
+    counts = snapshot_controller.load_snapshot(path)
+    data_replaced(last_event)
+    print(f"✅ Loaded {sum(counts.values())} rows into {len(counts)} tables from {path}")
+
 # ---------- ADMIN COMMANDS ----------
 @admin_cli.command("add-staff")
 @with_appcontext
@@ -146,16 +160,64 @@ def add_staff():
     db.session.commit()
     print(f"Added staff {staff.username} with ID {staff.userId}")
 
+@admin_cli.command("add-location")
+@with_appcontext
+@click.argument("name")
+def add_location(name):
+    """Register a site that staff, rosters and shifts can belong to."""
+    result = admin_controller.create_location({"name": name})
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    print(f"✅ Added location {result['name']} with ID {result['locationId']}")
+
+@admin_cli.command("list-locations")
+@with_appcontext
+def list_locations():
+    for location in admin_controller.list_locations():
+        print(f"{location['locationId']}: {location['name']}")
+
+@admin_cli.command("import-staff")
+@with_appcontext
+@click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--batch-size", default=staff_import_controller.IMPORT_BATCH, type=int, help="Rows per transaction")
+@click.option("--workers", default=None, type=int, help="Password hashing processes (default: one per core)")
+@click.option("--dry-run", is_flag=True, help="Only validate the file")
+@click.option("--errors", "errors_file", default=None, type=click.File("w"), help="Write failed rows to this CSV")
+def import_staff(csv_file, batch_size, workers, dry_run, errors_file):
+    """Add staff from a CSV with username,email,password[,role,locationId,maxWeeklyHours,maxDailyHours]."""
+    result = staff_import_controller.import_staff(csv_file, batch_size, workers, dry_run)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+    if errors_file:
+        writer = csv.DictWriter(errors_file, fieldnames=["line", "username", "error"])
+        writer.writeheader()
+        writer.writerows(result["errors"])
+    else:
+        for e in result["errors"]:
+            print(f"line {e['line']}: {e['username'] or '-'}: {e['error']}")
+    if dry_run:
+        print(f"✅ {result['valid']} rows would be imported, {result['failed']} rejected")
+    else:
+        print(f"✅ Imported {result['imported']} staff, {result['failed']} rows rejected")
+
+@admin_cli.command("export-staff")
+@with_appcontext
+@click.argument("csv_file", type=click.File("w"), default="-")
+def export_staff(csv_file):
+    """Write all staff to a CSV (stdout by default); passwords are not exported."""
+    count = staff_import_controller.export_staff(csv_file)
+    if csv_file.name != "<stdout>":
+        print(f"✅ Exported {count} staff to {csv_file.name}")
+
 @admin_cli.command("delete-staff")
 @with_appcontext
 @click.argument("staff_id", type=int)
 def delete_staff(staff_id):
-    staff = Staff.query.get(staff_id)
-    if not staff:
+    if not admin_controller.delete_staff(staff_id):
         print("Staff not found.")
         return
-    db.session.delete(staff)
-    db.session.commit()
     print(f"Deleted staff with ID {staff_id}")
 
 @admin_cli.command("list-staff")
@@ -173,7 +235,8 @@ def list_staff():
 @click.option("--staff-id", type=int, help="Staff ID")
 @click.option("--start", type=str, help="Start time (YYYY-MM-DDTHH:MM)")
 @click.option("--end", type=str, help="End time (YYYY-MM-DDTHH:MM)")
-def schedule_shift(staff_id, start, end):
+@click.option("--allow-overtime", is_flag=True, help="Schedule even if it exceeds the staff member's hour caps")
+def schedule_shift(staff_id, start, end, allow_overtime):
     """Schedule a shift for a staff."""
     if not staff_id:
         staff_id = click.prompt("Enter Staff ID", type=int)
@@ -182,36 +245,114 @@ def schedule_shift(staff_id, start, end):
     if not end:
         end = click.prompt("Enter end datetime (YYYY-MM-DDTHH:MM)")
 
-    start_dt = parse_dt(start)
-    end_dt = parse_dt(end)
-
-    # use current week's roster
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    roster = Roster.query.filter_by(weekStartDate=week_start).first()
-    if not roster:
-        roster = Roster(weekStartDate=week_start, weekEndDate=week_start + timedelta(days=6))
-        db.session.add(roster)
-        db.session.commit()
-
-    new_shift = Shift(staffId=staff_id, startTime=start_dt, endTime=end_dt, rosterId=roster.rosterId)
-    db.session.add(new_shift)
-    db.session.commit()
-    print(f"✅ Shift scheduled for staff {staff_id}: {start_dt} → {end_dt}")
+    result = admin_controller.schedule_shift(
+        {"staffId": staff_id, "start": start, "end": end, "allowOvertime": allow_overtime}
+    )
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    print(f"✅ Shift scheduled for staff {staff_id}: {result['startTime']} → {result['endTime']}")
 
 @admin_cli.command("list-shifts")
 @with_appcontext
 def list_shifts():
     """List all scheduled shifts."""
-    shifts = Shift.query.all()
+    shifts = Shift.query.options(joinedload(Shift.staff)).all()
     if not shifts:
         print("No shifts found.")
         return
     for sh in shifts:
-        s = Staff.query.get(sh.staffId)
-        name = s.username if s else "Unknown"
+        name = sh.staff.username if sh.staff else "Unknown"
         print(f"Shift {sh.shiftId}: Staff {name} | {sh.startTime} - {sh.endTime}")
 
+@admin_cli.command("materialize-templates")
+@with_appcontext
+@click.option("--weeks", default=4, type=int, help="Number of weeks to materialize")
+@click.option("--start", default=None, help="First date to materialize (YYYY-MM-DD), defaults to today")
+def materialize_templates(weeks, start):
+    """Create rosters and shifts from recurring shift templates."""
+    result = template_controller.materialize_templates(weeks, parse_date(start) if start else None)
+    print(f"✅ Materialized {result['created']} shifts over {weeks} weeks ({result['skipped']} already existed, "
+          f"{result['overCap']} left out by hour caps)")
+
+@admin_cli.command("clone-roster")
+@with_appcontext
+@click.argument("roster_id", type=int)
+@click.option("--to-week", required=True, help="Any date in the target week (YYYY-MM-DD)")
+@click.option("--keep-deleted-staff", is_flag=True, help="Also copy shifts of staff who no longer exist")
+@click.option("--allow-conflicts", is_flag=True, help="Copy shifts even if they overlap existing ones")
+def clone_roster(roster_id, to_week, keep_deleted_staff, allow_conflicts):
+    """Copy a roster's shifts into another week."""
+    result = template_controller.clone_roster(roster_id, to_week, skip_deleted_staff=not keep_deleted_staff,
+                                              skip_conflicts=not allow_conflicts)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    print(f"✅ Cloned {result['created']} shifts into roster {result['rosterId']} (week of {result['weekStartDate']}); "
+          f"skipped {result['skippedDeletedStaff']} for deleted staff and {result['skippedConflicts']} conflicts")
+
+@admin_cli.command("hours")
+@with_appcontext
+@click.option("--week", default=None, help="Any date in the week (YYYY-MM-DD), defaults to this week")
+@click.option("--ratio", default=None, type=float, help="Share of the weekly cap to report from (default 0.9)")
+def hours(week, ratio):
+    """List staff near or over their weekly hour cap."""
+    result = hours_controller.hours_report(parse_date(week) if week else None, ratio)
+    if not result["staff"]:
+        print(f"Nobody is at {result['ratio']:.0%} of their cap in the week of {result['weekStartDate']}.")
+        return
+    for s in result["staff"]:
+        flag = "OVER" if s["overCap"] else "near"
+        print(f"{s['username']:<20} {s['hours']:>6.1f}h / {s['capHours']:g}h  {flag}")
+
+@admin_cli.command("repair")
+@with_appcontext
+@click.argument("shift_ids", nargs=-1, type=int)
+@click.option("--apply", is_flag=True, help="Write the reassignments instead of only proposing them")
+def repair(shift_ids, apply):
+    """Propose cover for open shifts (default: all open shifts in the repair horizon)."""
+    result = repair_controller.repair_shifts(list(shift_ids) or None, apply=apply)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    for move in result["assignments"]:
+        source = f"from staff {move['previousStaffId']}" if move["previousStaffId"] else "open"
+        print(f"Shift {move['shiftId']}: {source} -> staff {move['staffId']}")
+    if result["uncovered"]:
+        print(f"Could not cover: {', '.join(map(str, result['uncovered']))}")
+    verb = "Applied" if result["applied"] else "Proposed"
+    print(f"{verb} {result['changes']} changes in {result['elapsedMs']} ms")
+
+@admin_cli.command("call-off")
+@with_appcontext
+@click.argument("shift_id", type=int)
+def call_off(shift_id):
+    """Record that the holder can't work a shift and try to re-cover it."""
+    result = repair_controller.call_off(None, shift_id)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    repair = result["repair"]
+    if result["shift"]["staffId"]:
+        print(f"Shift {shift_id} is now covered by staff {result['shift']['staffId']}")
+    else:
+        print(f"Shift {shift_id} is open; no cover found" + (" (proposal only)" if repair.get("assignments") else ""))
+
+@admin_cli.command("roster-history")
+@with_appcontext
+@click.argument("roster_id", type=int)
+@click.option("--at", default=None, help="Point in time (ISO, UTC); default now")
+def roster_history(roster_id, at):
+    """Show a roster as it was at a point in time."""
+    result = history_controller.roster_at(roster_id, at)
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return
+    print(f"Roster {roster_id} ({result['weekStartDate']} - {result['weekEndDate']}) as of {result['at']}")
+    for s in result["shifts"]:
+        print(f"Shift {s['shiftId']}: staff {s['staffId'] or '-'} {s['startTime']} - {s['endTime']} {s['role'] or ''}")
+    print(f"({len(result['shifts'])} shifts, {result['replayedEvents']} events replayed)")
+
 @admin_cli.command("view-shift-report")
 @with_appcontext
 def view_shift_report():
@@ -222,7 +363,7 @@ def view_shift_report():
       - Lists all existing rosters (by week start date).
       - Prompts you to choose which roster to generate a report for.
       - Displays shift details, per-staff summaries, and overall totals.
-      - Saves the report summary into the ShiftReport table.
+      - Saves the report (header and per-record entries) to the database.
     """
     rosters = Roster.query.order_by(Roster.weekStartDate).all()
     if not rosters:
@@ -241,79 +382,12 @@ def view_shift_report():
 
     roster = rosters[int(choice) - 1]
 
-    # collect data
-    shifts = roster.getCombinedRoster()
-    shift_ids = [s.shiftId for s in shifts]
-    attendance_records = AttendanceRecord.query.filter(
-        AttendanceRecord.shiftId.in_(shift_ids)
-    ).all()
-
-    # tracking totals
-    staff_hours = {}
-    total_shifts = 0
-    total_hours = 0.0
-
-    # start building a summary string to save
-    summary_lines = []
-    summary_lines.append("Shift Report")
-    summary_lines.append("+--------------------------------------+")
-    summary_lines.append(f" Week: {roster.weekStartDate} → {roster.weekEndDate}")
-    summary_lines.append("+--------------------------------------+\n")
-
-    for record in attendance_records:
-        staff = Staff.query.get(record.staffId)
-        shift = Shift.query.get(record.shiftId)
-
-        staff_name = staff.username if staff else "Unknown Staff"
-        shift_info = f"{shift.startTime} → {shift.endTime}" if shift else "No shift info"
-        time_in = record.timeIn.strftime("%Y-%m-%d %H:%M") if record.timeIn else "N/A"
-        time_out = record.timeOut.strftime("%Y-%m-%d %H:%M") if record.timeOut else "N/A"
-
-        if record.timeIn and record.timeOut:
-            hours_worked = (record.timeOut - record.timeIn).total_seconds() / 3600
-            hours_text = f"{hours_worked:.2f} hrs"
-        else:
-            hours_worked = 0
-            hours_text = "Incomplete (No time in/out)"
-
-        # accumulate totals
-        staff_hours[staff_name] = staff_hours.get(staff_name, 0) + hours_worked
-        total_shifts += 1
-        total_hours += hours_worked
-
-        # add to summary string
-        summary_lines.append(f"Staff: {staff_name}")
-        summary_lines.append(f" Shift: {shift_info}")
-        summary_lines.append(f" Time In: {time_in} | Time Out: {time_out}")
-        summary_lines.append(f" Hours Worked: {hours_text}")
-        summary_lines.append("----------------------------------------")
-
-    # per-staff summary
-    summary_lines.append("\nSummary of Hours Worked (per staff):")
-    for name, hrs in staff_hours.items():
-        summary_lines.append(f" {name}: {hrs:.2f} hrs")
-
-    # overall summary
-    summary_lines.append("\nOverall Summary:")
-    summary_lines.append(f" Total Shifts: {total_shifts}")
-    summary_lines.append(f" Total Staff: {len(staff_hours)}")
-    summary_lines.append(f" Total Hours Worked: {total_hours:.2f} hrs")
-
-    # join all summary lines
-    final_summary = "\n".join(summary_lines)
-
-    # save to DB
-    report = ShiftReport(
-        rosterId=roster.rosterId,
-        weekStartDate=roster.weekStartDate,
-        weekEndDate=roster.weekEndDate,
-        summary=final_summary
-    )
-    db.session.add(report)
-    db.session.commit()
-
-    # print to console
-    print("\n" + final_summary)
+    # same structured report the API generates, rendered as text
+    report = report_controller.create_report(roster.rosterId)
+    print()
+    for chunk in report_controller.render_report(report, "text"):
+        print(chunk, end="")
+    print()
     print("\nReport saved to database.")
 
 # ---------- STAFF COMMANDS ----------
@@ -323,17 +397,17 @@ def view_shift_report():
 def view_roster(week_start):
     if week_start:
         ws = parse_date(week_start)
-        roster = Roster.query.filter_by(weekStartDate=ws).first()
+        roster = (Roster.query.filter_by(weekStartDate=ws)
+                  .options(selectinload(Roster.shifts).joinedload(Shift.staff)).first())
         if not roster:
             print("No roster found for that week.")
             return
         shifts = roster.getCombinedRoster()
     else:
-        shifts = Shift.query.order_by(Shift.startTime).all()
+        shifts = Shift.query.options(joinedload(Shift.staff)).order_by(Shift.startTime).all()
 
     for sh in shifts:
-        staff = Staff.query.get(sh.staffId)
-        name = staff.username if staff else "UNASSIGNED"
+        name = sh.staff.username if sh.staff else "UNASSIGNED"
         print(f"Shift {sh.shiftId}: {name} | {sh.startTime} - {sh.endTime}")
 
 @staff_cli.command("time-in")
@@ -381,21 +455,23 @@ def view_my_shifts(staff_id):
 
 
 # ---------- TEST COMMANDS ----------
-import sys
-import pytest
+# pytest is imported inside each command so the web workers and other CLI commands never load it
 
 test = AppGroup('test', help='Run application tests')
 
 @test.command("unit", help="Run all unit tests")
 def run_unit_tests():
+    import pytest
     sys.exit(pytest.main(["-k", "UserUnitTests"]))
 
 @test.command("integration", help="Run all integration tests")
 def run_integration_tests():
+    import pytest
     sys.exit(pytest.main(["-k", "IntegrationTests"]))
 
 @test.command("all", help="Run all tests")
 def run_all_tests():
+    import pytest
     sys.exit(pytest.main(["-v"]))
 
 